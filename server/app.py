@@ -5,7 +5,7 @@ from dotenv import load_dotenv
 import google.generativeai as genai
 import os
 import pytz
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from models.db import db, bcrypt
 
@@ -24,8 +24,13 @@ from services.recommendation.quick_recommendations import (
     get_quick_recommendations,
     get_top_recommendations_for_user,
 )
-from services.scrapers.engage_events_service import fetch_engage_events
+from services.recommendation.tile_cache import content_etag
+from services.event_feed import feed_page, feed_etag, InvalidCursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.event_ingestion import ENGAGE_SOURCE
+from services.event_store import read_snapshot, read_sources, snapshot_age_seconds
 from services.recommendation.context import ConversationContext
+from services.recommendation.intent_classifier import load_intent_classifier
+from services.recommendation.events import preload_external_events
 from services.weather_service import get_weather_by_coords, get_forecast_by_coords
 from utils.auth import decode_token
 from utils.context_manager import ConversationContextManager
@@ -141,6 +146,12 @@ app.register_blueprint(weather_bp, url_prefix="/api")
 
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
+# Local intent/vibe classifier (data/intent_classifier.npz), loaded once per worker
+load_intent_classifier()
+
+# static/events.json, parsed once per worker and reloaded only when it changes
+preload_external_events()
+
 
 # ─────────────────────────────────────────────────────────────
 # CHAT ROUTE
@@ -217,6 +228,7 @@ def chat():
             memory.last_places = []
             memory.all_results = []
             memory.history = []
+            memory.summary = ""
 
         logger.debug(f"Chat request - user: {user_id or 'anonymous'}, session: {session_id}, message length: {len(user_message)}, clear_session: {clear_session}")
 
@@ -297,8 +309,25 @@ def quick_recs():
                 user_lat = None
                 user_lng = None
         
+        if category == "events":
+            # Event pages only change with the snapshot: honor If-None-Match
+            etag = feed_etag(request.args, scope="quick_recs")
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            result = get_quick_recommendations(
+                category, limit=limit,
+                cursor=request.args.get("cursor"), since=request.args.get("since"),
+            )
+            response = jsonify(result)
+            response.set_etag(etag)
+            return response
+
+        # Places are shared per geo tile and 15-minute bucket, so the result
+        # (and its ETag) is the same for everyone nearby until the bucket rolls over
         result = get_quick_recommendations(category, limit=limit, vibe=vibe, user_lat=user_lat, user_lng=user_lng)
-        return jsonify(result)
+        return _conditional_json(result)
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Quick recommendations endpoint error: {e}", exc_info=True)
         return jsonify({"error": "Unable to fetch quick recommendations"}), 500
@@ -378,7 +407,7 @@ def top_recommendations():
             user_lng=user_lng,
         )
 
-        return jsonify(result)
+        return _conditional_json(result)
     except Exception as e:
         logger.error(f"Top recommendations endpoint error: {e}", exc_info=True)
         return jsonify({"error": "Unable to fetch top recommendations"}), 500
@@ -388,22 +417,104 @@ def top_recommendations():
 # EVENTS
 # ─────────────────────────────────────────────────────────────
 
+def _not_modified(etag: str):
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _conditional_json(payload):
+    """jsonify() with a content ETag; 304 when the client already has it."""
+    etag = content_etag(payload)
+    if request.if_none_match.contains(etag):
+        return _not_modified(etag)
+    response = jsonify(payload)
+    response.set_etag(etag)
+    return response
+
+
+def _engage_event_payload(ev: dict) -> dict:
+    """Snapshot event -> the Engage shape this endpoint has always returned."""
+    return {
+        "id": ev.get("id"),
+        "name": ev.get("name"),
+        "start": ev.get("start"),
+        "end": ev.get("end"),
+        "description": ev.get("description"),
+        "location": ev.get("address"),
+        "organization": ev.get("organization"),
+        "image": ev.get("photo_url"),
+        "url": ev.get("maps_link"),
+        "lat": ev.get("lat"),
+        "lng": ev.get("lng"),
+        "updated_version": ev.get("updated_version"),
+    }
+
+
 @app.route("/api/nyu_engage_events", methods=["GET"])
 @limiter_module.limiter.limit("20 per minute")
 def nyu_engage_events():
+    """
+    NYU Engage events from the ingested snapshot, paged.
+    Query: days, limit, cursor (from next_cursor), since (from sync_version).
+    Sends an ETag; If-None-Match on an unchanged feed gets 304.
+    """
     try:
         days_raw = request.args.get("days", 7)
         is_valid, days, error_msg = validate_days(days_raw)
         if not is_valid:
             logger.warning(f"Invalid days parameter: {days_raw}, using clamped value: {days}")
-        
-        data = fetch_engage_events(days_ahead=days)
-        return jsonify({"engage_events": data})
+
+        limit_raw = request.args.get("limit", DEFAULT_PAGE_SIZE)
+        is_valid, limit, error_msg = validate_limit(limit_raw, max_value=MAX_PAGE_SIZE)
+        if not is_valid:
+            logger.warning(f"Invalid limit parameter: {limit_raw}, using clamped value: {limit}")
+
+        etag = feed_etag(request.args, scope="nyu_engage_events")
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+
+        page = feed_page(
+            limit=limit,
+            cursor=request.args.get("cursor"),
+            since=request.args.get("since"),
+            source=ENGAGE_SOURCE,
+            starts_before=datetime.now(pytz.timezone("America/New_York")) + timedelta(days=days),
+        )
+        response = jsonify({
+            "engage_events": [_engage_event_payload(ev) for ev in page["events"]],
+            "next_cursor": page["next_cursor"],
+            "sync_version": page["sync_version"],
+            "deleted": page["deleted"],
+            "reset": page["reset"],
+        })
+        response.set_etag(etag)
+        return response
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Engage events endpoint error: {e}", exc_info=True)
         return jsonify({"error": "Unable to fetch NYU Engage events"}), 500
 
 
+@app.route("/api/events/health", methods=["GET"])
+@limiter_module.limiter.limit("20 per minute")
+def events_health():
+    """
+    Per-source scraper health from the last ingestion pass: breaker state,
+    latency, item count and last error, plus the age of the event snapshot.
+    """
+    snapshot = read_snapshot()
+    age = snapshot_age_seconds()
+    return jsonify({
+        "snapshot_version": snapshot.get("version"),
+        "snapshot_updated_at": snapshot.get("updated_at"),
+        "snapshot_age_seconds": round(age) if age is not None else None,
+        "event_count": len(snapshot.get("events", [])),
+        "sources": read_sources(),
+    })
+
+
 # ─────────────────────────────────────────────────────────────
 # DIRECTIONS
 # ─────────────────────────────────────────────────────────────
@@ -569,4 +680,8 @@ if __name__ == "__main__":
     port = int(os.getenv("PORT", 5001))
     # Only enable debug in development
     debug = os.getenv("FLASK_ENV", "development").lower() != "production"
+    # Dev server: ingest events in-process (gunicorn starts it from gunicorn.conf.py)
+    if not debug or os.getenv("WERKZEUG_RUN_MAIN") == "true":
+        from services.event_ingestion import start_background_ingestion
+        start_background_ingestion()
     app.run(host="0.0.0.0", port=port, debug=debug)
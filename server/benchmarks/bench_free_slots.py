@@ -0,0 +1,183 @@
+# server/benchmarks/bench_free_slots.py
+"""
+Free-slot engine benchmark on a synthetic semester calendar.
+
+Builds a semester of recurring lectures plus random one-off events (mixed
+"Z", offset and zoneless timestamps, some all-day), then:
+
+  * checks the engine against the previous implementation (parse, sort,
+    scan) on every day of the range. The old code assumed it was only given
+    that day's events and had no notion of all-day events, so it gets the
+    day's timed events;
+  * times "free slots for every day of the semester" both ways, and one
+    free-slot query over the whole range.
+
+Run from server/:
+    python benchmarks/bench_free_slots.py [--events 2000] [--iterations 5]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from services.free_slots import BusySchedule, slot_dict  # noqa: E402
+from utils.datetime_utils import LOCAL_TZ, parse_datetime, ensure_aware  # noqa: E402
+
+SEMESTER_START = LOCAL_TZ.localize(datetime(2025, 9, 2))
+SEMESTER_WEEKS = 15
+MIN_MINUTES = 30
+
+
+# ---------------------------------------------------------------------
+# Synthetic calendar
+# ---------------------------------------------------------------------
+def _stamp(dt, rng):
+    """Serialize like the different clients do: offset, UTC "Z", or zoneless local."""
+    style = rng.random()
+    if style < 0.4:
+        return dt.isoformat()
+    if style < 0.7:
+        return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return dt.replace(tzinfo=None).isoformat()
+
+
+def build_calendar(n_events, seed=7):
+    rng = random.Random(seed)
+    events = []
+
+    # Recurring lectures: 6 courses, twice a week, 75 minutes
+    for course in range(6):
+        days = rng.sample(range(5), 2)
+        hour = rng.choice([9, 10, 11, 12, 14, 15, 17])
+        minute = rng.choice([0, 30])
+        for week in range(SEMESTER_WEEKS):
+            for day in days:
+                start = SEMESTER_START + timedelta(weeks=week, days=day)
+                start = LOCAL_TZ.localize(start.replace(tzinfo=None, hour=hour, minute=minute))
+                events.append({"start": _stamp(start, rng), "end": _stamp(start + timedelta(minutes=75), rng)})
+
+    # One-offs (often overlapping), a few missing "end", a few all-day
+    span_days = SEMESTER_WEEKS * 7
+    while len(events) < n_events:
+        day = SEMESTER_START + timedelta(days=rng.randrange(span_days))
+        if rng.random() < 0.03:
+            events.append({"start": day.date().isoformat(), "end": day.date().isoformat(), "all_day": True})
+            continue
+        start = LOCAL_TZ.localize(day.replace(tzinfo=None, hour=rng.randrange(7, 22), minute=rng.choice([0, 15, 30, 45])))
+        ev = {"start": _stamp(start, rng)}
+        if rng.random() > 0.05:
+            ev["end"] = _stamp(start + timedelta(minutes=rng.choice([15, 30, 45, 60, 90])), rng)
+        events.append(ev)
+
+    rng.shuffle(events)
+    return events
+
+
+# ---------------------------------------------------------------------
+# Previous implementation (notification_service.find_free_time_slots), per day
+# ---------------------------------------------------------------------
+def legacy_free_slots(calendar_events, start_time, end_time, min_free_duration_minutes=MIN_MINUTES):
+    parsed_events = []
+    for event in calendar_events:
+        start = parse_datetime(event.get("start"))
+        end = parse_datetime(event.get("end"))
+        if start and end:
+            parsed_events.append({"start": start, "end": end})
+    parsed_events.sort(key=lambda x: x["start"])
+
+    free_slots = []
+    current_time = start_time
+    for event in parsed_events:
+        if current_time < event["start"]:
+            gap = (event["start"] - current_time).total_seconds() / 60
+            if gap >= min_free_duration_minutes:
+                free_slots.append(slot_dict(current_time, event["start"]))
+        current_time = max(current_time, event["end"])
+    if current_time < end_time:
+        gap = (end_time - current_time).total_seconds() / 60
+        if gap >= min_free_duration_minutes:
+            free_slots.append(slot_dict(current_time, end_time))
+    return free_slots
+
+
+def _days():
+    for d in range(SEMESTER_WEEKS * 7):
+        day = (SEMESTER_START + timedelta(days=d)).date()
+        start = LOCAL_TZ.localize(datetime.combine(day, datetime.min.time()).replace(hour=8))
+        yield start, LOCAL_TZ.localize(datetime.combine(day, datetime.min.time()).replace(hour=22))
+
+
+def events_by_day(events):
+    """The old contract: callers passed only the events of the day in question."""
+    buckets = {}
+    for ev in events:
+        start, end = parse_datetime(ev.get("start")), parse_datetime(ev.get("end"))
+        if start and end and not ev.get("all_day"):
+            buckets.setdefault(start.astimezone(LOCAL_TZ).date(), []).append(ev)
+    return buckets
+
+
+def _same_instant(a, b):
+    return ensure_aware(datetime.fromisoformat(a)) == ensure_aware(datetime.fromisoformat(b))
+
+
+def check(events):
+    """Engine vs legacy, day by day (timed events with an end only)."""
+    by_day = events_by_day(events)
+    schedule = BusySchedule.from_events([ev for day in by_day.values() for ev in day])
+    for start, end in _days():
+        new = [slot_dict(s, e) for s, e in schedule.free_slots(start, end, MIN_MINUTES)]
+        old = legacy_free_slots(by_day.get(start.date(), []), start, end)
+        if len(new) != len(old) or not all(
+            _same_instant(a["start"], b["start"]) and _same_instant(a["end"], b["end"]) for a, b in zip(new, old)
+        ):
+            return f"{start.date()}: {len(new)} slots vs {len(old)} legacy"
+    return None
+
+
+# ---------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------
+def timed(fn, iterations):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        result = fn()
+    return (time.perf_counter() - t0) / iterations, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    events = build_calendar(args.events)
+    days = list(_days())
+    range_start, range_end = days[0][0], days[-1][1]
+    print(f"{len(events)} events over {len(days)} days")
+
+    problem = check(events)
+    print(f"  check vs legacy (timed events): {'ok' if problem is None else 'FAIL: ' + problem}")
+
+    build, schedule = timed(lambda: BusySchedule.from_events(events), args.iterations)
+    per_day, slots = timed(lambda: [schedule.free_slots(s, e, MIN_MINUTES) for s, e in days], args.iterations)
+    whole, whole_slots = timed(lambda: schedule.free_slots(range_start, range_end, MIN_MINUTES), args.iterations)
+    by_day = events_by_day(events)
+    legacy, _ = timed(lambda: [legacy_free_slots(by_day.get(s.date(), []), s, e) for s, e in days], args.iterations)
+
+    print(f"  {'build schedule':34s} {build * 1000:9.2f} ms  ({len(schedule)} merged busy intervals)")
+    print(f"  {'free slots, every day':34s} {per_day * 1000:9.2f} ms  ({sum(map(len, slots))} slots)")
+    print(f"  {'free slots, whole range at once':34s} {whole * 1000:9.2f} ms  ({len(whole_slots)} slots)")
+    print(f"  {'legacy, every day (pre-bucketed)':34s} {legacy * 1000:9.2f} ms  "
+          f"(engine build + queries: {(build + per_day) * 1000:.2f} ms)")
+    return 1 if problem else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
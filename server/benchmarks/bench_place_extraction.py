@@ -0,0 +1,193 @@
+# server/benchmarks/bench_place_extraction.py
+"""
+Microbenchmark: reply → place matching on recorded Gemini replies.
+
+Compares the current matcher (precompiled patterns + Aho-Corasick over item
+names) with the previous per-call regex / per-name substring implementation,
+and checks both produce the same matches and candidate names.
+
+Run from server/:
+    python benchmarks/bench_place_extraction.py [--iterations 2000]
+"""
+import os
+import sys
+import re
+import json
+import time
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from services.recommendation.place_extraction import (  # noqa: E402
+    _match_known_items,
+    _candidate_place_names,
+)
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "data", "recorded_replies.json")
+
+
+# ---------------------------------------------------------------------
+# Previous implementation (offline part only), kept for comparison
+# ---------------------------------------------------------------------
+def legacy_extract(reply_text, items):
+    reply_lower = reply_text.lower()
+    matched_places = []
+    seen_names = set()
+
+    for item in items:
+        name = item.get("name", "")
+        if not name:
+            continue
+        name_lower = name.lower()
+        if name_lower in seen_names:
+            continue
+        name_without_the = name_lower.replace("the ", "").strip()
+        if name_lower in reply_lower or name_without_the in reply_lower:
+            matched_places.append(item)
+            seen_names.add(name_lower)
+            continue
+        name_words = [w for w in name_lower.split() if len(w) > 3 and w != "the"]
+        if not name_words:
+            continue
+        matched_words = sum(1 for word in name_words if word in reply_lower)
+        if matched_words >= 2 or (len(name_words) == 1 and matched_words == 1):
+            matched_places.append(item)
+            seen_names.add(name_lower)
+
+    place_indicators = [
+        r"go to\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or|\s+is|\s+was|\s+has)",
+        r"check out\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or|\s+is|\s+was)",
+        r"try\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or|\s+is)",
+        r"visit\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or|\s+is)",
+        r"head to\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        r"stop by\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        r"recommend\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        r"suggest\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        r"at\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or|\s+\?|\s+is|\s+was|\s+has)",
+        r"from\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        r"grabbing\s+(?:a\s+)?(?:slice|bite|drink|coffee|meal)\s+at\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        r"how about\s+(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)(?:\?|\.|,|!|$|;|:|\s+is|\s+was)",
+        r"(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)\s+is\s+(?:a|an|the)\s+",
+        r"(?:the\s+)?([A-Z][a-zA-Z\s&'\-]+?)\s+is\s+(?:definitely|just|really|perfect|great|good|close|near)",
+    ]
+    potential_place_names = []
+    for pattern in place_indicators:
+        for match in re.finditer(pattern, reply_text, re.IGNORECASE):
+            place_name = match.group(1).strip()
+            place_name = re.sub(r'\s+(Pizza|Restaurant|Cafe|Bar|Shop|Store|Place|Inn|Square|Garden|Park)$', '', place_name, flags=re.IGNORECASE)
+            if len(place_name) > 3 and place_name.lower() not in ["the", "a", "an", "this", "that", "it", "there", "here"]:
+                potential_place_names.append(place_name)
+
+    capitalized_pattern = r'\b(?:The\s+)?([A-Z][a-zA-Z]+(?:\'[a-z]+)?(?:\s+[A-Z][a-zA-Z]+(?:\'[a-z]+)?){1,4})\b'
+    for match in re.finditer(capitalized_pattern, reply_text):
+        phrase = match.group(1).strip()
+        phrase_lower = phrase.lower()
+        if phrase_lower in seen_names or len(phrase) < 5:
+            continue
+        common_phrases = {
+            "new york", "new jersey", "how about", "what about", "just a", "just the",
+            "for a", "for the", "from here", "from there", "close by",
+            "near by", "right now", "just now", "a place", "the place", "this place",
+            "that place", "some place", "any place", "every place", "no place"
+        }
+        if phrase_lower in common_phrases:
+            continue
+        words = phrase.split()
+        substantial_words = [w for w in words if len(w) > 3 and w.lower() not in ["the", "and", "for", "from", "with", "that", "this"]]
+        if len(substantial_words) < 1:
+            continue
+        context = reply_text[max(0, match.start() - 30):min(len(reply_text), match.end() + 30)].lower()
+        place_indicators_in_context = [
+            "is a", "is an", "is the", "is definitely", "is just", "is really",
+            "is perfect", "is great", "is good", "is close", "is near", "is historic",
+            "is iconic", "was a", "was an", "at", "from", "to", "near", "close to",
+            "walk", "minute", "minutes", "mile", "miles", "distance", "location",
+            "spot", "place", "venue", "restaurant", "cafe", "bar", "shop", "store"
+        ]
+        is_likely_place = any(indicator in context for indicator in place_indicators_in_context)
+        place_suffixes = ["inn", "pizza", "cafe", "bar", "restaurant", "square", "garden",
+                          "park", "shop", "store", "place", "spot", "location", "venue",
+                          "tavern", "grill", "diner", "bistro", "lounge", "club", "hall",
+                          "center", "centre", "plaza", "market", "bakery", "deli"]
+        has_place_suffix = any(phrase_lower.endswith(suffix) for suffix in place_suffixes)
+        if is_likely_place or has_place_suffix or len(substantial_words) >= 2:
+            potential_place_names.append(phrase)
+
+    unique_place_names = []
+    seen_candidates = set()
+    for place_name in potential_place_names:
+        key = place_name.lower().strip()
+        if key not in seen_candidates and key not in seen_names:
+            unique_place_names.append(place_name)
+            seen_candidates.add(key)
+
+    def get_first_position(item):
+        name = item.get("name", "").lower()
+        if name in reply_lower:
+            return reply_lower.index(name)
+        for word in [w for w in name.split() if len(w) > 3]:
+            if word in reply_lower:
+                return reply_lower.index(word)
+        return len(reply_lower)
+
+    matched_places.sort(key=get_first_position)
+    return [p["name"] for p in matched_places], unique_place_names
+
+
+def current_extract(reply_text, items):
+    reply_lower = reply_text.lower()
+    matched, seen, hits = _match_known_items(reply_lower, items)
+    candidates = _candidate_place_names(reply_text, reply_lower, seen)
+
+    def first_position(item):
+        name = item["name"].lower()
+        if name in hits:
+            return hits[name]
+        for word in (w for w in name.split() if len(w) > 3):
+            if word in hits:
+                return hits[word]
+        return len(reply_lower)
+
+    matched.sort(key=first_position)
+    return [p["name"] for p in matched], candidates
+
+
+def _time(fn, cases, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for reply, items in cases:
+            fn(reply, items)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(DATA_FILE) as f:
+        recorded = json.load(f)["replies"]
+    cases = [(r["reply"], [{"name": n} for n in r["items"]]) for r in recorded]
+
+    mismatches = 0
+    for reply, items in cases:
+        if legacy_extract(reply, items) != current_extract(reply, items):
+            mismatches += 1
+            print("MISMATCH:", reply[:60])
+            print("  legacy: ", legacy_extract(reply, items))
+            print("  current:", current_extract(reply, items))
+
+    calls = args.iterations * len(cases)
+    legacy_s = _time(legacy_extract, cases, args.iterations)
+    current_s = _time(current_extract, cases, args.iterations)
+
+    print(f"recorded replies: {len(cases)}, calls per variant: {calls}")
+    print(f"legacy : {legacy_s * 1e6 / calls:8.1f} µs/reply")
+    print(f"current: {current_s * 1e6 / calls:8.1f} µs/reply")
+    print(f"speedup: {legacy_s / current_s:.2f}x, mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
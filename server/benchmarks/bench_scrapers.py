@@ -0,0 +1,243 @@
+# server/benchmarks/bench_scrapers.py
+"""
+Offline scraper parse harness: correctness + throughput on fixture responses.
+
+Every scraper's parse step runs against the fixtures in data/scrapers/
+(no network). Output is compared with data/scrapers/expected/<name>.json,
+then each parser is timed and reported in events/s and bytes/s. JSON
+decoding is included in the timing, as it is in a real scrape.
+
+The checked-in fixtures are SYNTHETIC: hand-written in each source's
+response shape, not captured from the live sites (see data/scrapers/README.md
+and provenance.json). They exercise the parsers and give stable timings,
+but they are not a regression corpus for the real pages until each one is
+replaced with --record.
+
+Run from server/:
+    python benchmarks/bench_scrapers.py                      # default parser
+    python benchmarks/bench_scrapers.py --parser all         # every installed backend
+    python benchmarks/bench_scrapers.py --parser html.parser --iterations 100
+    python benchmarks/bench_scrapers.py --update-expected    # accept current output
+    python benchmarks/bench_scrapers.py --record             # re-record fixtures (network)
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib.util
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import requests  # noqa: E402
+
+from services.scrapers import parsing  # noqa: E402
+from services.scrapers import brooklyn_bridge_park_scraper as bbp  # noqa: E402
+from services.scrapers import downtown_brooklyn_scraper as downtown  # noqa: E402
+from services.scrapers import nyc_parks_scraper as nyc_parks  # noqa: E402
+from services.scrapers import donyc_scraper as donyc  # noqa: E402
+from services.scrapers import engage_events_service as engage  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "data", "scrapers")
+EXPECTED_DIR = os.path.join(FIXTURE_DIR, "expected")
+# fixture name -> "synthetic" or "recorded <UTC time>"; --record updates it
+PROVENANCE_PATH = os.path.join(FIXTURE_DIR, "provenance.json")
+ENGAGE_PAGE = os.path.join(ROOT, "engage_raw.html")
+
+PARSERS = ["lxml", "html.parser", "html5lib"]
+
+
+def _parse_engage(text):
+    return engage.parse_engage_search(json.loads(text))
+
+
+# name -> fixture file, parse(body text) -> events, live recording request
+SCRAPERS = {
+    "brooklyn_bridge_park": {
+        "fixture": "brooklyn_bridge_park.json",
+        "parse": lambda text: bbp.parse_brooklyn_bridge_park_events(json.loads(text)),
+        "record": lambda: requests.get(bbp.API_URL, params={"per_page": 30}, headers=bbp.HEADERS, timeout=15),
+    },
+    "downtown_brooklyn": {
+        "fixture": "downtown_brooklyn.json",
+        "parse": lambda text: downtown.parse_downtown_bk_events(json.loads(text), limit=30),
+        "record": lambda: requests.get(downtown.API_URL, timeout=15),
+    },
+    "nyc_parks": {
+        "fixture": "nyc_parks.html",
+        "parse": lambda text: nyc_parks.parse_nyc_parks_events(text, limit=30),
+        "record": lambda: requests.get(nyc_parks.URL, headers=nyc_parks.HEADERS, timeout=15),
+    },
+    "donyc_popups": {
+        "fixture": "donyc_popups.html",
+        "parse": lambda text: donyc.parse_donyc_popups(text, limit=40),
+        "record": lambda: requests.get(donyc.POPUPS_URL, headers=donyc.HEADERS, timeout=15),
+    },
+    "engage_search": {
+        "fixture": "engage_search.json",
+        "parse": _parse_engage,
+        "record": None,  # needs a session + token; recorded via EngageClient below
+    },
+}
+
+
+def _installed(parser):
+    if parser == "html.parser":
+        return True
+    return importlib.util.find_spec(parser) is not None
+
+
+def _read(name):
+    with open(os.path.join(FIXTURE_DIR, SCRAPERS[name]["fixture"]), encoding="utf-8") as f:
+        return f.read()
+
+
+def _expected_path(name):
+    return os.path.join(EXPECTED_DIR, f"{name}.json")
+
+
+def _provenance():
+    try:
+        with open(PROVENANCE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _source(name):
+    """"synthetic" unless the fixture was captured with --record."""
+    return "recorded" if _provenance().get(name, "synthetic").startswith("recorded") else "synthetic"
+
+
+def _canonical(events):
+    # Round-trip so tuples/None/etc. compare the way they're stored
+    return json.loads(json.dumps(events, default=str))
+
+
+# ---------------------------------------------------------------------
+# Recording / expectations
+# ---------------------------------------------------------------------
+def record_fixtures():
+    for name, spec in SCRAPERS.items():
+        try:
+            if spec["record"] is None:
+                client = engage.EngageClient()
+                client._token()
+                r = client.session.get(engage.BASE_API, params={"page": 1, "perPage": 50, "status": "approved"},
+                                       headers={"X-XSRF-TOKEN": client._xsrf}, timeout=15)
+            else:
+                r = spec["record"]()
+            r.raise_for_status()
+        except Exception as e:
+            print(f"  {name:22s} NOT recorded ({e})")
+            continue
+        with open(os.path.join(FIXTURE_DIR, spec["fixture"]), "w", encoding="utf-8") as f:
+            f.write(r.text)
+        provenance = _provenance()
+        provenance[name] = "recorded " + time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        with open(PROVENANCE_PATH, "w", encoding="utf-8") as f:
+            json.dump(provenance, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"  {name:22s} recorded {len(r.content):,} bytes")
+
+
+def update_expected():
+    os.makedirs(EXPECTED_DIR, exist_ok=True)
+    for name, spec in SCRAPERS.items():
+        events = _canonical(spec["parse"](_read(name)))
+        with open(_expected_path(name), "w", encoding="utf-8") as f:
+            json.dump(events, f, indent=1, ensure_ascii=False)
+            f.write("\n")
+        print(f"  {name:22s} {len(events)} events")
+
+
+def check(name, events):
+    """Returns None if output matches the expected file, else a message."""
+    try:
+        with open(_expected_path(name), encoding="utf-8") as f:
+            expected = json.load(f)
+    except FileNotFoundError:
+        return "no expected output (run --update-expected)"
+    got = _canonical(events)
+    if got == expected:
+        return None
+    if len(got) != len(expected):
+        return f"{len(got)} events, expected {len(expected)}"
+    for i, (a, b) in enumerate(zip(got, expected)):
+        if a != b:
+            fields = sorted(k for k in set(a) | set(b) if a.get(k) != b.get(k))
+            return f"event {i} differs in {', '.join(fields)}"
+    return "output differs"
+
+
+# ---------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------
+def bench(name, text, iterations):
+    parse = SCRAPERS[name]["parse"]
+    size = len(text.encode("utf-8"))
+    parse(text)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        events = parse(text)
+    elapsed = time.perf_counter() - t0
+    per_parse = elapsed / iterations
+    return events, per_parse, len(events) / per_parse, size / per_parse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parser", default=parsing.HTML_PARSER, choices=PARSERS + ["all"],
+                        help="BeautifulSoup backend (default: %(default)s)")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--only", nargs="*", choices=sorted(SCRAPERS), help="subset of scrapers")
+    parser.add_argument("--update-expected", action="store_true")
+    parser.add_argument("--record", action="store_true", help="re-record fixtures from the live sites")
+    args = parser.parse_args()
+
+    if args.record:
+        print("Recording fixtures:")
+        record_fixtures()
+        return 0
+    if args.update_expected:
+        print("Updating expected output:")
+        update_expected()
+        return 0
+
+    backends = [p for p in PARSERS if _installed(p)] if args.parser == "all" else [args.parser]
+    names = args.only or list(SCRAPERS)
+    failures = 0
+
+    # The Engage page itself is only needed for its XSRF token
+    with open(ENGAGE_PAGE, encoding="utf-8") as f:
+        if not engage._extract_xsrf(f.read()):
+            print("engage_raw.html: no xsrfToken found")
+            failures += 1
+
+    for backend in backends:
+        if not _installed(backend):
+            print(f"\n[{backend}] not installed, skipped")
+            continue
+        parsing.HTML_PARSER = backend
+        print(f"\n[{backend}]  {args.iterations} iterations")
+        print(f"  {'scraper':22s} {'fixture':>9s} {'events':>6s} {'ms/parse':>9s} {'events/s':>10s} {'MB/s':>7s}  check")
+        for name in names:
+            text = _read(name)
+            events, per_parse, eps, bps = bench(name, text, args.iterations)
+            problem = check(name, events)
+            failures += problem is not None
+            print(f"  {name:22s} {_source(name):>9s} {len(events):6d} {per_parse * 1000:9.2f} {eps:10,.0f} "
+                  f"{bps / 1e6:7.2f}  {'ok' if problem is None else 'FAIL: ' + problem}")
+
+    synthetic = [n for n in names if _source(n) == "synthetic"]
+    if synthetic:
+        print(f"\nNote: {len(synthetic)} of {len(names)} fixtures are synthetic (hand-written, not captured from "
+              f"the live sites): checks show the parsers are stable on them, not that they match the real pages. "
+              f"Re-record with --record.")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+# server/gunicorn.conf.py
+"""
+Gunicorn hooks (picked up automatically from the working directory).
+
+The master process starts the background workers as sibling processes so
+scraping and batch jobs never happen inside request workers:
+
+  EVENT_INGESTION=master        event ingestion (default on)
+  NOTIFICATION_MATCHER=master   free-slot/event notification matcher (default off)
+  NOTIFICATION_WORKER=master    push notification delivery (default off)
+
+Set a variable to "off" when that job runs elsewhere (cron, a dedicated
+worker service).
+"""
+import os
+import sys
+import subprocess
+
+# (env var, default, module, label)
+_BACKGROUND_WORKERS = [
+    ("EVENT_INGESTION", "master", "services.event_ingestion", "Event ingestion"),
+    ("NOTIFICATION_MATCHER", "off", "services.notification_matcher", "Notification matcher"),
+    ("NOTIFICATION_WORKER", "off", "services.notification_worker", "Notification delivery"),
+]
+
+_processes = []
+
+
+def when_ready(server):
+    for env_var, default, module, label in _BACKGROUND_WORKERS:
+        if os.getenv(env_var, default).lower() == "off":
+            server.log.info(f"{label} disabled ({env_var}=off)")
+            continue
+        process = subprocess.Popen(
+            [sys.executable, "-m", module],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        _processes.append(process)
+        server.log.info(f"{label} worker started (pid {process.pid})")
+
+
+def on_exit(server):
+    for process in _processes:
+        if process.poll() is None:
+            process.terminate()
+    for process in _processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
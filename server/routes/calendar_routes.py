@@ -1,8 +1,144 @@
 # routes/calendar_routes.py
 # Calendar routes - System calendar only (Google Calendar removed)
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, g
+from datetime import timedelta
+import time
+import logging
+
+from utils.auth import require_auth
+import utils.limiter as limiter_module
+from utils.validation import validate_coordinates
+from utils.datetime_utils import now_local, parse_datetime
+from services.free_time_recommender import plan_day
+from services.free_slots import BusySchedule, end_of_day, slot_dict
+from services.notification_matcher import save_free_slots, clear_free_slots, MIN_SLOT_MINUTES
+from services.free_time_cache import schedule_precompute, store_from_plan, clear_next_suggestion
 
 calendar_bp = Blueprint("calendar", __name__)
+logger = logging.getLogger(__name__)
 
 # All Google Calendar-dependent routes have been removed
 # The app now uses system calendar only (handled client-side)
+
+MAX_DAY_PLAN_EVENTS = 200
+# Free slots uploaded for notifications may cover up to this many days
+MAX_FREE_SLOT_DAYS = 7
+
+
+def _events_payload(data):
+    """The "events" list from a request body, or an error response."""
+    events = data.get("events") or []
+    if not isinstance(events, list) or not all(isinstance(ev, dict) for ev in events):
+        return None, (jsonify({"error": "events must be a list of {start, end} objects"}), 400)
+    if len(events) > MAX_DAY_PLAN_EVENTS:
+        return None, (jsonify({"error": f"At most {MAX_DAY_PLAN_EVENTS} events per request"}), 400)
+    return events, None
+
+
+def _coordinates_payload(data):
+    """(latitude, longitude) from a request body (both None if absent), or an error response."""
+    user_lat = data.get("latitude")
+    user_lng = data.get("longitude")
+    if user_lat is None or user_lng is None:
+        return (None, None), None
+    try:
+        user_lat, user_lng = float(user_lat), float(user_lng)
+    except (ValueError, TypeError):
+        return None, (jsonify({"error": "Invalid latitude/longitude format"}), 400)
+    is_valid, error_msg = validate_coordinates(user_lat, user_lng)
+    if not is_valid:
+        return None, (jsonify({"error": error_msg}), 400)
+    return (user_lat, user_lng), None
+
+
+@calendar_bp.route("/day_plan", methods=["POST"])
+@require_auth
+@limiter_module.limiter.limit("10 per minute")
+def day_plan():
+    """
+    Plan the rest of today in one call.
+    Body: {"events": [{start, end}, ...], "latitude": float, "longitude": float}
+    The client sends today's events from the device calendar; every free
+    block comes back with its suggestion.
+    """
+    req_id = g.get("request_id", "unknown")
+    uploaded_at = time.time()
+    data = request.get_json(force=True) or {}
+
+    events, error = _events_payload(data)
+    if error:
+        return error
+
+    coords, error = _coordinates_payload(data)
+    if error:
+        return error
+    user_lat, user_lng = coords
+
+    try:
+        plan = plan_day(events, g.current_user.get_preferences(), user_lat=user_lat, user_lng=user_lng)
+    except Exception as e:
+        logger.error(f"[{req_id}] Day plan error: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error", "request_id": req_id}), 500
+
+    # The dashboard serves the next block's suggestion from here
+    store_from_plan(g.current_user.id, plan, uploaded_at)
+    return jsonify(plan), 200
+
+
+@calendar_bp.route("/free_slots", methods=["POST", "DELETE"])
+@require_auth
+@limiter_module.limiter.limit("30 per minute")
+def free_slots():
+    """
+    Upload free time for event notifications (matched by the scheduled
+    notification matcher). Either send the free slots directly:
+        {"free_slots": [{start, end}, ...]}
+    or the calendar events and let the server compute them:
+        {"events": [{start, end}, ...], "days": 1}
+    Optional "latitude"/"longitude" anchor the next free block's suggestion,
+    which is precomputed in the background for GET /api/dashboard.
+    Each upload replaces the previous one. DELETE removes them.
+    """
+    user = g.current_user
+    req_id = g.get("request_id", "unknown")
+
+    if request.method == "DELETE":
+        clear_free_slots(user.id)
+        clear_next_suggestion(user.id)
+        return jsonify({"status": "ok"}), 200
+
+    data = request.get_json(force=True) or {}
+    now = now_local()
+
+    coords, error = _coordinates_payload(data)
+    if error:
+        return error
+    busy = []
+
+    if "free_slots" in data:
+        raw = data.get("free_slots")
+        if not isinstance(raw, list) or len(raw) > MAX_DAY_PLAN_EVENTS:
+            return jsonify({"error": f"free_slots must be a list of at most {MAX_DAY_PLAN_EVENTS} {{start, end}} objects"}), 400
+        slots = []
+        for item in raw:
+            start = parse_datetime(item.get("start")) if isinstance(item, dict) else None
+            end = parse_datetime(item.get("end")) if isinstance(item, dict) else None
+            if start is None or end is None or end <= start:
+                return jsonify({"error": "Each free slot needs a start before its end"}), 400
+            slots.append((start, end))
+    else:
+        events, error = _events_payload(data)
+        if error:
+            return error
+        try:
+            days = max(1, min(int(data.get("days", 1)), MAX_FREE_SLOT_DAYS))
+        except (ValueError, TypeError):
+            return jsonify({"error": "days must be an integer"}), 400
+        until = end_of_day(now + timedelta(days=days - 1))
+        busy = BusySchedule.from_events(events)
+        slots = busy.free_slots(now, until, min_minutes=MIN_SLOT_MINUTES)
+
+    stored = save_free_slots(user.id, slots)
+    logger.info(f"[{req_id}] Stored {len(stored)} free slots for user {user.id}")
+    schedule_precompute(user.id, stored, busy, user.get_preferences(), user_lat=coords[0], user_lng=coords[1])
+    return jsonify({"free_slots": [slot_dict(s, e) for s, e in stored]}), 200
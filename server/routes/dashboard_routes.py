@@ -1,16 +1,62 @@
 # routes/dashboard_routes.py
-from flask import Blueprint, jsonify, g, request
+from flask import Blueprint, current_app, jsonify, g, request
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
 import logging
 
 from utils.auth import require_auth
 import utils.limiter as limiter_module
+from utils.validation import validate_coordinates
 
 from services.weather_service import current_weather
 from services.recommendation.quick_recommendations import get_quick_recommendations
+from services.recommendation.candidate_pool import CandidatePool
+from services.recommendation.tile_cache import TileCache, content_etag, tile_origin
+from services.free_time_cache import read_next_suggestion
 
 dashboard_bp = Blueprint("dashboard", __name__)
 logger = logging.getLogger(__name__)
 
+DASHBOARD_CATEGORIES = ["quick_bites", "cozy_cafes", "explore", "events"]
+DASHBOARD_LIMIT = 6
+# Sections still running after this are returned empty (they finish in the background)
+SECTION_DEADLINE_SECONDS = 12
+
+# Weather is city-wide: one upstream call per 15-minute bucket for everyone
+_WEATHER_CACHE = TileCache("weather", max_local_entries=4)
+
+
+def _weather():
+    return _WEATHER_CACHE.get(("brooklyn",), current_weather)
+
+
+def _category_places(category, user_lat, user_lng, pool):
+    return get_quick_recommendations(category, limit=DASHBOARD_LIMIT, user_lat=user_lat, user_lng=user_lng,
+                                     pool=pool).get("places", [])
+
+
+def _run_sections(sections, req_id):
+    """
+    Run each {name: fn} concurrently under SECTION_DEADLINE_SECONDS.
+    Returns {name: result}; failed or late sections are left out.
+    """
+    executor = ThreadPoolExecutor(max_workers=len(sections), thread_name_prefix="dashboard")
+    try:
+        futures = {name: executor.submit(fn) for name, fn in sections.items()}
+        done, not_done = wait(futures.values(), timeout=SECTION_DEADLINE_SECONDS)
+        results = {}
+        for name, future in futures.items():
+            if future not in done:
+                logger.warning(f"[{req_id}] Dashboard section {name} missed the {SECTION_DEADLINE_SECONDS}s deadline")
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"[{req_id}] Dashboard section {name} error: {e}", exc_info=True)
+        return results
+    finally:
+        executor.shutdown(wait=False)
+
 
 @dashboard_bp.route("/dashboard", methods=["GET"])
 @require_auth
@@ -29,23 +75,7 @@ def dashboard():
     logger.info(f"[{req_id}] Dashboard request from user {user.id} (email: {user.email})")
 
     # ------------------------------------------------------
-    # WEATHER
-    # ------------------------------------------------------
-    try:
-        weather = current_weather()
-    except Exception as e:
-        logger.error(f"[{req_id}] Weather fetch error: {e}", exc_info=True)
-        weather = {"error": "Weather unavailable"}
-
-    # ------------------------------------------------------
-    # CALENDAR
-    # System calendar is handled entirely client-side on iOS
-    # The backend does not fetch calendar data - it's managed by the device
-    # Calendar events are processed locally in the iOS app using EventKit
-    # ------------------------------------------------------
-
-    # ------------------------------------------------------
-    # QUICK RECOMMENDATIONS (all 4 categories)
+    # LOCATION
     # ------------------------------------------------------
     # Get location from request if provided
     user_lat = None
@@ -57,7 +87,6 @@ def dashboard():
             user_lat = float(lat_raw)
             user_lng = float(lng_raw)
             # Validate coordinates
-            from utils.validation import validate_coordinates
             is_valid, error_msg = validate_coordinates(user_lat, user_lng)
             if not is_valid:
                 logger.warning(f"[{req_id}] Invalid coordinates: {error_msg}")
@@ -67,43 +96,57 @@ def dashboard():
             logger.warning(f"[{req_id}] Invalid latitude/longitude format: {lat_raw}, {lng_raw}")
             user_lat = None
             user_lng = None
-    
-    quick_recs = {}
+
+    # ------------------------------------------------------
+    # WEATHER + QUICK RECOMMENDATIONS (all 4 categories)
+    # Fetched concurrently; the place categories share one CandidatePool
+    # so overlapping place-type and route lookups happen once
+    # ------------------------------------------------------
+    sections = {"weather": _weather}
+    if user_lat is not None and user_lng is not None:
+        # Place categories come from the shared geo-tile cache, computed at the tile center
+        pool = CandidatePool(*tile_origin(user_lat, user_lng))
+        for category in DASHBOARD_CATEGORIES:
+            sections[category] = partial(_category_places, category, user_lat, user_lng, pool)
+    else:
+        # No location available - return empty recommendations
+        logger.info(f"[{req_id}] No location provided, returning empty recommendations")
+
+    results = _run_sections(sections, req_id)
+
+    weather = results.get("weather") or {"error": "Weather unavailable"}
+    quick_recs = {category: results.get(category) or [] for category in DASHBOARD_CATEGORIES}
+
+    # ------------------------------------------------------
+    # CALENDAR
+    # System calendar is handled entirely client-side on iOS
+    # The backend does not fetch calendar data - it's managed by the device
+    # Calendar events are processed locally in the iOS app using EventKit
+    # The next free block's suggestion is precomputed when the app uploads
+    # its calendar window (POST /api/calendar/free_slots or /day_plan);
+    # here it is only read back, never computed
+    # ------------------------------------------------------
     try:
-        # Only fetch recommendations if location is available
-        if user_lat is not None and user_lng is not None:
-            quick_recs = {
-                "quick_bites": get_quick_recommendations("quick_bites", limit=6, user_lat=user_lat, user_lng=user_lng).get("places", []),
-                "cozy_cafes": get_quick_recommendations("cozy_cafes", limit=6, user_lat=user_lat, user_lng=user_lng).get("places", []),
-                "explore": get_quick_recommendations("explore", limit=6, user_lat=user_lat, user_lng=user_lng).get("places", []),
-                "events": get_quick_recommendations("events", limit=6, user_lat=user_lat, user_lng=user_lng).get("places", []),
-            }
-        else:
-            # No location available - return empty recommendations
-            logger.info(f"[{req_id}] No location provided, returning empty recommendations")
-            quick_recs = {
-                "quick_bites": [],
-                "cozy_cafes": [],
-                "explore": [],
-                "events": [],
-            }
+        free_time = read_next_suggestion(user.id) or {}
     except Exception as e:
-        logger.error(f"[{req_id}] Quick recommendations error: {e}", exc_info=True)
-        quick_recs = {
-            "quick_bites": [],
-            "cozy_cafes": [],
-            "explore": [],
-            "events": [],
-        }
+        logger.error(f"[{req_id}] Free-time suggestion read error: {e}", exc_info=True)
+        free_time = {}
 
     # ------------------------------------------------------
     # FINAL RESPONSE PACKAGE
     # ------------------------------------------------------
-    return jsonify({
+    payload = {
         "weather": weather,
         "calendar_linked": False,  # System calendar only - handled client-side
-        "next_free": None,
-        "free_time_suggestion": None,
+        "next_free": free_time.get("next_free"),
+        "free_time_suggestion": free_time.get("free_time_suggestion"),
         "quick_recommendations": quick_recs,
-    }), 200
+    }
+    etag = content_etag(payload)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    return response
 
@@ -1,46 +1,130 @@
-import puppeteer from "puppeteer";
+// Brooklyn Public Library events (discover.bklynlibrary.org is a React app,
+// so it needs a real browser).
+//
+//   node scrape_bpl.js            one-shot: print events as JSON and exit
+//   node scrape_bpl.js --worker   long-lived: one warm browser, JSON-lines jobs
+//
+// Worker protocol (one JSON object per line):
+//   stdin:  {"id": 1, "cmd": "scrape", "limit": 20, "timeout_ms": 25000}
+//           {"id": 2, "cmd": "ping"}
+//   stdout: {"id": 1, "ok": true, "events": [...]}
+//           {"id": 1, "ok": false, "error": "..."}
+// Logs go to stderr so stdout stays machine-readable.
+// Driven from Python by services/scrapers/bpl_worker.py.
 
-async function scrapeBrooklynLibrary() {
-  const browser = await puppeteer.launch({
+const puppeteer = require("puppeteer");
+const readline = require("readline");
+
+const EVENTS_URL = "https://discover.bklynlibrary.org/?event";
+const DEFAULT_TIMEOUT_MS = 25000;
+
+let browser = null;
+
+async function getBrowser() {
+  if (browser && browser.connected) return browser;
+  browser = await puppeteer.launch({
     headless: "new",
     args: ["--no-sandbox", "--disable-setuid-sandbox"]
   });
+  browser.on("disconnected", () => { browser = null; });
+  return browser;
+}
 
-  const page = await browser.newPage();
+async function scrapeBrooklynLibrary(limit = 20, timeoutMs = DEFAULT_TIMEOUT_MS) {
+  const deadline = Date.now() + timeoutMs;
+  const remaining = () => Math.max(1000, deadline - Date.now());
 
-  await page.goto("https://discover.bklynlibrary.org/?event", {
-    waitUntil: "networkidle2",
-    timeout: 0,
-  });
+  const page = await (await getBrowser()).newPage();
+  try {
+    await page.goto(EVENTS_URL, {
+      waitUntil: "networkidle2",
+      timeout: remaining(),
+    });
+
+    // Wait for React cards to load
+    await page.waitForSelector(".MuiCard-root", { timeout: remaining() });
 
-  // Wait for React cards to load
-  await page.waitForSelector(".MuiCard-root", { timeout: 30000 });
+    return await page.evaluate((limit) => {
+      const cards = [...document.querySelectorAll(".MuiCard-root")];
 
-  const events = await page.evaluate(() => {
-    const cards = [...document.querySelectorAll(".MuiCard-root")];
+      return cards.slice(0, limit).map(card => {
+        const title = card.querySelector("h2,h3")?.innerText || null;
 
-    return cards.slice(0, 20).map(card => {
-      const title = card.querySelector("h2,h3")?.innerText || null;
+        const date = card.querySelector("time")?.innerText || null;
 
-      const date = card.querySelector("time")?.innerText || null;
+        const timeNode = [...card.querySelectorAll("svg + span")].find(
+          n => n.innerText.includes("am") || n.innerText.includes("pm")
+        );
+        const time = timeNode?.innerText || null;
 
-      const timeNode = [...card.querySelectorAll("svg + span")].find(
-        n => n.innerText.includes("am") || n.innerText.includes("pm")
-      );
-      const time = timeNode?.innerText || null;
+        const location = card.querySelector("[data-testid='LocationOnIcon'] ~ p")
+          ?.innerText || null;
 
-      const location = card.querySelector("[data-testid='LocationOnIcon'] ~ p")
-        ?.innerText || null;
+        const url = card.querySelector("a[href]")?.href || null;
+
+        return { title, date, time, location, url };
+      });
+    }, limit);
+  } finally {
+    // Pages are per job; the browser stays up for the next one
+    await page.close().catch(() => {});
+  }
+}
 
-      return { title, date, time, location };
+function send(message) {
+  process.stdout.write(JSON.stringify(message) + "\n");
+}
+
+async function runWorker() {
+  await getBrowser();
+  send({ id: null, ok: true, ready: true });
+
+  const rl = readline.createInterface({ input: process.stdin });
+  // Jobs run one at a time, in order
+  let queue = Promise.resolve();
+
+  rl.on("line", (line) => {
+    queue = queue.then(async () => {
+      let job;
+      try {
+        job = JSON.parse(line);
+      } catch (e) {
+        send({ id: null, ok: false, error: `bad job: ${e.message}` });
+        return;
+      }
+      try {
+        if (job.cmd === "ping") {
+          send({ id: job.id, ok: true });
+        } else if (job.cmd === "scrape") {
+          const events = await scrapeBrooklynLibrary(job.limit || 20, job.timeout_ms || DEFAULT_TIMEOUT_MS);
+          send({ id: job.id, ok: true, events });
+        } else {
+          send({ id: job.id, ok: false, error: `unknown cmd: ${job.cmd}` });
+        }
+      } catch (e) {
+        console.error(`BPL job ${job.id} failed: ${e.message}`);
+        send({ id: job.id, ok: false, error: e.message });
+      }
     });
   });
 
-  await browser.close();
-  return events;
+  // Parent went away: shut the browser down with us
+  rl.on("close", async () => {
+    await queue;
+    if (browser) await browser.close().catch(() => {});
+    process.exit(0);
+  });
 }
 
-// Run directly
-scrapeBrooklynLibrary().then(events => {
-  console.log(JSON.stringify(events, null, 2));
-});
+if (process.argv.includes("--worker")) {
+  runWorker().catch((e) => {
+    console.error(`BPL worker failed to start: ${e.message}`);
+    process.exit(1);
+  });
+} else {
+  // Run directly
+  scrapeBrooklynLibrary().then(async (events) => {
+    console.log(JSON.stringify(events, null, 2));
+    if (browser) await browser.close();
+  });
+}
@@ -0,0 +1,129 @@
+# server/scripts/train_intent_classifier.py
+"""
+Train the local intent classifier from labeled chat messages.
+
+Each line of the labeled file is {"message", "intent_type", "vibe"}; the seed
+set starts from the chat_test_suite.py prompts. Prints hold-out accuracy,
+picks each head's confidence threshold on the hold-out set (the lowest
+probability at which hold-out precision still reaches --target-precision),
+retrains on everything and writes the .npz model, thresholds included,
+loaded at startup.
+
+Run from server/:
+    python scripts/train_intent_classifier.py [--data data/intent_messages.jsonl] [--out data/intent_classifier.npz]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from services.recommendation.intent_classifier import (  # noqa: E402
+    IntentClassifier,
+    HEADS,
+    DEFAULT_MODEL_PATH,
+    FALLBACK_MIN_CONFIDENCE,
+)
+
+DEFAULT_DATA = os.path.join(ROOT, "data", "intent_messages.jsonl")
+
+
+def load_rows(path):
+    rows = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rows.append(json.loads(line))
+    return rows
+
+
+def fit(rows, args):
+    return IntentClassifier.train(
+        [r["message"] for r in rows],
+        {head: [r[head] for r in rows] for head in HEADS},
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+    )
+
+
+def pick_threshold(scored, target_precision, min_support):
+    """
+    scored: [(probability, correct)] on the hold-out set. Lowest probability p
+    such that predictions at or above p are at least target_precision correct,
+    over at least min_support of them; None if no p qualifies.
+    """
+    threshold, correct = None, 0
+    for n, (prob, ok) in enumerate(sorted(scored, key=lambda s: -s[0]), start=1):
+        correct += ok
+        if n >= min_support and correct / n >= target_precision:
+            threshold = prob
+    return threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--out", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--epochs", type=int, default=600)
+    parser.add_argument("--learning-rate", type=float, default=4.0)
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of rows held out for evaluation")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--target-precision", type=float, default=0.95,
+                        help="hold-out precision the confidence thresholds are picked for")
+    parser.add_argument("--min-support", type=int, default=10,
+                        help="fewest hold-out predictions a threshold may be picked from")
+    args = parser.parse_args()
+
+    rows = load_rows(args.data)
+    print(f"labeled messages: {len(rows)}")
+
+    thresholds = {}
+
+    if args.holdout > 0:
+        shuffled = rows[:]
+        random.Random(args.seed).shuffle(shuffled)
+        n_test = max(1, int(len(shuffled) * args.holdout))
+        test, train = shuffled[:n_test], shuffled[n_test:]
+        model = fit(train, args)
+        for head in HEADS:
+            scored = []
+            for r in test:
+                label, prob = model.predict(r["message"])[head]
+                scored.append((prob, label == r[head]))
+            correct = sum(ok for _, ok in scored)
+            print(f"hold-out {head:12}: {correct}/{len(test)} ({correct / len(test):.0%})")
+
+            threshold = pick_threshold(scored, args.target_precision, args.min_support)
+            if threshold is None:
+                # Nothing is precise enough: never trust this head
+                threshold = 1.0
+                print(f"  threshold: none reaches {args.target_precision:.0%} precision; head disabled")
+            else:
+                kept = [ok for prob, ok in scored if prob >= threshold]
+                print(f"  threshold: p >= {threshold:.3f} -> precision {sum(kept) / len(kept):.0%}, "
+                      f"coverage {len(kept)}/{len(test)} ({len(kept) / len(test):.0%})")
+            thresholds[head] = round(threshold, 3)
+    else:
+        print(f"no hold-out set: predictions need p >= {FALLBACK_MIN_CONFIDENCE} at runtime")
+
+    model = fit(rows, args)
+    model.thresholds = thresholds
+    model.save(args.out)
+    print(f"model written to {args.out}")
+
+    messages = [r["message"] for r in rows]
+    start = time.perf_counter()
+    for message in messages:
+        model.predict(message)
+    per_call = (time.perf_counter() - start) / len(messages)
+    print(f"predict: {per_call * 1e6:.0f} µs/message")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,13 @@
 # services/calendar_suggestion_service.py
 
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
 import logging
 
-logger = logging.getLogger(__name__)
-
-
-# ------------------------------------------------------------
-# Normalize calendar event object (works with any calendar format)
-# ------------------------------------------------------------
-def normalize_event(ev):
-    """
-    Convert a calendar event dict (from system calendar or any source) into parsed start/end datetimes.
-    Missing end → assume +1 hour.
-    Works with both system calendar and other calendar formats.
-    """
-    start_str = ev.get("start")
-    end_str = ev.get("end")
+from services.free_slots import as_schedule, current_or_next, end_of_day, find_free_slots, slot_dict
+from utils.datetime_utils import now_local, ensure_aware, parse_datetime
 
-    if not start_str:
-        return None
-
-    try:
-        start = datetime.fromisoformat(start_str)
-    except Exception as e:
-        logger.debug(f"Failed to parse event start time: {e}")
-        return None
-
-    if end_str:
-        try:
-            end = datetime.fromisoformat(end_str)
-        except Exception as e:
-            logger.debug(f"Failed to parse event end time, using default: {e}")
-            end = start + timedelta(hours=1)
-    else:
-        end = start + timedelta(hours=1)
-
-    return {"start": start, "end": end}
+logger = logging.getLogger(__name__)
 
 
 # ------------------------------------------------------------
@@ -50,30 +20,36 @@ def compute_next_free_block(free_blocks):
     Returns the block happening now or the next one.
     """
 
-    tz = pytz.timezone("America/New_York")
-    now = datetime.now(tz)
-
     parsed = []
     for b in free_blocks:
-        try:
-            s = datetime.fromisoformat(b["start"])
-            e = datetime.fromisoformat(b["end"])
-            parsed.append((s, e))
-        except Exception as e:
-            logger.debug(f"Failed to parse free block: {e}")
+        s, e = parse_datetime(b.get("start")), parse_datetime(b.get("end"))
+        if s is None or e is None:
+            logger.debug(f"Failed to parse free block: {b}")
             continue
+        parsed.append((s, e))
 
     if not parsed:
         logger.debug("No valid free blocks found")
         return None
 
-    for (start, end) in parsed:
-        if start <= now < end:
-            return {"start": start.isoformat(), "end": end.isoformat()}
-        if start > now:
-            return {"start": start.isoformat(), "end": end.isoformat()}
+    block = current_or_next(parsed, now_local())
+    if block is None:
+        return None
+    return {"start": block[0].isoformat(), "end": block[1].isoformat()}
 
-    return None
+
+# ------------------------------------------------------------
+# find_free_blocks: every gap from now to the end of today
+# ------------------------------------------------------------
+def find_free_blocks(events, now=None):
+    """
+    events = [{start: ISO, end: ISO}, ...] or a BusySchedule
+
+    Returns every free block between now and the end of today, in order:
+    [{start: ISO, end: ISO, duration_minutes: int}, ...]
+    """
+    now = ensure_aware(now) if now else now_local()
+    return find_free_slots(events, now, end_of_day(now))
 
 
 # ------------------------------------------------------------
@@ -85,60 +61,9 @@ def find_next_free_block(events):
 
     Returns the next free block between events.
     """
-
-    tz = pytz.timezone("America/New_York")
-    now = datetime.now(tz)
-
-    today_events = []
-    for ev in events:
-        n = normalize_event(ev)
-        if n and n["end"].date() == now.date():
-            today_events.append(n)
-
-    today_events.sort(key=lambda x: x["start"])
-
-    if not today_events:
-        end_of_day = datetime.combine(now.date(), datetime.max.time()).replace(tzinfo=tz)
-        return {
-            "start": now.isoformat(),
-            "end": end_of_day.isoformat(),
-            "duration_minutes": int((end_of_day - now).total_seconds() // 60),
-        }
-
-    first = today_events[0]
-    if now < first["start"]:
-        return {
-            "start": now.isoformat(),
-            "end": first["start"].isoformat(),
-            "duration_minutes": int((first["start"] - now).total_seconds() // 60),
-        }
-
-    for i in range(len(today_events) - 1):
-        cur = today_events[i]
-        nxt = today_events[i + 1]
-
-        gap_start = max(now, cur["end"])
-        gap_end = nxt["start"]
-
-        if gap_start < gap_end:
-            return {
-                "start": gap_start.isoformat(),
-                "end": gap_end.isoformat(),
-                "duration_minutes": int((gap_end - gap_start).total_seconds() // 60),
-            }
-
-    last = today_events[-1]
-    gap_start = max(now, last["end"])
-    end_of_day = datetime.combine(now.date(), datetime.max.time()).replace(tzinfo=tz)
-
-    if gap_start < end_of_day:
-        return {
-            "start": gap_start.isoformat(),
-            "end": end_of_day.isoformat(),
-            "duration_minutes": int((end_of_day - gap_start).total_seconds() // 60),
-        }
-
-    return None
+    now = now_local()
+    block = as_schedule(events).next_free(now, end_of_day(now))
+    return slot_dict(*block) if block else None
 
 
 # ------------------------------------------------------------
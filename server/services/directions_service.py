@@ -11,6 +11,25 @@ logger = logging.getLogger(__name__)
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 
+def maps_directions_link(
+    dest_lat: float,
+    dest_lng: float,
+    origin_lat: Optional[float] = None,
+    origin_lng: Optional[float] = None,
+    mode: str = "walking",
+) -> str:
+    """
+    Google Maps directions URL (no API call). Without an origin, Maps
+    routes from the device's current location.
+    """
+    params = {"api": 1}
+    if origin_lat is not None and origin_lng is not None:
+        params["origin"] = f"{origin_lat},{origin_lng}"
+    params["destination"] = f"{dest_lat},{dest_lng}"
+    params["travelmode"] = mode
+    return f"https://www.google.com/maps/dir/?{urllib.parse.urlencode(params)}"
+
+
 def get_distance_matrix(
     origin_lat: float,
     origin_lng: float,
@@ -142,13 +161,7 @@ def _get_directions_for_mode(
         if not routes:
             # If Directions API fails but Distance Matrix worked, return that
             if distance_matrix:
-                q = urllib.parse.urlencode({
-                    "api": 1,
-                    "origin": f"{origin_lat},{origin_lng}",
-                    "destination": f"{dest_lat},{dest_lng}",
-                    "travelmode": mode
-                })
-                maps_link = f"https://www.google.com/maps/dir/?{q}"
+                maps_link = maps_directions_link(dest_lat, dest_lng, origin_lat, origin_lng, mode)
                 return {
                     "duration_seconds": distance_matrix.get("duration_seconds", 0),
                     "duration_text": distance_matrix.get("duration_text"),
@@ -191,13 +204,7 @@ def _get_directions_for_mode(
                 logger.warning(f"Error decoding polyline: {e}")
                 polyline_points = _decode_polyline_fallback(overview_polyline)
 
-        q = urllib.parse.urlencode({
-            "api": 1,
-            "origin": f"{origin_lat},{origin_lng}",
-            "destination": f"{dest_lat},{dest_lng}",
-            "travelmode": mode
-        })
-        maps_link = f"https://www.google.com/maps/dir/?{q}"
+        maps_link = maps_directions_link(dest_lat, dest_lng, origin_lat, origin_lng, mode)
 
         return {
             "duration_seconds": duration_seconds,
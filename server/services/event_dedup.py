@@ -0,0 +1,171 @@
+# services/event_dedup.py
+"""
+Cross-source event deduplication, run at ingest.
+
+Downtown Brooklyn, Brooklyn Bridge Park and NYC Parks often list the same
+event with slightly different titles ("Movies With a View: Jaws" vs
+"Movies with a View – JAWS (1975)"). Events from different sources are
+merged when their titles are similar, their start times are close and
+their locations don't contradict each other. Each cluster becomes one
+canonical record that keeps every source link, so directions and scoring
+only see it once.
+"""
+
+from __future__ import annotations
+import re
+import html
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.location_utils import haversine
+from utils.datetime_utils import parse_datetime
+
+# Starts further apart than this are different events (or sessions)
+START_WINDOW_SECONDS = 90 * 60
+
+# Title similarity needed when locations agree / are unknown or generic
+TITLE_THRESHOLD_LOCATION_MATCH = 0.75
+TITLE_THRESHOLD = 0.85
+
+# Events with coordinates further apart than this are never merged
+MAX_DISTANCE_METERS = 500
+
+_STOPWORDS = {"the", "a", "an", "at", "in", "on", "of", "and", "with", "for", "free", "nyc"}
+
+# Placeholder locations scrapers fill in when a listing has none
+_GENERIC_LOCATIONS = {"nyc park event", "downtown brooklyn", "brooklyn", "new york", "nyc"}
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    text = _NON_WORD.sub(" ", html.unescape(text).lower())
+    return [t for t in text.split() if t not in _STOPWORDS]
+
+
+def title_similarity(a: Optional[str], b: Optional[str]) -> float:
+    """
+    0..1 similarity of two titles: the better of a character-level ratio and
+    token overlap (so "Jaws" vs "Movies With a View: Jaws (1975)" still counts).
+    """
+    ta, tb = _tokens(a), _tokens(b)
+    if not ta or not tb:
+        return 0.0
+    ratio = SequenceMatcher(None, " ".join(ta), " ".join(tb)).ratio()
+    sa, sb = set(ta), set(tb)
+    overlap = len(sa & sb) / min(len(sa), len(sb)) if min(len(sa), len(sb)) >= 2 else 0.0
+    return max(ratio, overlap)
+
+
+def _coords(ev: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    loc = ev.get("location")
+    if isinstance(loc, dict) and loc.get("lat") is not None and loc.get("lng") is not None:
+        return float(loc["lat"]), float(loc["lng"])
+    if ev.get("lat") is not None and ev.get("lng") is not None:
+        return float(ev["lat"]), float(ev["lng"])
+    return None
+
+
+def _place_text(ev: Dict[str, Any]) -> Optional[str]:
+    for key in ("address", "location"):
+        value = ev.get(key)
+        if isinstance(value, str) and value.strip().lower() not in _GENERIC_LOCATIONS:
+            return value
+    return None
+
+
+def location_agreement(a: Dict[str, Any], b: Dict[str, Any]) -> Optional[bool]:
+    """True if the locations match, False if they contradict, None if unknown."""
+    ca, cb = _coords(a), _coords(b)
+    if ca and cb:
+        return haversine(ca[0], ca[1], cb[0], cb[1]) <= MAX_DISTANCE_METERS
+
+    pa, pb = _tokens(_place_text(a)), _tokens(_place_text(b))
+    if pa and pb:
+        sa, sb = set(pa), set(pb)
+        return len(sa & sb) / min(len(sa), len(sb)) >= 0.5
+    return None
+
+
+def is_duplicate(a: Dict[str, Any], b: Dict[str, Any], a_start: float, b_start: float) -> bool:
+    if abs(a_start - b_start) > START_WINDOW_SECONDS:
+        return False
+    located = location_agreement(a, b)
+    if located is False and _coords(a) and _coords(b):
+        return False
+    threshold = TITLE_THRESHOLD_LOCATION_MATCH if located else TITLE_THRESHOLD
+    return title_similarity(a.get("name"), b.get("name")) >= threshold
+
+
+def _richness(ev: Dict[str, Any]) -> Tuple[int, int]:
+    filled = sum(1 for v in ev.values() if v not in (None, "", [], {}))
+    return filled + (3 if _coords(ev) else 0), len(ev.get("description") or "")
+
+
+def _source_link(ev: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "source": ev.get("source"),
+        "id": ev.get("id"),
+        "url": ev.get("url") or ev.get("maps_link"),
+    }
+
+
+def _merge(cluster: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Richest record wins; empty fields are filled from the others."""
+    ranked = sorted(cluster, key=_richness, reverse=True)
+    canonical = dict(ranked[0])
+    for other in ranked[1:]:
+        for key, value in other.items():
+            if canonical.get(key) in (None, "", [], {}) and value not in (None, "", [], {}):
+                canonical[key] = value
+    canonical["sources"] = [_source_link(ev) for ev in ranked]
+    canonical["duplicate_ids"] = [ev.get("id") for ev in ranked[1:]]
+    return canonical
+
+
+def dedupe_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Collapse cross-source duplicates into canonical records.
+    Events without a parseable start are passed through untouched; order is
+    otherwise by start time.
+    """
+    timed: List[Tuple[float, Dict[str, Any]]] = []
+    untimed: List[Dict[str, Any]] = []
+    for ev in events:
+        start = parse_datetime(ev.get("start"))
+        if start is None:
+            untimed.append(ev)
+        else:
+            timed.append((start.timestamp(), ev))
+    timed.sort(key=lambda t: t[0])
+
+    # clusters: [first start, members, sources in cluster]
+    clusters: List[Tuple[float, List[Dict[str, Any]], set]] = []
+    open_from = 0
+    for start, ev in timed:
+        # Clusters whose first start is out of the window can't match anything later
+        while open_from < len(clusters) and start - clusters[open_from][0] > START_WINDOW_SECONDS:
+            open_from += 1
+
+        best = None
+        best_score = 0.0
+        for i in range(open_from, len(clusters)):
+            c_start, members, sources = clusters[i]
+            if ev.get("source") in sources:
+                continue
+            head = members[0]
+            if is_duplicate(head, ev, c_start, start):
+                score = title_similarity(head.get("name"), ev.get("name"))
+                if score > best_score:
+                    best, best_score = i, score
+
+        if best is None:
+            clusters.append((start, [ev], {ev.get("source")}))
+        else:
+            clusters[best][1].append(ev)
+            clusters[best][2].add(ev.get("source"))
+
+    result = [members[0] if len(members) == 1 else _merge(members) for _, members, _ in clusters]
+    return result + untimed
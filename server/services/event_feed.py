@@ -0,0 +1,168 @@
+# services/event_feed.py
+"""
+Paged, incremental reads of the event snapshot for API clients.
+
+Pages are ordered by (start, id) and the cursor is the last (start, id)
+returned, so paging stays consistent even if a new snapshot is published
+between requests. A feed can instead be ranked by a score (highest first,
+ties by start and id); its cursor also carries the time the scores were
+computed at, so time-dependent scores don't shift between pages. `since` (a `sync_version` from an earlier response)
+limits the feed to events changed after that version, plus the ids that
+were removed; the store's change log (updated_version + tombstones)
+answers that without diffing.
+
+ETags combine the snapshot version, the query and a short time bucket
+(windows like "upcoming" move with the clock), so an unchanged feed can be
+answered with 304 Not Modified.
+"""
+
+from __future__ import annotations
+import json
+import time
+import base64
+import hashlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from services.event_store import read_snapshot
+from utils.datetime_utils import LOCAL_TZ, parse_datetime, now_local
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+ETAG_BUCKET_SECONDS = 300
+
+# Events without a parseable start sort last
+_NO_START = float("inf")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _sort_key(ev: Dict[str, Any]) -> Tuple[float, str]:
+    start = parse_datetime(ev.get("start"))
+    return (start.timestamp() if start else _NO_START), (ev.get("id") or "")
+
+
+def _ranked_key(ev: Dict[str, Any], score: float) -> Tuple[float, float, str]:
+    return (-score, *_sort_key(ev))
+
+
+def encode_cursor(key: Tuple, ranked_at: Optional[int] = None) -> str:
+    """Cursor for the last key of a page; `ranked_at` (epoch seconds) for ranked feeds."""
+    *numbers, ev_id = key
+    values = [None if n == _NO_START else n for n in numbers] + [ev_id]
+    raw = json.dumps(values if ranked_at is None else {"key": values, "ranked_at": ranked_at})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Tuple, Optional[int]]:
+    """(key, ranked_at); ranked_at is None for a cursor of the (start, id) order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        ranked_at = None
+        if isinstance(raw, dict):
+            raw, ranked_at = raw["key"], int(raw["ranked_at"])
+        *numbers, ev_id = raw
+        if len(numbers) != (1 if ranked_at is None else 2):
+            raise ValueError("wrong key length")
+        key = tuple(_NO_START if n is None else float(n) for n in numbers) + (str(ev_id),)
+        return key, ranked_at
+    except Exception:
+        raise InvalidCursor(f"invalid cursor: {cursor!r}")
+
+
+def _is_upcoming(ev: Dict[str, Any], now: datetime) -> bool:
+    end = parse_datetime(ev.get("end")) or parse_datetime(ev.get("start"))
+    return end is None or end >= now
+
+
+def feed_page(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    since: Optional[str] = None,
+    source: Optional[str] = None,
+    upcoming_only: bool = True,
+    starts_before: Optional[datetime] = None,
+    where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    rank: Optional[Callable[[Dict[str, Any], datetime], float]] = None,
+) -> Dict[str, Any]:
+    """
+    One page of the event feed:
+      {
+        "events": [...],            # sorted by start, id (or by rank)
+        "next_cursor": str | None,  # pass back as `cursor` for the next page
+        "sync_version": str | None, # pass back as `since` on the next sync
+        "deleted": [id, ...],       # only with `since`
+        "reset": bool,              # `since` is older than the change log: resync
+        "scores": [...],            # only with `rank`, one per event
+      }
+    `rank(event, ranked_at)` orders the feed by score, highest first;
+    ranked_at is the same for every page of one cursor chain.
+    Raises InvalidCursor for a malformed cursor (or one from the other order).
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    after, ranked_at = decode_cursor(cursor) if cursor else (None, None)
+    if cursor and (ranked_at is None) != (rank is None):
+        raise InvalidCursor(f"cursor is for a different order: {cursor!r}")
+    if rank is not None and ranked_at is None:
+        ranked_at = int(time.time())
+    ranked_now = datetime.fromtimestamp(ranked_at, LOCAL_TZ) if rank is not None else None
+
+    snapshot = read_snapshot()
+    if snapshot.get("version") is None:
+        from services.event_ingestion import request_refresh
+        request_refresh()
+
+    reset = False
+    deleted: List[str] = []
+    if since:
+        horizon = snapshot.get("changes_since")
+        if not horizon or not since.isdigit() or int(since) < int(horizon):
+            # The change log doesn't reach back that far: send everything
+            reset = True
+        else:
+            deleted = [t["id"] for t in snapshot.get("deleted", []) if int(t["version"]) > int(since)]
+
+    now = now_local()
+    matches = []
+    for ev in snapshot.get("events", []):
+        if source and ev.get("source") != source:
+            continue
+        if since and not reset and int(ev.get("updated_version") or 0) <= int(since):
+            continue
+        if upcoming_only and not _is_upcoming(ev, now):
+            continue
+        if starts_before is not None:
+            start = parse_datetime(ev.get("start"))
+            if start is not None and start > starts_before:
+                continue
+        if where is not None and not where(ev):
+            continue
+        key = _ranked_key(ev, rank(ev, ranked_now)) if rank is not None else _sort_key(ev)
+        if after is not None and key <= after:
+            continue
+        matches.append((key, ev))
+
+    matches.sort(key=lambda m: m[0])
+    page = matches[:limit]
+    result = {
+        "events": [ev for _, ev in page],
+        "next_cursor": encode_cursor(page[-1][0], ranked_at) if len(matches) > limit else None,
+        "sync_version": snapshot.get("version"),
+        "deleted": deleted,
+        "reset": reset,
+    }
+    if rank is not None:
+        result["scores"] = [-key[0] for key, _ in page]
+    return result
+
+
+def feed_etag(args: Mapping[str, Any], scope: str = "") -> str:
+    """ETag for a feed request: snapshot version + query + time bucket."""
+    query = json.dumps(sorted((k, str(v)) for k, v in args.items()))
+    bucket = int(time.time() // ETAG_BUCKET_SECONDS)
+    raw = f"{scope}|{read_snapshot().get('version')}|{bucket}|{query}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
@@ -0,0 +1,91 @@
+# services/event_index.py
+"""
+Time index over events.
+
+Start/end are parsed once when the index is built. Events are kept sorted by
+start, so time-window questions are bisect lookups instead of re-parsing
+every event per request:
+
+    index.happening_at(now)             # start <= now <= end
+    index.starting_between(now, soon)   # now <= start <= soon
+    index.overlapping(slot_start, slot_end)
+
+Overlap queries only scan events that start within the longest event
+duration before the window; the rare multi-day listings are kept on a
+side list so they don't widen that scan.
+"""
+
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.datetime_utils import parse_datetime
+
+# Events longer than this (exhibitions, "all month" listings) go on the side list
+MAX_INDEXED_DURATION = timedelta(days=3)
+
+
+class EventIndex:
+    """Events sorted by aware start datetime, with parsed end times."""
+
+    def __init__(self, events: Iterable[Dict[str, Any]]):
+        entries: List[Tuple[datetime, Optional[datetime], Dict[str, Any]]] = []
+        for ev in events:
+            start = parse_datetime(ev.get("start") or ev.get("event_start"))
+            if start is None:
+                continue
+            end = parse_datetime(ev.get("end") or ev.get("event_end"))
+            if end is not None and end < start:
+                end = None
+            entries.append((start, end, ev))
+
+        entries.sort(key=lambda e: e[0])
+        self._starts = [e[0].timestamp() for e in entries]
+        self._ends = [e[1].timestamp() if e[1] else None for e in entries]
+        self._events = [e[2] for e in entries]
+
+        # Long events go to a small side list so they don't widen every scan
+        cap = MAX_INDEXED_DURATION.total_seconds()
+        durations = [end - start for start, end in zip(self._starts, self._ends) if end is not None]
+        self._max_duration = min(max(durations, default=0.0), cap)
+        self._long = [
+            i for i, (start, end) in enumerate(zip(self._starts, self._ends))
+            if end is not None and end - start > cap
+        ]
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        """All indexed events, sorted by start."""
+        return list(self._events)
+
+    def starting_between(self, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Events whose start falls in [start, end]."""
+        lo = bisect_left(self._starts, start.timestamp())
+        hi = bisect_right(self._starts, end.timestamp())
+        return self._events[lo:hi]
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """
+        Events with a known end that overlap [start, end], sorted by start.
+        Events without an end are never "in progress".
+        """
+        t0, t1 = start.timestamp(), end.timestamp()
+        lo = bisect_left(self._starts, t0 - self._max_duration)
+        hi = bisect_right(self._starts, t1)
+        hits = {
+            i for i in range(lo, hi)
+            if self._ends[i] is not None and self._ends[i] >= t0
+        }
+        hits.update(
+            i for i in self._long
+            if self._starts[i] <= t1 and self._ends[i] >= t0
+        )
+        return [self._events[i] for i in sorted(hits)]
+
+    def happening_at(self, moment: datetime) -> List[Dict[str, Any]]:
+        """Events with start <= moment <= end."""
+        return self.overlapping(moment, moment)
@@ -0,0 +1,289 @@
+# services/event_ingestion.py
+"""
+Scheduled event ingestion.
+
+Scrapes every event source on an interval, normalizes the results and
+publishes them to the shared event store (services/event_store.py). Request
+handlers only read that snapshot; nothing scrapes on the request path.
+
+Run it as its own process:
+    python -m services.event_ingestion            # loop forever
+    python -m services.event_ingestion --once     # single pass (cron)
+
+or let gunicorn start it from the master process (see gunicorn.conf.py).
+"""
+
+from __future__ import annotations
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from typing import List, Dict, Any, Tuple
+
+from services.scrapers.brooklyn_bridge_park_scraper import fetch_brooklyn_bridge_park_events
+from services.scrapers.downtown_brooklyn_scraper import fetch_downtown_bk_events
+from services.scrapers.nyc_parks_scraper import fetch_nyc_parks_events
+from services.scrapers.engage_events_service import fetch_engage_events
+from services.scrapers.bpl_worker import fetch_bpl_events, node_available
+from services.scrapers.runner import ScraperRunner, ScraperSource
+from services.scrapers.conditional import clear_validators, remember
+from services.event_store import upsert_events, read_snapshot, read_source_events, has_source_events, event_id
+from services.event_dedup import dedupe_events
+from services.geocode_service import geocode_many
+from services.location_utils import normalize_engage_location
+from utils.datetime_utils import parse_datetime
+from utils.context_manager import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+INGEST_INTERVAL_SECONDS = int(os.getenv("EVENT_INGEST_INTERVAL", "900"))
+
+ENGAGE_DAYS_AHEAD = 7
+# Paged through the Engage API 50 at a time
+ENGAGE_LIMIT = int(os.getenv("ENGAGE_EVENT_LIMIT", "200"))
+ENGAGE_SOURCE = "nyu_engage"
+
+# Every source runs concurrently with its own timeout and circuit breaker.
+# conditional=True: unchanged pages raise NotModified instead of being parsed
+EVENT_SOURCES: List[ScraperSource] = [
+    ScraperSource("brooklyn_bridge_park", fetch_brooklyn_bridge_park_events, {"limit": 30, "conditional": True}, timeout=12),
+    ScraperSource("downtown_brooklyn", fetch_downtown_bk_events, {"limit": 30, "conditional": True}, timeout=12),
+    ScraperSource("nyc_parks", fetch_nyc_parks_events, {"limit": 30, "conditional": True}, timeout=8),
+    ScraperSource(ENGAGE_SOURCE, fetch_engage_events, {"days_ahead": ENGAGE_DAYS_AHEAD, "limit": ENGAGE_LIMIT}, timeout=15),
+]
+
+# Brooklyn Public Library needs the Node browser worker (scrape_bpl.js);
+# BPL_SCRAPER=off skips it on hosts that have Node but no Chromium
+if os.getenv("BPL_SCRAPER", "on").lower() != "off" and node_available():
+    # Runner timeout covers a cold browser start plus the 25s job deadline
+    EVENT_SOURCES.append(
+        ScraperSource("brooklyn_public_library", fetch_bpl_events, {"limit": 20, "timeout": 25}, timeout=60)
+    )
+
+_runner = ScraperRunner(EVENT_SOURCES)
+
+# Only one ingester publishes per interval, however many processes run one
+LOCK_KEY = "events:ingest:lock"
+
+_refresh_thread: threading.Thread | None = None
+_refresh_lock = threading.Lock()
+
+
+# -----------------------------------------------------------
+# NORMALIZATION
+# -----------------------------------------------------------
+
+def _normalize_times(ev: Dict[str, Any]) -> Dict[str, Any]:
+    """Rewrite start/end as aware ISO strings (New York time when a feed omits the zone)."""
+    for key in ("start", "end"):
+        parsed = parse_datetime(ev.get(key))
+        if parsed is not None:
+            ev[key] = parsed.isoformat()
+    ev["id"] = event_id(ev)
+    return ev
+
+
+def _normalize_engage_event(e: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": e.get("name"),
+        "address": e.get("location"),
+        "location": None,
+        "maps_link": e.get("url"),
+        "photo_url": e.get("image"),
+        "description": e.get("description"),
+        "organization": e.get("organization"),
+        "start": e.get("start"),
+        "end": e.get("end"),
+        "type": "nyu_engage_event",
+        "source": ENGAGE_SOURCE,
+    }
+
+
+def _normalize_external_event(e: Dict[str, Any], source: str) -> Dict[str, Any]:
+    # Scraper fields are kept as-is (clients already read them); only tagged
+    return {**e, "source": e.get("source") or source}
+
+
+# Placeholder locations scrapers use when a listing has no venue
+_UNGEOCODABLE = {"nyc park event"}
+
+
+def _geocode_query(ev: Dict[str, Any]) -> str | None:
+    if ev.get("source") == ENGAGE_SOURCE:
+        return normalize_engage_location(ev.get("address"))
+    for key in ("address", "location"):
+        value = ev.get(key)
+        if isinstance(value, str) and value.strip() and value.strip().lower() not in _UNGEOCODABLE:
+            return value
+    return None
+
+
+def _attach_coordinates(events: List[Dict[str, Any]]) -> None:
+    """
+    Batch-geocode events without coordinates and set lat/lng on them.
+    Lookups are cached (including misses), so after the first pass this
+    rarely calls Google at all.
+    """
+    pending = [(ev, _geocode_query(ev)) for ev in events if ev.get("lat") is None or ev.get("lng") is None]
+    pending = [(ev, query) for ev, query in pending if query]
+    if not pending:
+        return
+    coords = geocode_many(query for _, query in pending)
+    for ev, query in pending:
+        hit = coords.get(query)
+        if hit:
+            ev["lat"], ev["lng"] = hit["lat"], hit["lng"]
+
+
+# -----------------------------------------------------------
+# INGEST
+# -----------------------------------------------------------
+
+def collect_events() -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Run every source once (concurrently). Returns ({source: events}, health,
+    validators) for the sources that returned new content. Sources that
+    failed, timed out, were skipped by their breaker or came back unchanged
+    are absent and keep the events they already have in the store.
+    `validators` are for remember() once the events are upserted.
+    """
+    previous = read_snapshot()
+    if not previous.get("version"):
+        # No snapshot to fall back on: make every source re-parse
+        clear_validators()
+    elif not has_source_events():
+        # Only the deduplicated events are left to diff against; a source
+        # skipped as unchanged would lose its merged-away duplicates for good
+        logger.warning("Raw per-source events missing; re-scraping every source")
+        clear_validators()
+
+    results, health = _runner.run()
+
+    if len(results) < len(EVENT_SOURCES):
+        kept = read_source_events()
+        for source in EVENT_SOURCES:
+            if source.name not in results and not health[source.name].get("unchanged"):
+                health[source.name]["stale_count"] = len(kept.get(source.name, []))
+
+    changed: Dict[str, List[Dict[str, Any]]] = {}
+    validators: List[Dict[str, Any]] = []
+    for source in EVENT_SOURCES:
+        if source.name not in results:
+            continue
+        if getattr(results[source.name], "validators", None):
+            validators.append(results[source.name].validators)
+        events = []
+        for e in results[source.name]:
+            if source.name == ENGAGE_SOURCE:
+                ev = _normalize_engage_event(e)
+            else:
+                ev = _normalize_external_event(e, source.name)
+            events.append(_normalize_times(ev))
+        changed[source.name] = events
+
+    _attach_coordinates([ev for events in changed.values() for ev in events])
+    return changed, health, validators
+
+
+def _acquire_lock(ttl_seconds: int) -> bool:
+    redis_client = get_redis_client()
+    if not redis_client:
+        return True
+    try:
+        return bool(redis_client.set(LOCK_KEY, str(os.getpid()), nx=True, ex=max(1, ttl_seconds)))
+    except Exception as e:
+        logger.warning(f"Ingestion lock unavailable ({e}); ingesting anyway")
+        return True
+
+
+def ingest_once(lock_ttl: int | None = None) -> bool:
+    """
+    Scrape, normalize and upsert changed sources into the store (a new
+    snapshot is only published when some event changed).
+    Returns False if another ingester holds the lock for this interval.
+    """
+    if lock_ttl and not _acquire_lock(lock_ttl):
+        logger.debug("Another ingester published this interval; skipping")
+        return False
+
+    t0 = time.time()
+    changed, sources, validators = collect_events()
+    # Published events have cross-source duplicates merged
+    stats = upsert_events(changed, sources, canonicalize=dedupe_events)
+    # Only now are those pages safe to skip as unchanged next time
+    for fetched in validators:
+        remember(fetched)
+    logger.info(
+        f"Event ingestion finished in {time.time() - t0:.1f}s "
+        f"({len(changed)}/{len(EVENT_SOURCES)} sources changed; "
+        f"{stats['added']} added, {stats['updated']} updated, {stats['removed']} removed)"
+    )
+    return True
+
+
+def run_forever(interval: int = INGEST_INTERVAL_SECONDS, stop_event: threading.Event | None = None) -> None:
+    stop_event = stop_event or threading.Event()
+    logger.info(f"Event ingestion worker started (every {interval}s)")
+    while not stop_event.is_set():
+        try:
+            # Lock slightly shorter than the interval so the next tick can take it
+            ingest_once(lock_ttl=max(1, interval - 5))
+        except Exception as e:
+            logger.error(f"Event ingestion pass failed: {e}", exc_info=True)
+        stop_event.wait(interval)
+
+
+def request_refresh() -> None:
+    """
+    Kick off a single ingest in a background thread if none is running.
+    Used when a reader finds no snapshot at all (fresh deploy, no worker yet).
+    """
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+        _refresh_thread = threading.Thread(
+            target=ingest_once,
+            kwargs={"lock_ttl": 60},
+            name="event-ingest-refresh",
+            daemon=True,
+        )
+        _refresh_thread.start()
+
+
+def start_background_ingestion(interval: int = INGEST_INTERVAL_SECONDS) -> threading.Thread:
+    """In-process worker thread (development server, single-process deploys)."""
+    thread = threading.Thread(target=run_forever, args=(interval,), name="event-ingest", daemon=True)
+    thread.start()
+    return thread
+
+
+# -----------------------------------------------------------
+# CLI
+# -----------------------------------------------------------
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Scrape event sources into the shared event store.")
+    parser.add_argument("--once", action="store_true", help="run a single ingestion pass and exit")
+    parser.add_argument("--interval", type=int, default=INGEST_INTERVAL_SECONDS, help="seconds between passes")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if args.once:
+        ingest_once()
+        return 0
+
+    try:
+        run_forever(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,445 @@
+# services/event_store.py
+"""
+Shared event snapshot written by the ingestion worker and read by request
+handlers.
+
+The snapshot lives in Valkey/Redis when available (shared across workers
+and hosts) and in a JSON file under instance/ otherwise. Readers keep the
+parsed snapshot in memory and only re-read it when its version changes,
+so a request never scrapes and rarely parses JSON.
+
+Ingestion upserts per source: events are compared by id and content hash,
+and a new version is only published when something was added, changed or
+removed. Per-source health is stored separately, so an unchanged pass
+doesn't make every reader reload and re-index the snapshot.
+
+Every publish stamps each event with `updated_version` (the snapshot
+version in which it last changed) and keeps tombstones for removed ids for
+TOMBSTONE_TTL_SECONDS. That is the change log behind delta sync: "what
+changed since version V" is a filter on the snapshot, valid for any V at
+or after the snapshot's `changes_since`.
+
+The published events can be a derived view (cross-source duplicates
+merged, see services/event_dedup.py); the raw per-source lists the upsert
+diffs against are kept next to it under their own key, read only by the
+ingester.
+"""
+
+from __future__ import annotations
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, List, Dict, Any, Optional
+
+from services.event_index import EventIndex
+from utils.context_manager import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+SERVER_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SNAPSHOT_FILE = os.getenv(
+    "EVENT_SNAPSHOT_FILE",
+    os.path.join(SERVER_ROOT, "instance", "events_snapshot.json"),
+)
+
+SOURCES_FILE = os.path.join(os.path.dirname(SNAPSHOT_FILE), "events_sources.json")
+RAW_FILE = os.path.join(os.path.dirname(SNAPSHOT_FILE), "events_raw.json")
+
+SNAPSHOT_KEY = "events:snapshot"
+VERSION_KEY = "events:snapshot:version"
+SOURCES_KEY = "events:sources"
+RAW_KEY = "events:raw"
+
+# How often a reader checks whether a newer snapshot has been published
+VERSION_CHECK_SECONDS = 15
+
+# How long removed event ids are remembered for delta sync
+TOMBSTONE_TTL_SECONDS = 7 * 24 * 3600
+
+_lock = threading.Lock()
+_cached: Optional[Dict[str, Any]] = None
+_cached_version: Optional[str] = None
+_last_check = 0.0
+_index: Optional[EventIndex] = None
+_index_snapshot: Optional[Dict[str, Any]] = None
+_raw: Optional[Dict[str, Any]] = None
+
+
+def _empty_snapshot() -> Dict[str, Any]:
+    return {"version": None, "updated_at": None, "changes_since": None, "events": [], "deleted": [], "sources": {}}
+
+
+def event_id(ev: Dict[str, Any]) -> str:
+    """Stable id from source + link (or name + start when there is no link)."""
+    identity = ev.get("url") or ev.get("maps_link") or f"{ev.get('name')}|{ev.get('start')}"
+    raw = f"{ev.get('source')}|{identity}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(ev: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(ev, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _published_hash(ev: Dict[str, Any]) -> str:
+    return content_hash({k: v for k, v in ev.items() if k != "updated_version"})
+
+
+def _stamp_changes(previous: Dict[str, Any], events: List[Dict[str, Any]], version: str):
+    """
+    Copy events with `updated_version` set (kept from the previous snapshot
+    when unchanged) and work out the tombstones and sync horizon.
+    Returns (events, deleted, changes_since).
+    """
+    old = {ev["id"]: ev for ev in previous.get("events", []) if ev.get("id")}
+
+    stamped = []
+    for ev in events:
+        ev_id = ev.get("id") or event_id(ev)
+        prev = old.get(ev_id)
+        if prev is not None and prev.get("updated_version") and _published_hash(prev) == _published_hash({**ev, "id": ev_id}):
+            updated = prev["updated_version"]
+        else:
+            updated = version
+        stamped.append({**ev, "id": ev_id, "updated_version": updated})
+
+    ids = {ev["id"] for ev in stamped}
+    cutoff = int(version) - TOMBSTONE_TTL_SECONDS * 1000
+    deleted = [
+        t for t in previous.get("deleted", [])
+        if int(t["version"]) >= cutoff and t["id"] not in ids
+    ]
+    deleted.extend({"id": ev_id, "version": version} for ev_id in old if ev_id not in ids)
+
+    if previous.get("changes_since"):
+        changes_since = str(max(int(previous["changes_since"]), cutoff))
+    else:
+        # First snapshot with a change log: no delta before this one
+        changes_since = version
+    return stamped, deleted, changes_since
+
+
+def _write_file(path: str, payload: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+# -----------------------------------------------------------
+# WRITE
+# -----------------------------------------------------------
+
+def write_snapshot(
+    events: List[Dict[str, Any]],
+    sources: Dict[str, Any] | None = None,
+    source_events: Dict[str, List[Dict[str, Any]]] | None = None,
+) -> Dict[str, Any]:
+    """
+    Publish a new snapshot. Redis gets the snapshot before the version key,
+    so readers never see a version without its data. `source_events` (the
+    raw per-source lists behind `events`) is stored for the next upsert.
+    """
+    now = datetime.now(timezone.utc)
+    version = str(int(now.timestamp() * 1000))
+
+    invalidate_local_cache()
+    events, deleted, changes_since = _stamp_changes(read_snapshot(), events, version)
+    snapshot = {
+        "version": version,
+        "updated_at": now.isoformat(),
+        "changes_since": changes_since,
+        "events": events,
+        "deleted": deleted,
+        "sources": sources or {},
+    }
+    payload = json.dumps(snapshot, default=str)
+
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            redis_client.set(SNAPSHOT_KEY, payload)
+            redis_client.set(VERSION_KEY, snapshot["version"])
+        except Exception as e:
+            logger.warning(f"Failed to write event snapshot to Valkey/Redis: {e}")
+
+    # File copy doubles as the fallback for hosts without Redis
+    try:
+        _write_file(SNAPSHOT_FILE, payload)
+    except Exception as e:
+        logger.warning(f"Failed to write event snapshot file: {e}")
+
+    if source_events is not None:
+        _write_raw({"version": snapshot["version"], "sources": source_events})
+    write_sources(snapshot["sources"])
+    invalidate_local_cache()
+    logger.info(f"Event snapshot {snapshot['version']} published ({len(events)} events)")
+    return snapshot
+
+
+def write_sources(sources: Dict[str, Any]) -> None:
+    """Publish per-source health without touching the snapshot version."""
+    payload = json.dumps(sources, default=str)
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            redis_client.set(SOURCES_KEY, payload)
+        except Exception as e:
+            logger.warning(f"Failed to write source health to Valkey/Redis: {e}")
+    try:
+        _write_file(SOURCES_FILE, payload)
+    except Exception as e:
+        logger.warning(f"Failed to write source health file: {e}")
+
+
+def _write_raw(raw: Dict[str, Any]) -> None:
+    global _raw
+    _raw = raw
+    payload = json.dumps(raw, default=str)
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            redis_client.set(RAW_KEY, payload)
+        except Exception as e:
+            logger.warning(f"Failed to write raw events to Valkey/Redis: {e}")
+    try:
+        _write_file(RAW_FILE, payload)
+    except Exception as e:
+        logger.warning(f"Failed to write raw events file: {e}")
+
+
+def _load_raw() -> Optional[Dict[str, Any]]:
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            payload = redis_client.get(RAW_KEY)
+            if payload:
+                return json.loads(payload)
+        except Exception as e:
+            logger.warning(f"Failed to read raw events from Valkey/Redis: {e}")
+    try:
+        with open(RAW_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to read raw events file: {e}")
+        return None
+
+
+def _current_raw() -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """Raw per-source events for the current snapshot version, or None if they weren't kept."""
+    global _raw
+    current = read_snapshot()
+    if _raw is None or _raw.get("version") != current.get("version"):
+        _raw = _load_raw()
+    if _raw is not None and _raw.get("version") == current.get("version"):
+        return _raw["sources"]
+    return None
+
+
+def has_source_events() -> bool:
+    """
+    Whether the raw per-source events behind the current snapshot are
+    available. Without them the ingester has to re-scrape every source:
+    the published events are deduplicated, and diffing against them would
+    lose the merged-away records of any source that comes back unchanged.
+    """
+    return _current_raw() is not None
+
+
+def read_source_events() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Raw per-source events behind the current snapshot. Kept in memory by the
+    process that wrote them; falls back to grouping the published
+    (deduplicated) events, see has_source_events().
+    """
+    raw = _current_raw()
+    if raw is not None:
+        return raw
+
+    current = read_snapshot()
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for ev in current.get("events", []):
+        grouped.setdefault(ev.get("source"), []).append(ev)
+    return grouped
+
+
+def upsert_events(
+    changed: Dict[str, List[Dict[str, Any]]],
+    sources: Dict[str, Any] | None = None,
+    canonicalize: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]] | None = None,
+) -> Dict[str, int]:
+    """
+    Replace the events of each source in `changed`; every other source keeps
+    what it has. Events are matched by id and compared by content hash, and a
+    new snapshot is only published if anything differs. `canonicalize`
+    turns the combined raw events into the published list (e.g. dedupe).
+    Returns {"added", "updated", "removed", "unchanged"} counts.
+    """
+    invalidate_local_cache()
+    current = read_snapshot()
+    raw_missing = not has_source_events()
+    raw = read_source_events()
+
+    by_source: Dict[str, Dict[str, Dict[str, Any]]] = {
+        source: {ev.get("id") or event_id(ev): ev for ev in events}
+        for source, events in raw.items()
+    }
+
+    stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    merged: Dict[str, List[Dict[str, Any]]] = {}
+    for source, events in changed.items():
+        old = by_source.get(source, {})
+        kept = []
+        seen = set()
+        for ev in events:
+            ev_id = ev.get("id") or event_id(ev)
+            if ev_id in seen:
+                continue
+            seen.add(ev_id)
+            ev["id"] = ev_id
+            previous = old.get(ev_id)
+            if previous is None:
+                stats["added"] += 1
+            elif content_hash(previous) == content_hash(ev):
+                # Keep the published object so unchanged events stay identical
+                stats["unchanged"] += 1
+                ev = previous
+            else:
+                stats["updated"] += 1
+            kept.append(ev)
+        stats["removed"] += len(set(old) - seen)
+        merged[source] = kept
+
+    source_events = {**raw, **merged}
+    if not (stats["added"] or stats["updated"] or stats["removed"]) and current.get("version"):
+        if raw_missing:
+            # Keep what was re-scraped, so the next pass diffs against raw lists again
+            _write_raw({"version": current["version"], "sources": source_events})
+        if sources is not None:
+            write_sources(sources)
+        return stats
+
+    events = [ev for kept in source_events.values() for ev in kept]
+    if canonicalize is not None:
+        events = canonicalize(events)
+    write_snapshot(events, sources, source_events=source_events)
+    return stats
+
+
+# -----------------------------------------------------------
+# READ
+# -----------------------------------------------------------
+
+def _current_version() -> Optional[str]:
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            version = redis_client.get(VERSION_KEY)
+            if version:
+                return version
+        except Exception as e:
+            logger.warning(f"Failed to read event snapshot version: {e}")
+    try:
+        return str(os.stat(SNAPSHOT_FILE).st_mtime_ns)
+    except OSError:
+        return None
+
+
+def _load_snapshot() -> Dict[str, Any]:
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            payload = redis_client.get(SNAPSHOT_KEY)
+            if payload:
+                return json.loads(payload)
+        except Exception as e:
+            logger.warning(f"Failed to read event snapshot from Valkey/Redis: {e}")
+    try:
+        with open(SNAPSHOT_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return _empty_snapshot()
+    except Exception as e:
+        logger.warning(f"Failed to read event snapshot file: {e}")
+        return _empty_snapshot()
+
+
+def read_snapshot() -> Dict[str, Any]:
+    """
+    Latest published snapshot: {"version", "updated_at", "changes_since",
+    "events", "deleted", "sources"}.
+    Treat the returned dict as read-only; it is shared within the process.
+    """
+    global _cached, _cached_version, _last_check
+
+    now = time.monotonic()
+    with _lock:
+        if _cached is not None and now - _last_check < VERSION_CHECK_SECONDS:
+            return _cached
+
+        version = _current_version()
+        _last_check = now
+        if _cached is None or version != _cached_version:
+            _cached = _load_snapshot() if version else _empty_snapshot()
+            _cached_version = version
+        return _cached
+
+
+def get_events() -> List[Dict[str, Any]]:
+    """Events from the latest snapshot (empty until the first ingest)."""
+    return read_snapshot()["events"]
+
+
+def get_event_index() -> EventIndex:
+    """
+    Time index over the current snapshot. Built once per snapshot version,
+    so start/end strings are parsed once rather than on every request.
+    """
+    global _index, _index_snapshot
+    snapshot = read_snapshot()
+    with _lock:
+        if _index is None or _index_snapshot is not snapshot:
+            _index = EventIndex(snapshot["events"])
+            _index_snapshot = snapshot
+        return _index
+
+
+def read_sources() -> Dict[str, Any]:
+    """Per-source health from the latest ingestion pass."""
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            payload = redis_client.get(SOURCES_KEY)
+            if payload:
+                return json.loads(payload)
+        except Exception as e:
+            logger.warning(f"Failed to read source health from Valkey/Redis: {e}")
+    try:
+        with open(SOURCES_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return read_snapshot().get("sources", {})
+    except Exception as e:
+        logger.warning(f"Failed to read source health file: {e}")
+        return read_snapshot().get("sources", {})
+
+
+def snapshot_age_seconds() -> Optional[float]:
+    """Seconds since the snapshot was published, or None if there is none."""
+    updated_at = read_snapshot().get("updated_at")
+    if not updated_at:
+        return None
+    return (datetime.now(timezone.utc) - datetime.fromisoformat(updated_at)).total_seconds()
+
+
+def invalidate_local_cache() -> None:
+    """Force the next read to check for a new snapshot."""
+    global _last_check
+    with _lock:
+        _last_check = 0.0
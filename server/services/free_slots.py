@@ -0,0 +1,211 @@
+# services/free_slots.py
+"""
+Free/busy interval engine.
+
+Calendar events (from the device calendar, in whatever shape the client
+sends) are parsed once into aware (start, end) busy intervals, sorted and
+merged. Free time over any range is then the gaps between merged
+intervals:
+
+    schedule = BusySchedule.from_events(events)
+    schedule.free_slots(range_start, range_end, min_minutes=30)
+    schedule.is_busy(at)
+    schedule.next_free(after, until, min_minutes=30)
+
+Building is O(n log n); a free-slot query bisects to the first interval
+that reaches the range and walks only the intervals inside it, so a
+semester of lectures costs the same per query as one day. Ranges may span
+any number of days.
+
+All-day events ({"all_day": true} or date-only "start"/"end") cover whole
+New York days, DST included. Values without a zone are New York time.
+"""
+
+from __future__ import annotations
+from bisect import bisect_right
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.datetime_utils import LOCAL_TZ, parse_datetime, ensure_aware
+
+Interval = Tuple[datetime, datetime]
+
+# Missing or unusable "end" on a timed event
+DEFAULT_EVENT_DURATION = timedelta(hours=1)
+
+_ALL_DAY_KEYS = ("all_day", "allDay", "is_all_day", "isAllDay")
+
+
+def _local_midnight(day: date) -> datetime:
+    return LOCAL_TZ.localize(datetime.combine(day, dtime.min))
+
+
+def _is_date_only(value: Any) -> bool:
+    if isinstance(value, str):
+        return len(value.strip()) == 10
+    return isinstance(value, date) and not isinstance(value, datetime)
+
+
+def busy_interval(ev: Dict[str, Any],
+                  default_duration: timedelta = DEFAULT_EVENT_DURATION) -> Optional[Interval]:
+    """
+    One calendar event -> aware (start, end), or None if it has no usable start.
+    All-day events span local midnight to midnight (end date exclusive when
+    it falls on midnight, inclusive otherwise); a missing or backwards end on a
+    timed event becomes start + default_duration.
+    """
+    raw_start, raw_end = ev.get("start"), ev.get("end")
+    start = parse_datetime(raw_start)
+    if start is None:
+        return None
+    end = parse_datetime(raw_end)
+
+    if any(ev.get(k) for k in _ALL_DAY_KEYS) or _is_date_only(raw_start):
+        first = start.astimezone(LOCAL_TZ).date()
+        stop = first + timedelta(days=1)
+        if end is not None:
+            last = end.astimezone(LOCAL_TZ)
+            last_day = last.date() if last.time() == dtime.min else last.date() + timedelta(days=1)
+            stop = max(stop, last_day)
+        return _local_midnight(first), _local_midnight(stop)
+
+    if end is None or end <= start:
+        end = start + default_duration
+    return start, end
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort and merge overlapping or touching intervals."""
+    # Compare as POSIX timestamps: aware datetimes in mixed zones are slow to compare
+    keyed = sorted((s.timestamp(), e.timestamp(), s, e) for s, e in intervals)
+    merged: List[Interval] = []
+    last_end = None
+    for s_ts, e_ts, start, end in keyed:
+        if merged and s_ts <= last_end:
+            if e_ts > last_end:
+                merged[-1] = (merged[-1][0], end)
+                last_end = e_ts
+        else:
+            merged.append((start, end))
+            last_end = e_ts
+    return merged
+
+
+def slot_dict(start: datetime, end: datetime) -> Dict[str, Any]:
+    """The {start, end, duration_minutes} shape the API and notifications use."""
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "duration_minutes": int((end - start).total_seconds() // 60),
+    }
+
+
+class BusySchedule:
+    """Merged busy intervals (New York time), sorted, with a bisect index on their ends."""
+
+    def __init__(self, intervals: Iterable[Interval]):
+        self._intervals = [
+            (s.astimezone(LOCAL_TZ), e.astimezone(LOCAL_TZ))
+            for s, e in merge_intervals((ensure_aware(s), ensure_aware(e)) for s, e in intervals)
+        ]
+        # Merged intervals are disjoint, so ends are sorted too
+        self._ends = [end.timestamp() for _, end in self._intervals]
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict[str, Any]],
+                    default_duration: timedelta = DEFAULT_EVENT_DURATION) -> "BusySchedule":
+        intervals = []
+        for ev in events or []:
+            interval = busy_interval(ev, default_duration)
+            if interval is not None:
+                intervals.append(interval)
+        return cls(intervals)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    @property
+    def intervals(self) -> List[Interval]:
+        return list(self._intervals)
+
+    def _first_ending_after(self, at: datetime) -> int:
+        return bisect_right(self._ends, at.timestamp())
+
+    def busy_between(self, start: datetime, end: datetime) -> List[Interval]:
+        """Merged busy intervals overlapping [start, end), clipped to it."""
+        start, end = ensure_aware(start), ensure_aware(end)
+        out = []
+        for i in range(self._first_ending_after(start), len(self._intervals)):
+            b_start, b_end = self._intervals[i]
+            if b_start >= end:
+                break
+            out.append((max(b_start, start), min(b_end, end)))
+        return out
+
+    def is_busy(self, at: datetime) -> bool:
+        at = ensure_aware(at)
+        i = self._first_ending_after(at)
+        return i < len(self._intervals) and self._intervals[i][0] <= at
+
+    def starts_at(self, at: datetime) -> bool:
+        """True if a busy interval begins exactly at `at` (a block is boxed in)."""
+        at = ensure_aware(at)
+        i = self._first_ending_after(at)
+        return i < len(self._intervals) and self._intervals[i][0] == at
+
+    def free_slots(self, start: datetime, end: datetime, min_minutes: float = 0) -> List[Interval]:
+        """Gaps in [start, end) at least `min_minutes` long, in order."""
+        start, end = ensure_aware(start), ensure_aware(end)
+        min_length = timedelta(minutes=min_minutes)
+        slots: List[Interval] = []
+        cursor = start
+        for b_start, b_end in self.busy_between(start, end):
+            if b_start > cursor and b_start - cursor >= min_length:
+                slots.append((cursor, b_start))
+            cursor = max(cursor, b_end)
+        if cursor < end and end - cursor >= min_length:
+            slots.append((cursor, end))
+        return slots
+
+    def next_free(self, after: datetime, until: datetime, min_minutes: float = 0) -> Optional[Interval]:
+        """The first free slot (at least `min_minutes`) between `after` and `until`."""
+        after, until = ensure_aware(after), ensure_aware(until)
+        min_length = timedelta(minutes=min_minutes)
+        cursor = after
+        for i in range(self._first_ending_after(after), len(self._intervals)):
+            b_start, b_end = self._intervals[i]
+            if b_start >= until:
+                break
+            if b_start > cursor and b_start - cursor >= min_length:
+                return cursor, b_start
+            cursor = max(cursor, b_end)
+        if cursor < until and until - cursor >= min_length:
+            return cursor, until
+        return None
+
+
+def as_schedule(events) -> BusySchedule:
+    """Accept a BusySchedule or a list of calendar events (parsed once here)."""
+    return events if isinstance(events, BusySchedule) else BusySchedule.from_events(events)
+
+
+def find_free_slots(events,
+                    start: datetime,
+                    end: datetime,
+                    min_minutes: float = 0) -> List[Dict[str, Any]]:
+    """Free slots in [start, end) as [{start, end, duration_minutes}, ...]."""
+    return [slot_dict(s, e) for s, e in as_schedule(events).free_slots(start, end, min_minutes)]
+
+
+def current_or_next(slots: Iterable[Interval], at: datetime) -> Optional[Interval]:
+    """The slot containing `at`, else the next one to start; None if all are past."""
+    at = ensure_aware(at)
+    for start, end in merge_intervals(slots):
+        if end > at:
+            return start, end
+    return None
+
+
+def end_of_day(at: datetime) -> datetime:
+    """Local midnight after `at` (the exclusive end of its New York day)."""
+    return _local_midnight(ensure_aware(at).astimezone(LOCAL_TZ).date() + timedelta(days=1))
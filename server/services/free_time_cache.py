@@ -0,0 +1,196 @@
+# services/free_time_cache.py
+"""
+Per-user precomputed "next free block" suggestion for the dashboard.
+
+Computing a free-time suggestion costs a Places fan-out plus directions, far
+too slow for the dashboard read path. Instead, whenever the client uploads
+its calendar window (POST /api/calendar/free_slots or /day_plan), the next
+free block's suggestion is computed in the background and stored here; the
+dashboard only reads it.
+
+Entries expire when their block ends (kept in Valkey/Redis with that TTL,
+or in process memory without Redis). A new upload replaces the entry.
+
+Precomputes finish in any order, so every entry carries the time of the
+upload it came from (`uploaded_at`) and a write older than the stored
+entry is dropped. Clearing leaves a short-lived marker with its time for
+the same reason: an upload still computing can't bring the entry back.
+"""
+
+from __future__ import annotations
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from redis.exceptions import WatchError
+
+from services.free_slots import Interval, slot_dict
+from services.free_time_recommender import get_free_time_suggestion
+from utils.datetime_utils import now_local, parse_datetime
+from utils.context_manager import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "free_time:next:"
+# How long a clear keeps precomputes of earlier uploads from writing
+CLEARED_TTL_SECONDS = 15 * 60
+
+# {user_id: (expires_at, entry)}
+_local: Dict[int, tuple] = {}
+_local_lock = threading.Lock()
+
+# Background precomputes; small, since each one already fans out upstream
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="free-time-precompute")
+
+
+def _is_older(entry: Dict[str, Any], current: Optional[Dict[str, Any]]) -> bool:
+    return current is not None and current.get("uploaded_at", 0) > entry["uploaded_at"]
+
+
+def _write(user_id: int, entry: Dict[str, Any], ttl: int) -> bool:
+    """Store `entry` unless the stored one comes from a newer upload. True if stored."""
+    key = KEY_PREFIX + str(user_id)
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            with redis_client.pipeline() as pipe:
+                while True:
+                    try:
+                        pipe.watch(key)
+                        raw = pipe.get(key)
+                        if _is_older(entry, json.loads(raw) if raw else None):
+                            pipe.reset()
+                            return False
+                        pipe.multi()
+                        pipe.set(key, json.dumps(entry, default=str), ex=ttl)
+                        pipe.execute()
+                        return True
+                    except WatchError:
+                        continue  # written meanwhile: compare again
+        except Exception as e:
+            logger.warning(f"Free-time suggestion cache write failed ({e}); keeping it in process")
+    with _local_lock:
+        hit = _local.get(user_id)
+        if hit is not None and hit[0] > time.time() and _is_older(entry, hit[1]):
+            return False
+        _local[user_id] = (time.time() + ttl, entry)
+        return True
+
+
+def store_next_suggestion(user_id: int, block: Dict[str, Any], result: Dict[str, Any],
+                          uploaded_at: float | None = None) -> None:
+    """
+    Store a block and its get_free_time_suggestion() result until the block
+    ends, unless an upload newer than `uploaded_at` (default: now) already
+    stored its own.
+    """
+    end = parse_datetime(block.get("end"))
+    if end is None:
+        return
+    ttl = int(end.timestamp() - time.time())
+    if ttl <= 0:
+        return
+
+    entry = {
+        "next_free": block,
+        "free_time_suggestion": result if result.get("should_suggest") else None,
+        "computed_at": now_local().isoformat(),
+        "uploaded_at": uploaded_at or time.time(),
+    }
+    if not _write(user_id, entry, ttl):
+        logger.debug(f"Free-time suggestion for user {user_id} superseded by a newer upload; dropped")
+
+
+def read_next_suggestion(user_id: int) -> Optional[Dict[str, Any]]:
+    """{"next_free", "free_time_suggestion", "computed_at", "uploaded_at"} or None (no upstream calls)."""
+    entry = None
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            raw = redis_client.get(KEY_PREFIX + str(user_id))
+            if raw:
+                entry = json.loads(raw)
+        except Exception as e:
+            logger.warning(f"Free-time suggestion cache read failed: {e}")
+    if entry is None:
+        with _local_lock:
+            hit = _local.get(user_id)
+            if hit is not None and hit[0] <= time.time():
+                del _local[user_id]
+                hit = None
+            entry = hit[1] if hit else None
+    # A cleared marker reads as no entry
+    if entry is None or entry.get("next_free") is None:
+        return None
+    return entry
+
+
+def clear_next_suggestion(user_id: int, uploaded_at: float | None = None) -> None:
+    """Drop the entry; precomputes of uploads before `uploaded_at` (default: now) won't restore it."""
+    _write(user_id, {"next_free": None, "free_time_suggestion": None, "uploaded_at": uploaded_at or time.time()},
+           CLEARED_TTL_SECONDS)
+
+
+def precompute_next_suggestion(
+    user_id: int,
+    slots: List[Interval],
+    events: Any,
+    user_profile: Dict[str, Any],
+    user_lat: float | None = None,
+    user_lng: float | None = None,
+    uploaded_at: float | None = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Suggestion for the first free slot that hasn't ended yet; stored and
+    returned. `events` (list or BusySchedule) is what the slots were cut
+    from, if the client sent events; [] when it sent free slots directly.
+    `uploaded_at` is when the slots were uploaded (default: now).
+    """
+    uploaded_at = uploaded_at or time.time()
+    now = now_local()
+    upcoming = [(s, e) for s, e in sorted(slots) if e > now]
+    if not upcoming:
+        clear_next_suggestion(user_id, uploaded_at)
+        return None
+
+    start, end = upcoming[0]
+    block = slot_dict(max(start, now), end)
+    result = get_free_time_suggestion(block, events, user_profile or {}, user_lat=user_lat, user_lng=user_lng)
+    store_next_suggestion(user_id, block, result, uploaded_at)
+    return result
+
+
+def store_from_plan(user_id: int, plan: Dict[str, Any], uploaded_at: float | None = None) -> None:
+    """Keep the first block of a plan_day() result; it already carries its suggestion."""
+    uploaded_at = uploaded_at or time.time()
+    now = now_local()
+    for block in plan.get("blocks") or []:
+        end = parse_datetime(block.get("end"))
+        if end is None or end <= now:
+            continue
+        store_next_suggestion(
+            user_id,
+            {k: block[k] for k in ("start", "end", "duration_minutes")},
+            {k: block.get(k) for k in ("should_suggest", "type", "suggestion", "message")},
+            uploaded_at,
+        )
+        return
+    clear_next_suggestion(user_id, uploaded_at)
+
+
+def schedule_precompute(user_id: int, slots: List[Interval], events: Any, user_profile: Dict[str, Any],
+                        user_lat: float | None = None, user_lng: float | None = None) -> None:
+    """Run precompute_next_suggestion() off the request thread, stamped with the upload time."""
+    uploaded_at = time.time()
+
+    def run():
+        try:
+            precompute_next_suggestion(user_id, slots, events, user_profile, user_lat=user_lat, user_lng=user_lng,
+                                       uploaded_at=uploaded_at)
+        except Exception as e:
+            logger.error(f"Free-time precompute failed for user {user_id}: {e}", exc_info=True)
+
+    _executor.submit(run)
@@ -1,15 +1,19 @@
 # server/services/free_time_recommender.py
 
-from datetime import datetime
+from datetime import datetime, timedelta, time as dtime
+import heapq
 import pytz
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Set
 import logging
 
-from services.recommendation.events import fetch_all_external_events
-from services.places_service import nearby_places
-from services.directions_service import get_walking_directions
+from services.calendar_suggestion_service import find_free_blocks
+from services.free_slots import as_schedule
+from services.directions_service import walking_minutes
+from services.location_utils import WALK_METERS_PER_MINUTE, haversine
+from services.recommendation.candidate_pool import CandidatePool
 from services.recommendation.places import normalize_place
 from services.recommendation.event_normalizer import normalize_event
+from utils.datetime_utils import LOCAL_TZ, parse_datetime, ensure_aware, now_local
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +23,14 @@ TANDON_LNG = -73.9866
 MINIMUM_MINUTES = 30     # must have 30+ minutes to suggest something
 END_OF_DAY_CUTOFF = 20   # do NOT suggest things after 8:00 PM
 
+# Event selection: only this many candidates get real walking directions
+EVENT_SHORTLIST_SIZE = 3
+# Must be able to spend at least this long at the event before the block ends
+MIN_EVENT_MINUTES = 15
+
+PLACE_TYPES = ["cafe", "park", "tourist_attraction", "restaurant"]
+PLACE_RADIUS = 1500
+
 
 # ------------------------------------------------------------
 # Helpers
@@ -37,69 +49,109 @@ def _minutes_between(start: datetime, end: datetime) -> int:
     return int((end - start).total_seconds() // 60)
 
 
-def _is_between_events(block: dict, events: List[dict]) -> bool:
+def _evening_cutoff(start: datetime) -> datetime:
+    """END_OF_DAY_CUTOFF on the (New York) day the block starts."""
+    local_day = ensure_aware(start).astimezone(LOCAL_TZ).date()
+    return LOCAL_TZ.localize(datetime.combine(local_day, dtime(END_OF_DAY_CUTOFF)))
+
+
+def _is_between_events(block: dict, events) -> bool:
     """
-    Returns True if the free block is between two events (not end-of-day).
+    Returns True if the free block is between two events (not end-of-day):
+    it ends before the evening cutoff, or an event starts right when it ends.
     block = { start, end }
-    events = [ {start, end}, ... ]
+    events = [ {start, end}, ... ] or a BusySchedule
     """
     start = _parse_iso(block["start"])
     end = _parse_iso(block["end"])
     if not start or not end:
         return False
 
-    # If it's the last block of the day → skip
-    if end.hour >= END_OF_DAY_CUTOFF:
-        return False
+    if ensure_aware(end) <= _evening_cutoff(start):
+        return True
 
-    return True
+    # Runs into the evening: only boxed in if something is scheduled at its end
+    return as_schedule(events).starts_at(end)
 
 
 # ------------------------------------------------------------
 # Event Suggestion (highest priority)
 # ------------------------------------------------------------
 
+def _estimated_walk_minutes(ev: dict, origin_lat: float, origin_lng: float) -> float | None:
+    """Walking estimate from ingest-time coordinates (no API call)."""
+    lat, lng = ev.get("lat"), ev.get("lng")
+    if lat is None or lng is None:
+        return None
+    return haversine(origin_lat, origin_lng, lat, lng) / WALK_METERS_PER_MINUTE
+
+
 def _suggest_event(block_start: datetime,
                    block_end: datetime,
                    user_prefs: dict,
                    user_lat: float | None = None,
-                   user_lng: float | None = None) -> Dict[str, Any] | None:
+                   user_lng: float | None = None,
+                   pool: Optional[CandidatePool] = None,
+                   exclude: Optional[Set[str]] = None) -> Dict[str, Any] | None:
     """
     Try suggesting an event happening SOON.
     Looks at all external events (brooklyn bridge, downtown bk, parks, etc).
+
+    Selection runs on pre-parsed fields only: events starting inside the
+    block (a bisect on the event index), reachable by the estimated walk,
+    soonest first. Only a short list is normalized with real directions,
+    so the cost doesn't grow with the size of the feed.
+
+    `pool` shares the event index and directions with other blocks of the
+    same request; names in `exclude` (already suggested) are skipped.
     """
     try:
-        events = fetch_all_external_events()
-        if not events:
-            logger.debug("No external events available for suggestion")
+        block_start = ensure_aware(block_start)
+        block_end = ensure_aware(block_end)
+        origin_lat = user_lat if user_lat is not None else TANDON_LAT
+        origin_lng = user_lng if user_lng is not None else TANDON_LNG
+        pool = pool or CandidatePool(origin_lat, origin_lng)
+        exclude = exclude or set()
+
+        latest_start = block_end - timedelta(minutes=MIN_EVENT_MINUTES)
+        if latest_start <= block_start:
+            return None
+
+        window = pool.event_index.starting_between(block_start, latest_start)
+        if not window:
+            logger.debug("No external events start within the free block")
             return None
 
-        normalized = []
-        for ev in events:
+        candidates = []
+        for ev in window:
+            start = parse_datetime(ev.get("start"))
+            if start is None or start <= block_start:
+                continue
+            if ev.get("name") in exclude:
+                continue
+            walk = _estimated_walk_minutes(ev, origin_lat, origin_lng)
+            if walk is not None and block_start + timedelta(minutes=walk) > start:
+                continue  # can't get there before it starts
+            # Soonest first; nearer (known distance) breaks ties
+            candidates.append(((start, walk if walk is not None else float("inf")), start, ev))
+
+        if not candidates:
+            logger.debug("No reachable event found for free time block")
+            return None
+
+        next_event = None
+        for _, start, ev in heapq.nsmallest(EVENT_SHORTLIST_SIZE, candidates, key=lambda c: c[0]):
             try:
-                n = normalize_event(ev, origin_lat=user_lat, origin_lng=user_lng)
-                if n:
-                    normalized.append({**ev, **n})
+                n = normalize_event(ev, origin_lat=origin_lat, origin_lng=origin_lng,
+                                    directions_lookup=pool.directions_from)
             except Exception as e:
                 logger.debug(f"Failed to normalize event: {e}")
                 continue
-
-        next_event = None
-        soonest = float("inf")
-
-        for ev in normalized:
-            start = ev.get("start")
-            if not start:
+            minutes = walking_minutes(n.get("walk_time"))
+            if minutes is not None and block_start + timedelta(minutes=minutes) > start:
                 continue
-
-            # Only future events
-            if start <= block_start:
-                continue
-
-            delta = (start - block_start).total_seconds()
-            if 0 < delta < soonest:
-                soonest = delta
-                next_event = ev
+            next_event = {**ev, **n}
+            break
 
         if not next_event:
             logger.debug("No matching event found for free time block")
@@ -128,55 +180,47 @@ def _suggest_place(block_start: datetime,
                    block_end: datetime,
                    user_prefs: dict,
                    user_lat: float | None = None,
-                   user_lng: float | None = None) -> Dict[str, Any] | None:
+                   user_lng: float | None = None,
+                   pool: Optional[CandidatePool] = None,
+                   exclude: Optional[Set[str]] = None) -> Dict[str, Any] | None:
     """
     If no event works, suggest a quick thing to do within walking distance.
-    Uses Google Places → normalize → returns best candidate.
+    Uses Google Places → picks the best rated → normalize with directions.
+
+    Directions are only fetched for the winner; with a shared `pool` the
+    place lists and directions are reused across blocks.
     """
 
     # Use user location if provided, otherwise default to Tandon
     origin_lat = user_lat if user_lat is not None else TANDON_LAT
     origin_lng = user_lng if user_lng is not None else TANDON_LNG
+    pool = pool or CandidatePool(origin_lat, origin_lng)
+    exclude = exclude or set()
 
     # Basic vibe inference — very simple for now
     vibe = None
     if user_prefs:
         vibe = user_prefs.get("default_vibe")
 
-    place_types = ["cafe", "park", "tourist_attraction", "restaurant"]
-
-    candidates = []
-
     try:
-        for t in place_types:
-            try:
-                raw = nearby_places(origin_lat, origin_lng, t, radius=1500)
-                for p in raw:
-                    loc = p.get("geometry", {}).get("location", {})
-                    lat = loc.get("lat")
-                    lng = loc.get("lng")
-                    if not lat or not lng:
-                        continue
-                    try:
-                        d = get_walking_directions(origin_lat, origin_lng, lat, lng)
-                    except Exception as e:
-                        logger.debug(f"Failed to get directions for place: {e}")
-                        d = None
-
-                    normalized = normalize_place(p, d)
-                    candidates.append(normalized)
-            except Exception as e:
-                logger.debug(f"Error fetching places for type {t}: {e}")
-                continue
+        candidates = []
+        for t in PLACE_TYPES:
+            for p in pool.places(t, radius=PLACE_RADIUS):
+                loc = p.get("geometry", {}).get("location", {})
+                if not loc.get("lat") or not loc.get("lng"):
+                    continue
+                if p.get("name") in exclude:
+                    continue
+                candidates.append(p)
 
         if not candidates:
             logger.debug("No place candidates found")
             return None
 
-        # Sort closer + higher rated first
-        candidates.sort(key=lambda x: (x.get("rating", 0)), reverse=True)
-
-        return candidates[0]
+        # Highest rated first (first seen wins ties)
+        best = max(candidates, key=lambda p: p.get("rating", 0))
+        loc = best["geometry"]["location"]
+        return normalize_place(best, pool.directions(loc["lat"], loc["lng"]))
     except Exception as e:
         logger.error(f"Error suggesting place: {e}", exc_info=True)
         return None
@@ -190,13 +234,17 @@ def get_free_time_suggestion(free_block: dict,
                              events: List[dict],
                              user_profile: dict,
                              user_lat: float | None = None,
-                             user_lng: float | None = None) -> Dict[str, Any]:
+                             user_lng: float | None = None,
+                             pool: Optional[CandidatePool] = None,
+                             exclude: Optional[Set[str]] = None) -> Dict[str, Any]:
     """
     free_block = { start: ISO, end: ISO }
-    events = today's calendar events (from system calendar or any source)
+    events = today's calendar events (from system calendar or any source), or a BusySchedule
     user_profile = optional preferences
     user_lat = user's latitude for distance calculations
     user_lng = user's longitude for distance calculations
+    pool = CandidatePool shared with other blocks of the same request
+    exclude = names already suggested for other blocks
 
     Returns:
       {
@@ -227,9 +275,11 @@ def get_free_time_suggestion(free_block: dict,
         logger.debug(f"Free block too short: {duration} minutes")
         return {"should_suggest": False}
 
-    # 2️⃣ Don't suggest when it's the last block of the night
-    if start.hour >= END_OF_DAY_CUTOFF:
-        logger.debug(f"Free block too late in day: {start.hour}:00")
+    # 2️⃣ Nothing is suggested past the evening cutoff: a block running into
+    # the evening only offers what fits before it
+    suggest_end = min(ensure_aware(end), _evening_cutoff(start))
+    if _minutes_between(ensure_aware(start), suggest_end) < MINIMUM_MINUTES:
+        logger.debug(f"Free block too late in day: {start.strftime('%-I:%M %p')}")
         return {"should_suggest": False}
 
     # 3️⃣ Must be between events
@@ -238,7 +288,8 @@ def get_free_time_suggestion(free_block: dict,
         return {"should_suggest": False}
 
     # 4️⃣ Try suggesting event first
-    event_suggestion = _suggest_event(start, end, user_profile, user_lat=user_lat, user_lng=user_lng)
+    event_suggestion = _suggest_event(start, suggest_end, user_profile, user_lat=user_lat, user_lng=user_lng,
+                                      pool=pool, exclude=exclude)
     if event_suggestion:
         return {
             "should_suggest": True,
@@ -248,7 +299,8 @@ def get_free_time_suggestion(free_block: dict,
         }
 
     # 5️⃣ Fallback: suggest a place
-    place_suggestion = _suggest_place(start, end, user_profile, user_lat=user_lat, user_lng=user_lng)
+    place_suggestion = _suggest_place(start, suggest_end, user_profile, user_lat=user_lat, user_lng=user_lng,
+                                      pool=pool, exclude=exclude)
     if place_suggestion:
         return {
             "should_suggest": True,
@@ -304,3 +356,47 @@ def generate_free_time_recommendation(next_block: dict, user_lat: float | None =
             "message": f"You have free time from {next_block.get('start')} to {next_block.get('end')}."
         }
 
+
+# ------------------------------------------------------------
+# Whole-day plan (/api/calendar/day_plan)
+# ------------------------------------------------------------
+
+def plan_day(events: List[dict],
+             user_profile: dict | None = None,
+             user_lat: float | None = None,
+             user_lng: float | None = None,
+             now: datetime | None = None) -> Dict[str, Any]:
+    """
+    Every free block left today, each with its suggestion, in one pass.
+
+    All blocks share one CandidatePool, so the place lists, the event index
+    and the directions to a given spot are looked up once for the day, and
+    a place or event suggested for one block isn't repeated for the next.
+
+    Returns:
+      {
+        "date": "YYYY-MM-DD",
+        "blocks": [
+          {"start", "end", "duration_minutes",
+           "should_suggest", "type", "suggestion", "message"}, ...
+        ]
+      }
+    """
+    now = ensure_aware(now) if now else now_local()
+    origin_lat = user_lat if user_lat is not None else TANDON_LAT
+    origin_lng = user_lng if user_lng is not None else TANDON_LNG
+    pool = CandidatePool(origin_lat, origin_lng)
+    schedule = as_schedule(events)
+    suggested: Set[str] = set()
+
+    blocks = []
+    for block in find_free_blocks(schedule, now=now):
+        result = get_free_time_suggestion(block, schedule, user_profile or {}, user_lat=origin_lat,
+                                          user_lng=origin_lng, pool=pool, exclude=suggested)
+        if result.get("should_suggest"):
+            suggested.add(result["suggestion"].get("name"))
+        blocks.append({**block, **result})
+
+    logger.debug(f"Day plan: {len(blocks)} blocks, {pool.stats['places_calls']} places calls, "
+                 f"{pool.stats['directions_calls']} directions calls")
+    return {"date": now.date().isoformat(), "blocks": blocks}
@@ -1,41 +1,166 @@
-import requests
+# services/geocode_service.py
+"""
+The one geocoder (Google Geocoding API).
+
+Results are cached by normalized address: in process memory and in
+Valkey/Redis, so every worker and the ingestion process share them across
+restarts. Addresses Google can't resolve are cached too (for a shorter
+time), so a bad Engage room name isn't re-sent on every pass. Transport
+errors and quota failures are not cached.
+
+Ingestion calls geocode_many() once per pass to attach lat/lng to events;
+request handlers then never need to geocode.
+"""
 import os
+import re
+import json
+import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from utils.cache import TTLCache
+from utils.context_manager import get_redis_client
+
+logger = logging.getLogger(__name__)
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 
-# Simple in-memory cache so we don't geocode the same event repeatedly
-_GEOCODE_CACHE = {}
+KEY_PREFIX = "geocode:"
+POSITIVE_TTL_SECONDS = 30 * 24 * 3600
+NEGATIVE_TTL_SECONDS = 24 * 3600
 
-def geocode(address: str):
-    """
-    Convert a textual NYU Engage event location into lat/lng.
-    Returns None if not found.
-    """
+# Google statuses that mean "this address has no answer" (safe to cache)
+_NEGATIVE_STATUSES = {"ZERO_RESULTS", "INVALID_REQUEST"}
+
+# Sentinel stored for negative results (None means "not cached")
+_NOT_FOUND = {}
+
+_local = TTLCache(max_entries=4096, ttl_seconds=NEGATIVE_TTL_SECONDS)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_address(address: Optional[str]) -> Optional[str]:
+    """Cache key for an address: lowercase, single spaces, no stray punctuation."""
     if not address:
         return None
+    text = _WHITESPACE.sub(" ", address.strip().lower()).strip(" ,.;")
+    return text or None
 
-    if address in _GEOCODE_CACHE:
-        return _GEOCODE_CACHE[address]
 
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {
-        "address": address,
-        "key": GOOGLE_API_KEY
-    }
+def _cached(key: str):
+    """Cached coords, _NOT_FOUND for a cached miss, or None if unknown."""
+    hit = _local.get(key)
+    if hit is not None:
+        return hit
 
+    redis_client = get_redis_client()
+    if not redis_client:
+        return None
     try:
-        r = requests.get(url, params=params, timeout=10)
-        data = r.json()
+        raw = redis_client.get(KEY_PREFIX + key)
+    except Exception as e:
+        logger.warning(f"Geocode cache read failed: {e}")
+        return None
+    if raw is None:
+        return None
+    value = json.loads(raw) or _NOT_FOUND
+    _local.set(key, value)
+    return value
 
-        if data.get("status") != "OK":
-            return None
 
-        loc = data["results"][0]["geometry"]["location"]
-        coords = {"lat": loc["lat"], "lng": loc["lng"]}
+def _store(key: str, coords: Optional[Dict[str, float]]) -> None:
+    value = coords or _NOT_FOUND
+    _local.set(key, value)
+    redis_client = get_redis_client()
+    if not redis_client:
+        return
+    try:
+        redis_client.set(
+            KEY_PREFIX + key,
+            json.dumps(value),
+            ex=POSITIVE_TTL_SECONDS if coords else NEGATIVE_TTL_SECONDS,
+        )
+    except Exception as e:
+        logger.warning(f"Geocode cache write failed: {e}")
 
-        _GEOCODE_CACHE[address] = coords
-        return coords
 
+def _request(address: str):
+    """
+    Ask Google. Returns coords, _NOT_FOUND for a definite miss, or None when
+    the lookup itself failed (not cached).
+    """
+    if not GOOGLE_API_KEY:
+        logger.warning("[GEOCODE] Missing GOOGLE_API_KEY")
+        return None
+    try:
+        r = requests.get(GEOCODE_URL, params={"address": address, "key": GOOGLE_API_KEY}, timeout=10)
+        r.raise_for_status()
+        data = r.json()
     except Exception as e:
-        print("GEOCODE ERROR:", e)
+        logger.error(f"[GEOCODE ERROR] {e}")
+        return None
+
+    status = data.get("status")
+    if status == "OK" and data.get("results"):
+        loc = data["results"][0]["geometry"]["location"]
+        return {"lat": loc["lat"], "lng": loc["lng"]}
+    if status in _NEGATIVE_STATUSES:
+        return _NOT_FOUND
+    logger.warning(f"[GEOCODE] Failed: {status}")
+    return None
+
+
+def geocode(address: str) -> Optional[Dict[str, float]]:
+    """
+    Convert an address into {"lat", "lng"}.
+    Returns None if not found (or the lookup failed).
+    """
+    key = normalize_address(address)
+    if not key:
         return None
+
+    hit = _cached(key)
+    if hit is None:
+        hit = _request(address)
+        if hit is None:
+            return None
+        _store(key, hit or None)
+    return hit or None
+
+
+def geocode_many(addresses: Iterable[str], max_workers: int = 4) -> Dict[str, Optional[Dict[str, float]]]:
+    """
+    Geocode a batch: each distinct normalized address is looked up once,
+    cache misses go to Google concurrently. Returns {address: coords or None}.
+    """
+    addresses = list(addresses)
+    by_key: Dict[str, str] = {}
+    for address in addresses:
+        key = normalize_address(address)
+        if key and key not in by_key:
+            by_key[key] = address
+
+    resolved: Dict[str, Optional[Dict[str, float]]] = {}
+    missing = []
+    for key, address in by_key.items():
+        hit = _cached(key)
+        if hit is None:
+            missing.append(key)
+        else:
+            resolved[key] = hit or None
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geocode") as pool:
+            for key, hit in zip(missing, pool.map(lambda k: _request(by_key[k]), missing)):
+                if hit is not None:
+                    _store(key, hit or None)
+                resolved[key] = hit or None
+
+    return {
+        address: resolved.get(normalize_address(address))
+        for address in addresses
+        if normalize_address(address)
+    }
@@ -1,10 +1,7 @@
-import os
 import logging
-import requests
 import math
 
 logger = logging.getLogger(__name__)
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 def haversine(lat1, lng1, lat2, lng2):
     """
@@ -23,6 +20,33 @@ def haversine(lat1, lng1, lat2, lng2):
     return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
 
+# Straight-line meters → walking minutes (≈80 m/min, streets add ~30%)
+WALK_METERS_PER_MINUTE = 80 / 1.3
+
+
+def estimated_walk_minutes(meters: float) -> int:
+    """Walking minutes for a straight-line distance (no API call)."""
+    return max(1, round(meters / WALK_METERS_PER_MINUTE))
+
+
+def geo_tile(lat: float, lng: float, size_deg: float = 0.01) -> str:
+    """
+    Snap a coordinate to a grid tile id (0.01° ≈ 1.1 km in NYC).
+    Nearby users share a tile, which makes it a good cache key component.
+    """
+    # small epsilon so values sitting exactly on a grid line don't fall into the tile below
+    row = math.floor(lat / size_deg + 1e-9)
+    col = math.floor(lng / size_deg + 1e-9)
+    return f"{row * size_deg:.4f}:{col * size_deg:.4f}"
+
+
+def tile_center(lat: float, lng: float, size_deg: float = 0.01) -> tuple:
+    """Center (lat, lng) of the geo_tile() containing the coordinate."""
+    row = math.floor(lat / size_deg + 1e-9)
+    col = math.floor(lng / size_deg + 1e-9)
+    return round((row + 0.5) * size_deg, 6), round((col + 0.5) * size_deg, 6)
+
+
 # ---------------------------------------------------------
 # NYU Address Normalization (critical for Engage events)
 # ---------------------------------------------------------
@@ -62,35 +86,7 @@ def normalize_engage_location(raw: str) -> str:
 def geocode_address(address: str):
     """
     Convert a human-readable address into lat/lng using Google Geocoding.
+    Cached; see services/geocode_service.py.
     """
-    if not address:
-        return None
-
-    if not GOOGLE_API_KEY:
-        logger.warning("[GEOCODE] Missing GOOGLE_API_KEY")
-        return None
-
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {
-        "address": address,
-        "key": GOOGLE_API_KEY
-    }
-
-    try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-
-        if data.get("status") != "OK":
-            logger.warning(f"[GEOCODE] Failed: {data.get('status')}")
-            return None
-
-        loc = data["results"][0]["geometry"]["location"]
-        return {
-            "lat": loc["lat"],
-            "lng": loc["lng"]
-        }
-
-    except Exception as e:
-        logger.error(f"[GEOCODE ERROR] {e}", exc_info=True)
-        return None
\ No newline at end of file
+    from services.geocode_service import geocode
+    return geocode(address)
\ No newline at end of file
@@ -0,0 +1,402 @@
+# services/notification_matcher.py
+"""
+Scheduled batch matching of users' free time against the event snapshot.
+
+Clients upload their free slots (POST /api/calendar/free_slots); they are
+kept in Valkey/Redis per user. On every run the matcher:
+
+  1. reads one event snapshot (the shared store, no scraping),
+  2. gathers the stored slots of every opted-in user
+     (notifications_enabled + a push token),
+  3. joins all slots with all events in one sorted sweep: events by start,
+     slot windows by opening time, a heap of open windows keyed by close
+     time. Cost is O((E + S) log S + matches), not users × slots × events,
+  4. writes one message per (user, slot) with new matches to the durable
+     notification queue (services/notification_queue.py); events a user was
+     already pushed are skipped via the queue's dedup keys. Notification
+     workers (services/notification_worker.py) deliver them.
+
+Run it as its own process:
+    python -m services.notification_matcher            # loop forever
+    python -m services.notification_matcher --once     # single pass (cron)
+
+or let gunicorn start it from the master process (NOTIFICATION_MATCHER=master).
+"""
+
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import heapq
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.event_store import get_event_index, event_id
+from services.free_slots import Interval, merge_intervals, slot_dict
+from services.notification_queue import enqueue, claim_dedup_keys
+from services.notification_service import notification_event
+from services.push_transports import get_transport, provider_for_token
+from utils.datetime_utils import LOCAL_TZ, parse_datetime, now_local
+from utils.context_manager import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+SERVER_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+MATCH_INTERVAL_SECONDS = int(os.getenv("NOTIFICATION_MATCH_INTERVAL", "600"))
+
+SLOTS_KEY = "notify:free_slots"
+LOCK_KEY = "notify:match:lock"
+
+# Only slots starting this soon are notified about (later runs pick up the rest)
+LOOKAHEAD = timedelta(hours=2)
+# An event may start this long before the slot opens (user can arrive early)
+EARLY_START = timedelta(minutes=15)
+MIN_SLOT_MINUTES = 30
+MAX_EVENTS_PER_NOTIFICATION = 5
+
+# Fallback slot store without Redis: {user_id: [(start, end), ...]}
+_local_slots: Dict[int, List[Interval]] = {}
+_local_lock = threading.Lock()
+
+
+# -----------------------------------------------------------
+# SLOT STORE
+# -----------------------------------------------------------
+
+def save_free_slots(user_id: int, slots: Iterable[Interval]) -> List[Interval]:
+    """Replace a user's uploaded free slots (merged, past ones dropped)."""
+    now = now_local()
+    merged = [(s, e) for s, e in merge_intervals(slots) if e > now]
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            if merged:
+                record = {
+                    "slots": [[s.isoformat(), e.isoformat()] for s, e in merged],
+                    "uploaded_at": now.isoformat(),
+                }
+                redis_client.hset(SLOTS_KEY, str(user_id), json.dumps(record))
+            else:
+                redis_client.hdel(SLOTS_KEY, str(user_id))
+            return merged
+        except Exception as e:
+            logger.warning(f"Free slot store write failed ({e}); keeping slots in process")
+    with _local_lock:
+        if merged:
+            _local_slots[user_id] = merged
+        else:
+            _local_slots.pop(user_id, None)
+    return merged
+
+
+def clear_free_slots(user_id: int) -> None:
+    save_free_slots(user_id, [])
+
+
+def _parse_record(raw) -> List[Interval]:
+    slots = []
+    for start, end in json.loads(raw).get("slots", []):
+        s, e = parse_datetime(start), parse_datetime(end)
+        if s and e:
+            slots.append((s, e))
+    return slots
+
+
+def load_free_slots() -> Dict[int, List[Interval]]:
+    """Every user's stored slots that haven't ended yet; expired users are pruned."""
+    now = now_local()
+    by_user: Dict[int, List[Interval]] = {}
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            expired = []
+            for user_id, raw in redis_client.hgetall(SLOTS_KEY).items():
+                slots = [(s, e) for s, e in _parse_record(raw) if e > now]
+                if slots:
+                    by_user[int(user_id)] = slots
+                else:
+                    expired.append(user_id)
+            if expired:
+                redis_client.hdel(SLOTS_KEY, *expired)
+        except Exception as e:
+            logger.warning(f"Free slot store read failed: {e}")
+    with _local_lock:
+        for user_id, slots in list(_local_slots.items()):
+            slots = [(s, e) for s, e in slots if e > now]
+            if slots:
+                by_user.setdefault(user_id, slots)
+            else:
+                del _local_slots[user_id]
+    return by_user
+
+
+# -----------------------------------------------------------
+# OPT-IN
+# -----------------------------------------------------------
+
+def opted_in_tokens(user_ids: Iterable[int]) -> Dict[int, str]:
+    """{user_id: push token} for users with notifications on and a token (needs an app context)."""
+    from models.users import User
+
+    ids = list(user_ids)
+    if not ids:
+        return {}
+    tokens = {}
+    users = User.query.filter(User.id.in_(ids), User.notification_token.isnot(None)).all()
+    for user in users:
+        if user.get_settings().get("notifications_enabled", True):
+            tokens[user.id] = user.notification_token
+    return tokens
+
+
+def clear_invalid_tokens(tokens: Iterable[Tuple[int, str]]) -> int:
+    """
+    Forget push tokens the provider rejected for good ((user_id, token)
+    pairs; a user who has since registered a new token keeps it). Opens an
+    app context if there is none. Returns how many were cleared.
+    """
+    from flask import has_app_context
+    from models.db import db
+    from models.users import User
+
+    tokens = list(tokens)
+    if not tokens:
+        return 0
+    if not has_app_context():
+        with _app_context():
+            return clear_invalid_tokens(tokens)
+    cleared = 0
+    for user_id, token in tokens:
+        cleared += User.query.filter_by(id=user_id, notification_token=token).update(
+            {"notification_token": None}, synchronize_session=False)
+    db.session.commit()
+    return cleared
+
+
+# -----------------------------------------------------------
+# SWEEP-LINE JOIN
+# -----------------------------------------------------------
+
+def match_slots(
+    slots_by_user: Dict[int, List[Interval]],
+    events: List[Dict[str, Any]],
+    now: Optional[datetime] = None,
+    lookahead: timedelta = LOOKAHEAD,
+) -> Dict[Tuple[int, Interval], List[Dict[str, Any]]]:
+    """
+    {(user_id, slot): [event, ...]} for every slot starting within
+    `lookahead` and every event starting in [slot start - 15 min, slot end]
+    (never before now). Events come back soonest first.
+    """
+    now = now or now_local()
+    horizon = now + lookahead
+    min_length = timedelta(minutes=MIN_SLOT_MINUTES)
+
+    # Slot windows as (open_ts, close_ts, key), sorted by open
+    windows = []
+    for user_id, slots in slots_by_user.items():
+        for start, end in slots:
+            if end <= now or start > horizon or end - start < min_length:
+                continue
+            opens = max(start - EARLY_START, now)
+            windows.append((opens.timestamp(), end.timestamp(), (user_id, (start, end))))
+    if not windows:
+        return {}
+    windows.sort(key=lambda w: w[0])
+
+    # Events by start; parsed once for all users
+    timeline = []
+    for ev in events:
+        start = parse_datetime(ev.get("start"))
+        if start is not None:
+            timeline.append((start.timestamp(), ev))
+    timeline.sort(key=lambda t: t[0])
+
+    matches: Dict[Tuple[int, Interval], List[Dict[str, Any]]] = {}
+    open_windows: List[Tuple[float, int]] = []  # heap of (close_ts, window index)
+    next_window = 0
+    for start_ts, ev in timeline:
+        # Open every window that has started by this event
+        while next_window < len(windows) and windows[next_window][0] <= start_ts:
+            heapq.heappush(open_windows, (windows[next_window][1], next_window))
+            next_window += 1
+        # Close windows that ended before it
+        while open_windows and open_windows[0][0] < start_ts:
+            heapq.heappop(open_windows)
+        if not open_windows and next_window == len(windows):
+            break
+        for _, i in open_windows:
+            matches.setdefault(windows[i][2], []).append(ev)
+    return matches
+
+
+def _dedup_key(user_id: int, ev: Dict[str, Any]) -> str:
+    return f"{user_id}:{ev.get('id') or event_id(ev)}"
+
+
+def _message_text(end: datetime, events: List[Dict[str, Any]]) -> Tuple[str, str]:
+    first = events[0]
+    start = parse_datetime(first.get("start"))
+    title = f"You're free until {end.astimezone(LOCAL_TZ).strftime('%-I:%M %p')}"
+    body = first.get("name") or first.get("title") or "An event"
+    if start is not None:
+        body += f" starts at {start.astimezone(LOCAL_TZ).strftime('%-I:%M %p')}"
+    if len(events) > 1:
+        body += f" (+{len(events) - 1} more)"
+    return title, body
+
+
+def build_messages(
+    matches: Dict[Tuple[int, Interval], List[Dict[str, Any]]],
+    tokens: Dict[int, str],
+) -> List[Dict[str, Any]]:
+    """
+    Queue messages (one per user and slot) for users with a push token.
+    Events this user was already notified about are left out (dedup keys
+    claimed in the queue); a slot with nothing new gets no message, and
+    neither does a token no registered transport can deliver to.
+    """
+    messages = []
+    for (user_id, (start, end)), events in matches.items():
+        token = tokens.get(user_id)
+        if not token:
+            continue
+        if get_transport(provider_for_token(token)) is None:
+            # Nothing can deliver to this token; don't queue (or claim) anything for it
+            continue
+        candidates = {_dedup_key(user_id, ev): ev for ev in events}
+        # Claim only what goes into the message: soonest events first, up to the cap
+        keys = list(candidates)
+        fresh: List[str] = []
+        i = 0
+        while len(fresh) < MAX_EVENTS_PER_NOTIFICATION and i < len(keys):
+            chunk = keys[i:i + MAX_EVENTS_PER_NOTIFICATION - len(fresh)]
+            i += len(chunk)
+            fresh.extend(claim_dedup_keys(chunk))
+        if not fresh:
+            continue
+        fresh_events = [candidates[k] for k in fresh]
+        title, body = _message_text(end, fresh_events)
+        messages.append({
+            "user_id": user_id,
+            "token": token,
+            "title": title,
+            "body": body,
+            "data": {
+                "type": "free_time_events",
+                "free_time": slot_dict(start, end),
+                "events": [notification_event(ev) for ev in fresh_events],
+            },
+            "dedup_keys": fresh,
+        })
+    return messages
+
+
+# -----------------------------------------------------------
+# JOB
+# -----------------------------------------------------------
+
+def _acquire_lock(ttl_seconds: int) -> bool:
+    redis_client = get_redis_client()
+    if not redis_client:
+        return True
+    try:
+        return bool(redis_client.set(LOCK_KEY, str(os.getpid()), nx=True, ex=max(1, ttl_seconds)))
+    except Exception as e:
+        logger.warning(f"Matcher lock unavailable ({e}); matching anyway")
+        return True
+
+
+def match_once(lock_ttl: int | None = None) -> Dict[str, int]:
+    """
+    One matching pass over all opted-in users (needs an app context for the
+    user lookup). Returns counts; skipped if another matcher holds the lock.
+    """
+    if lock_ttl and not _acquire_lock(lock_ttl):
+        logger.debug("Another matcher ran this interval; skipping")
+        return {"users": 0, "slots": 0, "events": 0, "queued": 0}
+
+    t0 = time.time()
+    now = now_local()
+    slots_by_user = load_free_slots()
+    tokens = opted_in_tokens(slots_by_user)
+    slots_by_user = {uid: slots for uid, slots in slots_by_user.items() if uid in tokens}
+
+    # Only events that could fall in some slot window
+    events = []
+    if slots_by_user:
+        latest_end = max(end for slots in slots_by_user.values() for _, end in slots)
+        events = get_event_index().starting_between(now, latest_end)
+    matches = match_slots(slots_by_user, events, now=now)
+    queued = enqueue(build_messages(matches, tokens))
+
+    stats = {
+        "users": len(slots_by_user),
+        "slots": sum(len(s) for s in slots_by_user.values()),
+        "events": len(events),
+        "queued": queued,
+    }
+    logger.info(
+        f"Notification matching finished in {time.time() - t0:.2f}s "
+        f"({stats['users']} users, {stats['slots']} slots, {stats['events']} events, {queued} queued)"
+    )
+    return stats
+
+
+def _app_context():
+    """A bare Flask app bound to the same database as app.py (no routes, no models preloaded)."""
+    from flask import Flask
+    from models.db import db
+
+    app = Flask(__name__, instance_path=os.path.join(SERVER_ROOT, "instance"))
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL") or "sqlite:///violetvibes.db"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app.app_context()
+
+
+def run_forever(interval: int = MATCH_INTERVAL_SECONDS, stop_event: threading.Event | None = None) -> None:
+    stop_event = stop_event or threading.Event()
+    logger.info(f"Notification matcher started (every {interval}s)")
+    with _app_context():
+        while not stop_event.is_set():
+            try:
+                match_once(lock_ttl=max(1, interval - 5))
+            except Exception as e:
+                logger.error(f"Notification matching pass failed: {e}", exc_info=True)
+            stop_event.wait(interval)
+
+
+# -----------------------------------------------------------
+# CLI
+# -----------------------------------------------------------
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Match users' free slots with events and queue notifications.")
+    parser.add_argument("--once", action="store_true", help="run a single matching pass and exit")
+    parser.add_argument("--interval", type=int, default=MATCH_INTERVAL_SECONDS, help="seconds between passes")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if args.once:
+        with _app_context():
+            match_once()
+        return 0
+
+    try:
+        run_forever(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+# services/notification_queue.py
+"""
+Durable queue of outgoing push notifications.
+
+Producers (the batch matcher) enqueue messages; notification workers
+(services/notification_worker.py) take batches, send them per provider and
+ack, retry or dead-letter each message. On Valkey/Redis:
+
+  notify:queue                 ready messages (list, FIFO)
+  notify:processing:<worker>   taken by a worker, not yet acked (list);
+                               put back on the queue when that worker restarts
+  notify:retry                 failed, waiting for backoff (zset by due time)
+  notify:dead                  gave up (list, newest last, capped)
+  notify:dedup:<key>           "already pushed" markers (SET NX, expiring; released
+                               only when a message runs out of retries)
+  notify:metrics               counters (hash)
+
+Without Redis the same structures live in process memory, which only works
+when producer and worker share a process (development, tests).
+"""
+
+from __future__ import annotations
+import json
+import time
+import uuid
+import heapq
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.push_transports import provider_for_token
+from utils.context_manager import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "notify:queue"
+PROCESSING_PREFIX = "notify:processing:"
+RETRY_KEY = "notify:retry"
+DEAD_KEY = "notify:dead"
+DEDUP_PREFIX = "notify:dedup:"
+METRICS_KEY = "notify:metrics"
+
+DEDUP_TTL_SECONDS = 2 * 24 * 3600
+DEAD_LETTER_LIMIT = 1000
+
+# (raw payload as stored, parsed message); raw is what ack/retry remove
+Taken = Tuple[str, Dict[str, Any]]
+
+
+def new_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Envelope a producer message: id, provider, attempt count, enqueue time."""
+    return {
+        "id": uuid.uuid4().hex,
+        "provider": provider_for_token(message["token"]),
+        "attempts": 0,
+        "enqueued_at": time.time(),
+        **message,
+    }
+
+
+# -----------------------------------------------------------
+# BACKENDS
+# -----------------------------------------------------------
+
+class _RedisBackend:
+    def __init__(self, client):
+        self.r = client
+
+    def push(self, payloads: List[str]) -> None:
+        self.r.rpush(QUEUE_KEY, *payloads)
+
+    def take(self, worker: str, max_items: int, block_seconds: float) -> List[str]:
+        processing = PROCESSING_PREFIX + worker
+        first = self.r.blmove(QUEUE_KEY, processing, block_seconds, "LEFT", "RIGHT") if block_seconds else \
+            self.r.lmove(QUEUE_KEY, processing, "LEFT", "RIGHT")
+        if first is None:
+            return []
+        pipe = self.r.pipeline(transaction=False)
+        for _ in range(max_items - 1):
+            pipe.lmove(QUEUE_KEY, processing, "LEFT", "RIGHT")
+        return [first] + [p for p in pipe.execute() if p is not None]
+
+    def ack(self, worker: str, raws: List[str]) -> None:
+        pipe = self.r.pipeline(transaction=False)
+        for raw in raws:
+            pipe.lrem(PROCESSING_PREFIX + worker, 1, raw)
+        pipe.execute()
+
+    def retry_later(self, worker: str, raw: str, payload: str, due: float) -> None:
+        pipe = self.r.pipeline()
+        pipe.zadd(RETRY_KEY, {payload: due})
+        pipe.lrem(PROCESSING_PREFIX + worker, 1, raw)
+        pipe.execute()
+
+    def dead(self, worker: str, raw: str, payload: str) -> None:
+        pipe = self.r.pipeline()
+        pipe.rpush(DEAD_KEY, payload)
+        pipe.ltrim(DEAD_KEY, -DEAD_LETTER_LIMIT, -1)
+        pipe.lrem(PROCESSING_PREFIX + worker, 1, raw)
+        pipe.execute()
+
+    def promote_due(self, now: float, max_items: int = 500) -> int:
+        moved = 0
+        for payload in self.r.zrangebyscore(RETRY_KEY, 0, now, start=0, num=max_items):
+            # Only the worker whose ZREM succeeds re-queues it
+            if self.r.zrem(RETRY_KEY, payload):
+                self.r.rpush(QUEUE_KEY, payload)
+                moved += 1
+        return moved
+
+    def recover(self, worker: str) -> int:
+        moved = 0
+        while self.r.lmove(PROCESSING_PREFIX + worker, QUEUE_KEY, "RIGHT", "LEFT") is not None:
+            moved += 1
+        return moved
+
+    def claim(self, keys: List[str]) -> List[bool]:
+        pipe = self.r.pipeline(transaction=False)
+        for key in keys:
+            pipe.set(DEDUP_PREFIX + key, "1", nx=True, ex=DEDUP_TTL_SECONDS)
+        return [bool(ok) for ok in pipe.execute()]
+
+    def release(self, keys: List[str]) -> None:
+        if keys:
+            self.r.delete(*(DEDUP_PREFIX + k for k in keys))
+
+    def incr(self, counters: Dict[str, float]) -> None:
+        pipe = self.r.pipeline(transaction=False)
+        for name, value in counters.items():
+            if isinstance(value, float):
+                pipe.hincrbyfloat(METRICS_KEY, name, value)
+            else:
+                pipe.hincrby(METRICS_KEY, name, value)
+        pipe.execute()
+
+    def stats(self) -> Dict[str, Any]:
+        pipe = self.r.pipeline(transaction=False)
+        pipe.llen(QUEUE_KEY)
+        pipe.zcard(RETRY_KEY)
+        pipe.llen(DEAD_KEY)
+        pipe.lindex(QUEUE_KEY, 0)
+        pipe.hgetall(METRICS_KEY)
+        depth, retrying, dead, oldest, counters = pipe.execute()
+        counters = {k: float(v) if "." in v else int(v) for k, v in counters.items()}
+        return {"depth": depth, "retrying": retrying, "dead": dead, "oldest": oldest, "counters": counters}
+
+
+class _LocalBackend:
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._ready: deque = deque()
+        self._processing: Dict[str, List[str]] = {}
+        self._retry: List[Tuple[float, str]] = []
+        self._dead: deque = deque(maxlen=DEAD_LETTER_LIMIT)
+        self._dedup: Dict[str, float] = {}
+        self._counters: Dict[str, float] = {}
+
+    def push(self, payloads: List[str]) -> None:
+        with self._lock:
+            self._ready.extend(payloads)
+            self._lock.notify_all()
+
+    def take(self, worker: str, max_items: int, block_seconds: float) -> List[str]:
+        with self._lock:
+            if not self._ready and block_seconds:
+                self._lock.wait(block_seconds)
+            taken = []
+            while self._ready and len(taken) < max_items:
+                taken.append(self._ready.popleft())
+            self._processing.setdefault(worker, []).extend(taken)
+            return taken
+
+    def _unprocess(self, worker: str, raw: str) -> None:
+        try:
+            self._processing.get(worker, []).remove(raw)
+        except ValueError:
+            pass
+
+    def ack(self, worker: str, raws: List[str]) -> None:
+        with self._lock:
+            for raw in raws:
+                self._unprocess(worker, raw)
+
+    def retry_later(self, worker: str, raw: str, payload: str, due: float) -> None:
+        with self._lock:
+            heapq.heappush(self._retry, (due, payload))
+            self._unprocess(worker, raw)
+
+    def dead(self, worker: str, raw: str, payload: str) -> None:
+        with self._lock:
+            self._dead.append(payload)
+            self._unprocess(worker, raw)
+
+    def promote_due(self, now: float, max_items: int = 500) -> int:
+        with self._lock:
+            moved = 0
+            while self._retry and self._retry[0][0] <= now and moved < max_items:
+                self._ready.append(heapq.heappop(self._retry)[1])
+                moved += 1
+            if moved:
+                self._lock.notify_all()
+            return moved
+
+    def recover(self, worker: str) -> int:
+        with self._lock:
+            leftover = self._processing.pop(worker, [])
+            self._ready.extendleft(reversed(leftover))
+            return len(leftover)
+
+    def claim(self, keys: List[str]) -> List[bool]:
+        now = time.time()
+        with self._lock:
+            claimed = []
+            for key in keys:
+                if self._dedup.get(key, 0) > now:
+                    claimed.append(False)
+                else:
+                    self._dedup[key] = now + DEDUP_TTL_SECONDS
+                    claimed.append(True)
+            return claimed
+
+    def release(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._dedup.pop(key, None)
+
+    def incr(self, counters: Dict[str, float]) -> None:
+        with self._lock:
+            for name, value in counters.items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "depth": len(self._ready),
+                "retrying": len(self._retry),
+                "dead": len(self._dead),
+                "oldest": self._ready[0] if self._ready else None,
+                "counters": dict(self._counters),
+            }
+
+
+_local = _LocalBackend()
+
+
+def _backend():
+    redis_client = get_redis_client()
+    return _RedisBackend(redis_client) if redis_client else _local
+
+
+# -----------------------------------------------------------
+# PRODUCER API
+# -----------------------------------------------------------
+
+def claim_dedup_keys(keys: Iterable[str]) -> List[str]:
+    """Mark keys as pushed; returns the ones that weren't already (only those may be sent)."""
+    keys = list(keys)
+    if not keys:
+        return []
+    try:
+        return [k for k, ok in zip(keys, _backend().claim(keys)) if ok]
+    except Exception as e:
+        logger.warning(f"Notification dedup unavailable ({e}); not deduplicating")
+        return keys
+
+
+def release_dedup_keys(keys: Iterable[str]) -> None:
+    """Forget keys of a message that was never delivered, so a later run may send them."""
+    try:
+        _backend().release(list(keys))
+    except Exception as e:
+        logger.warning(f"Notification dedup release failed: {e}")
+
+
+def enqueue(messages: Iterable[Dict[str, Any]]) -> int:
+    """
+    Queue messages ({user_id, token, title, body, data, dedup_keys}).
+    Returns how many were queued.
+    """
+    payloads = [json.dumps(new_message(m), default=str) for m in messages]
+    if not payloads:
+        return 0
+    backend = _backend()
+    try:
+        backend.push(payloads)
+    except Exception as e:
+        logger.warning(f"Notification queue write failed ({e}); keeping messages in process")
+        backend = _local
+        backend.push(payloads)
+    record_metrics({"enqueued": len(payloads)}, backend)
+    return len(payloads)
+
+
+# -----------------------------------------------------------
+# WORKER API
+# -----------------------------------------------------------
+
+def take_batch(worker: str, max_items: int = 100, block_seconds: float = 5) -> List[Taken]:
+    """Move up to max_items messages to this worker's processing list (waits up to block_seconds)."""
+    return [(raw, json.loads(raw)) for raw in _backend().take(worker, max_items, block_seconds)]
+
+
+def ack(worker: str, taken: List[Taken]) -> None:
+    if taken:
+        _backend().ack(worker, [raw for raw, _ in taken])
+
+
+def retry_later(worker: str, item: Taken, due: float, error: Optional[str] = None) -> None:
+    raw, message = item
+    message = {**message, "attempts": message.get("attempts", 0) + 1, "last_error": error}
+    _backend().retry_later(worker, raw, json.dumps(message, default=str), due)
+
+
+def dead_letter(worker: str, item: Taken, error: Optional[str] = None, release: bool = False) -> None:
+    """
+    Give up on a message. `release` frees its dedup keys so a later matcher
+    pass may send those events again; only do that for transient failures
+    (retries ran out), never for drops that would fail the same way again.
+    """
+    raw, message = item
+    message = {**message, "last_error": error, "failed_at": time.time()}
+    _backend().dead(worker, raw, json.dumps(message, default=str))
+    if release:
+        release_dedup_keys(message.get("dedup_keys") or [])
+
+
+def promote_due_retries(now: Optional[float] = None) -> int:
+    return _backend().promote_due(now or time.time())
+
+
+def recover_worker(worker: str) -> int:
+    """Put messages a previous run of this worker took but never acked back on the queue."""
+    return _backend().recover(worker)
+
+
+def record_metrics(counters: Dict[str, float], backend=None) -> None:
+    try:
+        (backend or _backend()).incr(counters)
+    except Exception as e:
+        logger.debug(f"Notification metrics write failed: {e}")
+
+
+def queue_stats() -> Dict[str, Any]:
+    """
+    Depth, retry/dead counts, lag (age of the oldest queued message) and
+    lifetime counters (enqueued, sent, retried, dead, lag_seconds_total).
+    """
+    stats = _backend().stats()
+    oldest = stats.pop("oldest")
+    stats["lag_seconds"] = round(time.time() - json.loads(oldest)["enqueued_at"], 1) if oldest else 0.0
+    return stats
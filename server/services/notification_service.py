@@ -11,93 +11,43 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 import logging
 
-from services.scrapers.engage_events_service import fetch_engage_events
-from services.recommendation.quick_recommendations import EVENT_SOURCES
+from services.event_index import EventIndex
+from services.event_store import get_event_index
+from services.free_slots import end_of_day, find_free_slots
+from utils.datetime_utils import parse_datetime as _parse_event_datetime, now_local
 
 logger = logging.getLogger(__name__)
 
 
 def parse_datetime(date_str: Optional[str]) -> Optional[datetime]:
-    """Parse ISO datetime string to datetime object."""
+    """Parse ISO datetime string to an aware datetime (New York time if no zone)."""
     if not date_str:
         return None
-    try:
-        # Handle both with and without timezone
-        if date_str.endswith('Z'):
-            date_str = date_str[:-1] + '+00:00'
-        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-    except Exception as e:
-        logger.warning(f"Failed to parse datetime {date_str}: {e}")
-        return None
+    parsed = _parse_event_datetime(date_str)
+    if parsed is None:
+        logger.warning(f"Failed to parse datetime {date_str}")
+    return parsed
 
 
-def find_free_time_slots(calendar_events: List[Dict[str, Any]], 
+def find_free_time_slots(calendar_events,
                         start_time: datetime, 
                         end_time: datetime,
                         min_free_duration_minutes: int = 30) -> List[Dict[str, Any]]:
     """
-    Find free time slots between calendar events.
+    Find free time slots between calendar events (a list or a BusySchedule).
     Returns list of {start, end, duration_minutes} for each free slot.
     """
-    if not calendar_events:
-        # No events = entire period is free
-        duration = (end_time - start_time).total_seconds() / 60
-        if duration >= min_free_duration_minutes:
-            return [{
-                "start": start_time.isoformat(),
-                "end": end_time.isoformat(),
-                "duration_minutes": duration
-            }]
-        return []
-    
-    # Parse and sort events by start time
-    parsed_events = []
-    for event in calendar_events:
-        start = parse_datetime(event.get("start"))
-        end = parse_datetime(event.get("end"))
-        if start and end:
-            parsed_events.append({"start": start, "end": end})
-    
-    parsed_events.sort(key=lambda x: x["start"])
-    
-    free_slots = []
-    current_time = start_time
-    
-    for event in parsed_events:
-        event_start = event["start"]
-        event_end = event["end"]
-        
-        # If there's a gap before this event
-        if current_time < event_start:
-            gap_duration = (event_start - current_time).total_seconds() / 60
-            if gap_duration >= min_free_duration_minutes:
-                free_slots.append({
-                    "start": current_time.isoformat(),
-                    "end": event_start.isoformat(),
-                    "duration_minutes": gap_duration
-                })
-        
-        # Move current time to end of this event
-        current_time = max(current_time, event_end)
-    
-    # Check for free time after last event
-    if current_time < end_time:
-        gap_duration = (end_time - current_time).total_seconds() / 60
-        if gap_duration >= min_free_duration_minutes:
-            free_slots.append({
-                "start": current_time.isoformat(),
-                "end": end_time.isoformat(),
-                "duration_minutes": gap_duration
-            })
-    
-    return free_slots
+    return find_free_slots(calendar_events, start_time, end_time, min_minutes=min_free_duration_minutes)
 
 
 def find_matching_events(free_slot: Dict[str, Any], 
-                        available_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+                        available_events) -> List[Dict[str, Any]]:
     """
     Find events that match a free time slot.
-    An event matches if it starts during or shortly before the free slot.
+    An event matches if it starts during or shortly before the free slot:
+    up to 15 minutes before it starts (user can arrive early) or during it.
+
+    available_events may be a list or an EventIndex (a bisect lookup).
     """
     slot_start = parse_datetime(free_slot["start"])
     slot_end = parse_datetime(free_slot["end"])
@@ -105,28 +55,20 @@ def find_matching_events(free_slot: Dict[str, Any],
     if not slot_start or not slot_end:
         return []
     
-    matching = []
-    
-    for event in available_events:
-        event_start_str = event.get("start") or event.get("event_start")
-        if not event_start_str:
-            continue
-        
-        event_start = parse_datetime(event_start_str)
-        if not event_start:
-            continue
-        
-        # Event should start within the free slot, or up to 15 minutes before
-        time_before_slot = (slot_start - event_start).total_seconds() / 60
-        time_after_slot_start = (event_start - slot_start).total_seconds() / 60
-        
-        # Match if event starts:
-        # - Up to 15 minutes before free slot starts (user can arrive early)
-        # - Or during the free slot
-        if -15 <= time_after_slot_start <= free_slot["duration_minutes"]:
-            matching.append(event)
-    
-    return matching
+    index = available_events if isinstance(available_events, EventIndex) else EventIndex(available_events)
+    window_start = slot_start - timedelta(minutes=15)
+    return index.starting_between(window_start, slot_end)
+
+
+def notification_event(ev: Dict[str, Any]) -> Dict[str, Any]:
+    is_engage = ev.get("source") == "nyu_engage"
+    return {
+        "title": ev.get("title") or ev.get("name"),
+        "start": ev.get("start"),
+        "description": ev.get("description"),
+        "location": ev.get("location") or ev.get("address"),
+        "type": "nyu_engage" if is_engage else "external"
+    }
 
 
 def check_free_time_and_events(calendar_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -147,58 +89,26 @@ def check_free_time_and_events(calendar_events: List[Dict[str, Any]]) -> List[Di
         # Calendar events are provided by the client (system calendar)
         # No need to fetch from Google Calendar
         
-        # Define time window (now to end of day)
-        now = datetime.utcnow()
-        end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=0)
+        # Define time window (now to end of day, New York time)
+        now = now_local()
         
         # Find free time slots (minimum 30 minutes)
-        free_slots = find_free_time_slots(calendar_events, now, end_of_day, min_free_duration_minutes=30)
+        free_slots = find_free_time_slots(calendar_events, now, end_of_day(now), min_free_duration_minutes=30)
         
         if not free_slots:
             return []
         
-        # Fetch available events (NYU Engage + external events)
-        available_events = []
-        try:
-            # Get NYU Engage events
-            engage_events = fetch_engage_events(days_ahead=1, limit=50)
-            for ev in engage_events:
-                available_events.append({
-                    "title": ev.get("event_name") or ev.get("name"),
-                    "start": ev.get("event_start") or ev.get("start") or ev.get("startDate"),
-                    "description": ev.get("event_description") or ev.get("description"),
-                    "location": ev.get("event_location") or ev.get("location") or ev.get("address"),
-                    "type": "nyu_engage"
-                })
-        except Exception as e:
-            logger.warning(f"Error fetching Engage events: {e}")
-        
-        try:
-            # Get external events from scrapers
-            for scraper_fn in EVENT_SOURCES:
-                try:
-                    scraped_events = scraper_fn(limit=30)
-                    for ev in scraped_events:
-                        available_events.append({
-                            "title": ev.get("title") or ev.get("name"),
-                            "start": ev.get("start"),
-                            "description": ev.get("description"),
-                            "location": ev.get("location"),
-                            "type": "external"
-                        })
-                except Exception as e:
-                    logger.warning(f"Error fetching from scraper: {e}")
-        except Exception as e:
-            logger.warning(f"Error fetching external events: {e}")
+        # Available events (NYU Engage + external), time-indexed from the shared snapshot
+        index = get_event_index()
         
         # Match free slots with events
         notifications = []
         for free_slot in free_slots:
-            matching_events = find_matching_events(free_slot, available_events)
+            matching_events = find_matching_events(free_slot, index)
             if matching_events:
                 notifications.append({
                     "free_time": free_slot,
-                    "events": matching_events
+                    "events": [notification_event(ev) for ev in matching_events]
                 })
         
         return notifications
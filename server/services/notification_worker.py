@@ -0,0 +1,253 @@
+# services/notification_worker.py
+"""
+Push notification delivery workers.
+
+Each worker takes a batch off the durable queue (services/notification_queue.py),
+groups it by provider, sends each group through that provider's transport
+(services/push_transports.py) in chunks of the provider's batch limit, and
+then per message:
+
+  delivered  → ack
+  retry      → back off (30s, 1m, 2m, … capped at 1h, with jitter) on the retry set
+  drop       → dead-letter (dedup keys kept: it would fail the same way again);
+               an unregistered device also has its stored token cleared
+  out of attempts → dead-letter, releasing its dedup keys for a later match
+
+Throughput, delivery lag (enqueue → sent) and queue depth are logged every
+REPORT_INTERVAL_SECONDS and kept as counters in the queue's metrics hash.
+
+Run it as its own process:
+    python -m services.notification_worker                # 1 worker, forever
+    python -m services.notification_worker --workers 4    # 4 worker threads
+    python -m services.notification_worker --once         # drain what's queued and exit
+    python -m services.notification_worker --stats        # print queue stats
+
+or let gunicorn start it from the master process (NOTIFICATION_WORKER=master).
+"""
+
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import random
+import socket
+import logging
+import argparse
+import threading
+from typing import Any, Dict, List
+
+from services import notification_queue as nq
+from services.push_transports import DELIVERED, RETRY, get_transport
+from services.notification_matcher import clear_invalid_tokens
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "100"))
+MAX_ATTEMPTS = 5
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+REPORT_INTERVAL_SECONDS = 60
+# How long an idle worker waits on the queue before checking retries again
+BLOCK_SECONDS = 5
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retry number `attempts` (1-based): exponential, capped, ±20% jitter."""
+    delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class NotificationWorker:
+    def __init__(self, name: str, batch_size: int = BATCH_SIZE):
+        self.name = name
+        self.batch_size = batch_size
+        self._window = self._empty_window()
+
+    @staticmethod
+    def _empty_window() -> Dict[str, Any]:
+        return {"started": time.time(), "sent": 0, "retried": 0, "dead": 0, "lag_total": 0.0, "lag_max": 0.0}
+
+    # -----------------------------------------------------------
+    # DELIVERY
+    # -----------------------------------------------------------
+
+    def _deliver(self, items: List[nq.Taken]) -> None:
+        by_provider: Dict[str, List[nq.Taken]] = {}
+        for item in items:
+            by_provider.setdefault(item[1].get("provider") or "unknown", []).append(item)
+
+        for provider, group in by_provider.items():
+            transport = get_transport(provider)
+            if transport is None:
+                for item in group:
+                    self._fail(item, f"no transport for provider {provider!r}", permanent=True)
+                continue
+            for i in range(0, len(group), transport.max_batch):
+                chunk = group[i:i + transport.max_batch]
+                try:
+                    results = transport.send([message for _, message in chunk])
+                except Exception as e:
+                    logger.warning(f"{transport.name} push failed: {e}")
+                    results = None
+                if not results or len(results) != len(chunk):
+                    for item in chunk:
+                        self._fail(item, "transport error")
+                    continue
+
+                delivered = []
+                invalid_tokens = []
+                for item, result in zip(chunk, results):
+                    if result.status == DELIVERED:
+                        delivered.append(item)
+                    else:
+                        self._fail(item, result.error, permanent=result.status != RETRY)
+                    if result.token_invalid:
+                        invalid_tokens.append((item[1].get("user_id"), item[1]["token"]))
+                self._ack(delivered)
+                self._clear_tokens(invalid_tokens)
+
+    @staticmethod
+    def _clear_tokens(tokens: List[tuple]) -> None:
+        if not tokens:
+            return
+        try:
+            cleared = clear_invalid_tokens(tokens)
+            logger.info(f"Cleared {cleared} unregistered push token(s)")
+        except Exception as e:
+            logger.warning(f"Clearing unregistered push tokens failed: {e}")
+
+    def _ack(self, delivered: List[nq.Taken]) -> None:
+        if not delivered:
+            return
+        nq.ack(self.name, delivered)
+        now = time.time()
+        lags = [now - message.get("enqueued_at", now) for _, message in delivered]
+        self._window["sent"] += len(delivered)
+        self._window["lag_total"] += sum(lags)
+        self._window["lag_max"] = max(self._window["lag_max"], max(lags))
+        nq.record_metrics({"sent": len(delivered), "lag_seconds_total": float(sum(lags))})
+
+    def _fail(self, item: nq.Taken, error: str | None, permanent: bool = False) -> None:
+        attempts = item[1].get("attempts", 0) + 1
+        if permanent or attempts >= MAX_ATTEMPTS:
+            logger.info(f"Notification {item[1].get('id')} dead-lettered after {attempts} attempt(s): {error}")
+            # A drop would fail the same way next time: keep its events marked as pushed.
+            # Only a message that ran out of retries may be matched again later
+            nq.dead_letter(self.name, item, error, release=not permanent)
+            self._window["dead"] += 1
+            nq.record_metrics({"dead": 1})
+        else:
+            nq.retry_later(self.name, item, time.time() + backoff_seconds(attempts), error)
+            self._window["retried"] += 1
+            nq.record_metrics({"retried": 1})
+
+    # -----------------------------------------------------------
+    # LOOP
+    # -----------------------------------------------------------
+
+    def run_once(self, block_seconds: float = BLOCK_SECONDS) -> int:
+        """Promote due retries, then deliver one batch. Returns the batch size."""
+        nq.promote_due_retries()
+        items = nq.take_batch(self.name, self.batch_size, block_seconds)
+        if items:
+            self._deliver(items)
+        return len(items)
+
+    def report(self, force: bool = False) -> Dict[str, Any] | None:
+        """Log throughput/lag for the window since the last report (every REPORT_INTERVAL_SECONDS)."""
+        elapsed = time.time() - self._window["started"]
+        if not force and elapsed < REPORT_INTERVAL_SECONDS:
+            return None
+        w, self._window = self._window, self._empty_window()
+        stats = nq.queue_stats()
+        summary = {
+            "worker": self.name,
+            "sent": w["sent"],
+            "per_second": round(w["sent"] / elapsed, 2) if elapsed else 0.0,
+            "avg_lag_seconds": round(w["lag_total"] / w["sent"], 1) if w["sent"] else 0.0,
+            "max_lag_seconds": round(w["lag_max"], 1),
+            "retried": w["retried"],
+            "dead": w["dead"],
+            "queue_depth": stats["depth"],
+            "queue_lag_seconds": stats["lag_seconds"],
+        }
+        if w["sent"] or w["retried"] or w["dead"] or stats["depth"]:
+            logger.info(
+                f"Notifications [{self.name}]: {summary['sent']} sent ({summary['per_second']}/s), "
+                f"lag avg {summary['avg_lag_seconds']}s max {summary['max_lag_seconds']}s, "
+                f"{summary['retried']} retried, {summary['dead']} dead; "
+                f"queue {summary['queue_depth']} deep, oldest {summary['queue_lag_seconds']}s"
+            )
+        return summary
+
+    def run_forever(self, stop_event: threading.Event | None = None) -> None:
+        stop_event = stop_event or threading.Event()
+        recovered = nq.recover_worker(self.name)
+        if recovered:
+            logger.info(f"Notification worker {self.name}: re-queued {recovered} unacked message(s)")
+        logger.info(f"Notification worker {self.name} started")
+        while not stop_event.is_set():
+            try:
+                self.run_once()
+                self.report()
+            except Exception as e:
+                logger.error(f"Notification worker {self.name} pass failed: {e}", exc_info=True)
+                stop_event.wait(BLOCK_SECONDS)
+
+    def drain(self) -> int:
+        """Deliver everything queued right now (due retries included) and return."""
+        nq.recover_worker(self.name)
+        total = 0
+        while True:
+            n = self.run_once(block_seconds=0)
+            if not n:
+                return total
+            total += n
+
+
+# -----------------------------------------------------------
+# CLI
+# -----------------------------------------------------------
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Deliver queued push notifications.")
+    parser.add_argument("--workers", type=int, default=1, help="worker threads in this process")
+    parser.add_argument("--name", default=socket.gethostname(), help="stable worker name (unacked work is "
+                        "re-queued when a worker with the same name starts)")
+    parser.add_argument("--once", action="store_true", help="deliver what is queued now and exit")
+    parser.add_argument("--stats", action="store_true", help="print queue stats and exit")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if args.stats:
+        print(json.dumps(nq.queue_stats(), indent=2))
+        return 0
+
+    workers = [NotificationWorker(f"{args.name}-{i}") for i in range(max(1, args.workers))]
+    if args.once:
+        for worker in workers:
+            worker.drain()
+            worker.report(force=True)
+        return 0
+
+    stop_event = threading.Event()
+    threads = [
+        threading.Thread(target=w.run_forever, args=(stop_event,), name=f"notify-{w.name}", daemon=True)
+        for w in workers
+    ]
+    for t in threads:
+        t.start()
+    try:
+        while any(t.is_alive() for t in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop_event.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
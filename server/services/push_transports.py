@@ -0,0 +1,149 @@
+# services/push_transports.py
+"""
+Push providers for the notification worker.
+
+A transport sends a batch of queued messages to one provider and reports
+per message whether it was delivered, should be retried later, or should
+be dropped (bad token, rejected payload). Providers are picked from the
+token format; NOTIFICATION_TRANSPORT=stub sends everything to the local
+stub instead (development, tests, load runs).
+
+    register_transport(MyTransport())      # add or replace a provider
+    get_transport(provider_for_token(tok))
+"""
+
+from __future__ import annotations
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+EXPO_ACCESS_TOKEN = os.getenv("EXPO_ACCESS_TOKEN")
+
+# Delivery outcomes
+DELIVERED = "ok"
+RETRY = "retry"
+DROP = "drop"
+
+
+class DeliveryResult:
+    """`token_invalid` means the provider says the token is gone for good (app uninstalled)."""
+
+    def __init__(self, status: str, error: Optional[str] = None, token_invalid: bool = False):
+        self.status = status
+        self.error = error
+        self.token_invalid = token_invalid
+
+    def __repr__(self) -> str:
+        return f"DeliveryResult({self.status!r}, {self.error!r})"
+
+
+class PushTransport:
+    """Base class: `name` is the provider key, `max_batch` its request size limit."""
+
+    name = "base"
+    max_batch = 100
+
+    def send(self, messages: List[Dict[str, Any]]) -> List[DeliveryResult]:
+        raise NotImplementedError
+
+
+class StubTransport(PushTransport):
+    """Records messages instead of sending them. `fail_with` forces an outcome."""
+
+    name = "stub"
+    max_batch = 500
+
+    def __init__(self, fail_with: Optional[str] = None):
+        self.sent: List[Dict[str, Any]] = []
+        self.fail_with = fail_with
+        self._lock = threading.Lock()
+
+    def send(self, messages: List[Dict[str, Any]]) -> List[DeliveryResult]:
+        if self.fail_with:
+            return [DeliveryResult(self.fail_with, "stub failure") for _ in messages]
+        with self._lock:
+            self.sent.extend(messages)
+        return [DeliveryResult(DELIVERED) for _ in messages]
+
+
+class ExpoTransport(PushTransport):
+    """Expo push service: up to 100 messages per request, one ticket per message."""
+
+    name = "expo"
+    max_batch = 100
+
+    # Ticket errors that will never succeed for this token/payload
+    _PERMANENT = {"DeviceNotRegistered", "InvalidCredentials", "MessageTooBig"}
+
+    def __init__(self, session: Optional[requests.Session] = None, timeout: float = 10):
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    @staticmethod
+    def _payload(message: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "to": message["token"],
+            "title": message.get("title"),
+            "body": message.get("body"),
+            "data": message.get("data") or {},
+            "sound": "default",
+        }
+
+    def send(self, messages: List[Dict[str, Any]]) -> List[DeliveryResult]:
+        headers = {"Accept": "application/json", "Content-Type": "application/json"}
+        if EXPO_ACCESS_TOKEN:
+            headers["Authorization"] = f"Bearer {EXPO_ACCESS_TOKEN}"
+        try:
+            r = self.session.post(EXPO_PUSH_URL, json=[self._payload(m) for m in messages],
+                                  headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            return [DeliveryResult(RETRY, f"transport error: {e}") for _ in messages]
+
+        if r.status_code == 429 or r.status_code >= 500:
+            return [DeliveryResult(RETRY, f"HTTP {r.status_code}") for _ in messages]
+        if r.status_code >= 400:
+            return [DeliveryResult(DROP, f"HTTP {r.status_code}: {r.text[:200]}") for _ in messages]
+
+        tickets = (r.json() or {}).get("data") or []
+        results = []
+        for i in range(len(messages)):
+            ticket = tickets[i] if i < len(tickets) else {}
+            if ticket.get("status") == "ok":
+                results.append(DeliveryResult(DELIVERED))
+                continue
+            error = (ticket.get("details") or {}).get("error") or ticket.get("message") or "no ticket"
+            results.append(DeliveryResult(DROP if error in self._PERMANENT else RETRY, error,
+                                          token_invalid=error == "DeviceNotRegistered"))
+        return results
+
+
+# -----------------------------------------------------------
+# REGISTRY
+# -----------------------------------------------------------
+
+_transports: Dict[str, PushTransport] = {t.name: t for t in (ExpoTransport(), StubTransport())}
+_registry_lock = threading.Lock()
+
+
+def register_transport(transport: PushTransport) -> None:
+    with _registry_lock:
+        _transports[transport.name] = transport
+
+
+def get_transport(provider: str) -> Optional[PushTransport]:
+    """The transport for a provider (or the NOTIFICATION_TRANSPORT override); None if there is none."""
+    with _registry_lock:
+        return _transports.get(os.getenv("NOTIFICATION_TRANSPORT") or provider)
+
+
+def provider_for_token(token: str) -> str:
+    """Expo tokens look like ExponentPushToken[...]; anything else is a raw APNs token."""
+    if token.startswith(("ExponentPushToken[", "ExpoPushToken[")):
+        return "expo"
+    return "apns"
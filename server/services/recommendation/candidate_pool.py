@@ -0,0 +1,135 @@
+# services/recommendation/candidate_pool.py
+"""
+Request-scoped memo of upstream lookups for one origin.
+
+Planning a whole day asks the same questions for every free block: which
+cafes/parks are near the user, how long is the walk to X, which events are
+in the feed. A CandidatePool answers each of those once per request, so the
+upstream cost of N blocks is roughly the cost of one.
+
+A pool may be shared by threads (the dashboard fills its sections
+concurrently): a lookup already in flight is waited on, not repeated.
+Failed lookups are not memoized and are reported by places_failed() /
+directions_failed(), so a caller that keeps results beyond the request
+(the geo-tile cache) can tell an upstream error from an empty answer.
+"""
+
+from __future__ import annotations
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.places_service import nearby_places
+from services.directions_service import get_walking_directions
+from services.recommendation.events import get_external_event_index
+
+logger = logging.getLogger(__name__)
+
+# ~10 cm; two lookups closer than that share directions
+_COORD_PRECISION = 6
+# Parallel upstream lookups per places_many()/directions_many() call
+LOOKUP_WORKERS = 8
+
+
+class CandidatePool:
+    def __init__(self, origin_lat: float, origin_lng: float):
+        self.origin_lat = origin_lat
+        self.origin_lng = origin_lng
+        self._places: Dict[Tuple[str, int], Future] = {}
+        self._directions: Dict[Tuple[float, float], Future] = {}
+        self._event_index = None
+        self._lock = threading.Lock()
+        # (stat, key) of lookups whose last attempt failed; not memoized, so they are retried
+        self._failed: set = set()
+        self.stats = {"places_calls": 0, "directions_calls": 0, "failures": 0}
+
+    def _once(self, memo: Dict[Any, Future], key: Any, stat: str, fetch: Callable[[], Any], default: Any,
+              none_is_failure: bool = False):
+        """
+        fetch() for the first caller of `key`; everyone else gets (or waits for)
+        its result. A failed fetch hands `default` to its waiters but is
+        forgotten, so the next caller tries again.
+        """
+        with self._lock:
+            future = memo.get(key)
+            owner = future is None
+            if owner:
+                future = memo[key] = Future()
+                self.stats[stat] += 1
+        if owner:
+            try:
+                result = fetch()
+                failed = result is None and none_is_failure
+            except Exception as e:
+                logger.debug(f"CandidatePool {stat} lookup {key} failed: {e}")
+                result, failed = default, True
+            with self._lock:
+                if failed:
+                    memo.pop(key, None)
+                    self._failed.add((stat, key))
+                    self.stats["failures"] += 1
+                else:
+                    self._failed.discard((stat, key))
+            future.set_result(result)
+        return future.result()
+
+    @staticmethod
+    def _directions_key(dest_lat: float, dest_lng: float) -> Tuple[float, float]:
+        return round(dest_lat, _COORD_PRECISION), round(dest_lng, _COORD_PRECISION)
+
+    def places(self, place_type: str, radius: int = 1500) -> List[Dict[str, Any]]:
+        """nearby_places() around the origin, fetched once per (type, radius)."""
+        return self._once(
+            self._places, (place_type, radius), "places_calls",
+            lambda: nearby_places(self.origin_lat, self.origin_lng, place_type, radius=radius) or [],
+            [],
+        )
+
+    def directions(self, dest_lat: float, dest_lng: float) -> Optional[Dict[str, Any]]:
+        """Walking/transit directions from the origin, fetched once per destination."""
+        # get_walking_directions() returns None on any failure
+        return self._once(
+            self._directions, self._directions_key(dest_lat, dest_lng), "directions_calls",
+            lambda: get_walking_directions(self.origin_lat, self.origin_lng, dest_lat, dest_lng),
+            None, none_is_failure=True,
+        )
+
+    def places_failed(self, place_types: Iterable[str], radius: int = 1500) -> bool:
+        """Whether the last lookup of any of these place types failed."""
+        with self._lock:
+            return any(("places_calls", (t, radius)) in self._failed for t in place_types)
+
+    def directions_failed(self, dests: Iterable[Tuple[float, float]]) -> bool:
+        """Whether the last directions lookup to any of these destinations failed."""
+        with self._lock:
+            return any(("directions_calls", self._directions_key(*d)) in self._failed for d in dests)
+
+    @staticmethod
+    def _parallel(fn: Callable[..., Any], args: List[tuple]) -> List[Any]:
+        if len(args) <= 1:
+            return [fn(*a) for a in args]
+        with ThreadPoolExecutor(max_workers=min(LOOKUP_WORKERS, len(args)), thread_name_prefix="pool-lookup") as executor:
+            return list(executor.map(lambda a: fn(*a), args))
+
+    def places_many(self, place_types: Iterable[str], radius: int = 1500) -> List[List[Dict[str, Any]]]:
+        """places() for every type, looked up in parallel; results in input order."""
+        return self._parallel(self.places, [(t, radius) for t in place_types])
+
+    def directions_many(self, dests: Iterable[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+        """directions() for every (lat, lng), looked up in parallel; results in input order."""
+        return self._parallel(self.directions, [tuple(d) for d in dests])
+
+    def directions_from(self, origin_lat: float, origin_lng: float, dest_lat: float, dest_lng: float):
+        """get_walking_directions()-compatible; memoized when the origin is ours."""
+        if (origin_lat, origin_lng) == (self.origin_lat, self.origin_lng):
+            return self.directions(dest_lat, dest_lng)
+        return get_walking_directions(origin_lat, origin_lng, dest_lat, dest_lng)
+
+    @property
+    def event_index(self):
+        """The external event index, pinned for the life of the request."""
+        with self._lock:
+            if self._event_index is None:
+                self._event_index = get_external_event_index()
+            return self._event_index
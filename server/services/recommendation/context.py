@@ -1,6 +1,8 @@
 # services/recommendation/context.py
 from typing import List, Dict, Any
 
+from services.recommendation.memory import compact_history
+
 
 class ConversationContext:
     """
@@ -9,6 +11,7 @@ class ConversationContext:
 
     def __init__(self):
         self.history: List[Dict[str, str]] = []
+        self.summary: str = ""  # rolling summary of turns folded out of history
         self.last_places: List[Dict[str, Any]] = []
         self.all_results: List[Dict[str, Any]] = []
         self.result_index: int = 0
@@ -20,6 +23,7 @@ class ConversationContext:
     # HISTORIES
     def add_message(self, role: str, content: str):
         self.history.append({"role": role, "content": content})
+        compact_history(self)
 
     # RESULTS
     def set_places(self, places: List[Dict[str, Any]]):
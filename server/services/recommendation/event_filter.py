@@ -1,5 +1,8 @@
 # services/recommendation/event_filter.py
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+from services.event_index import EventIndex
+from utils.datetime_utils import parse_datetime, now_local
 
 # vibes/messages that should NEVER show events
 BLOCK_EVENTS_FOR = [
@@ -8,21 +11,27 @@ BLOCK_EVENTS_FOR = [
 ]
 
 
-def filter_events(vibe: str, message: str, events: list):
+def filter_events(vibe: str, message: str, events):
+    """
+    events may be a plain list or an EventIndex (preferred: start/end are
+    already parsed and the time window is a bisect lookup).
+    """
     msg = message.lower()
 
     # HARD BLOCK — never show events for certain queries
     if any(word in msg for word in BLOCK_EVENTS_FOR):
         return []
 
+    index = events if isinstance(events, EventIndex) else EventIndex(events)
     allowed_vibes = ["party", "fun", "explore", "shopping"]
+    now = now_local()
 
     # STRICT MODE — only events happening right now
     if vibe not in allowed_vibes:
-        return [e for e in events if _is_happening_now(e)]
+        return index.happening_at(now)
 
     # OPEN MODE — events happening soon
-    return [e for e in events if _is_within_next_few_hours(e)]
+    return index.starting_between(now, now + timedelta(hours=2))
 
 
 # ---------------------------------------------------------------------
@@ -30,27 +39,10 @@ def filter_events(vibe: str, message: str, events: list):
 # ---------------------------------------------------------------------
 def _parse(event, key):
     """
-    Always return datetime or None.
+    Always return an aware datetime or None.
     Accepts ISO, ISO-with-Z, or already-normalized datetime.
     """
-    value = event.get(key)
-    if not value:
-        return None
-
-    # Already a datetime? return safely
-    if isinstance(value, datetime):
-        return value
-
-    # Handle strings
-    if isinstance(value, str):
-        try:
-            # Remove Z if present
-            cleaned = value.replace("Z", "").strip()
-            return datetime.fromisoformat(cleaned)
-        except:
-            return None
-
-    return None
+    return parse_datetime(event.get(key))
 
 
 # ---------------------------------------------------------------------
@@ -64,7 +56,7 @@ def _is_happening_now(event):
     if not start or not end:
         return False
 
-    now = datetime.now()
+    now = now_local()
     return start <= now <= end
 
 
@@ -73,7 +65,7 @@ def _is_within_next_few_hours(event):
     if not start:
         return False
 
-    now = datetime.now()
+    now = now_local()
     soon = now + timedelta(hours=2)
 
     # Event starts now → 2hrs from now
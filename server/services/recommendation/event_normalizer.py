@@ -1,14 +1,16 @@
 # server/services/recommendation/event_normalizer.py
-from typing import Dict, Any, Optional
-from datetime import datetime
-from services.directions_service import get_walking_directions
+from typing import Dict, Any, Optional, Callable
+from services.directions_service import maps_directions_link
 from services.places_service import build_photo_url
+from services.location_utils import estimated_walk_minutes, haversine
+from utils.datetime_utils import parse_datetime
 
 TANDON_LAT = 40.6942
 TANDON_LNG = -73.9866
 
 
-def normalize_event(ev: Dict[str, Any], origin_lat: float | None = None, origin_lng: float | None = None) -> Dict[str, Any]:
+def normalize_event(ev: Dict[str, Any], origin_lat: float | None = None, origin_lng: float | None = None,
+                    directions_lookup: Optional[Callable[..., Optional[Dict[str, Any]]]] = None) -> Dict[str, Any]:
     """
     Convert your raw event record into a unified place/event card.
     Works for all events (NYU Engage, external events, scraped events).
@@ -17,6 +19,10 @@ def normalize_event(ev: Dict[str, Any], origin_lat: float | None = None, origin_
         ev: Event dictionary
         origin_lat: Origin latitude for distance calculation (defaults to Tandon if not provided)
         origin_lng: Origin longitude for distance calculation (defaults to Tandon if not provided)
+        directions_lookup: get_walking_directions-compatible callable (e.g. a
+            CandidatePool's memoized one). Without it no API call is made:
+            walk_time is estimated from the straight-line distance and the
+            card is flagged approximate_travel.
     """
 
     # Extract fields safely
@@ -34,15 +40,26 @@ def normalize_event(ev: Dict[str, Any], origin_lat: float | None = None, origin_
     origin_lat = origin_lat if origin_lat is not None else TANDON_LAT
     origin_lng = origin_lng if origin_lng is not None else TANDON_LNG
 
-    # Compute walking info (only if event has coordinates)
+    # Straight-line distance from coordinates attached at ingest (no API call)
+    distance_m = None
+    if lat is not None and lng is not None:
+        distance_m = round(haversine(origin_lat, origin_lng, lat, lng))
+
+    # Routed walking info only when the caller asks for it (only if event has coordinates)
     directions = None
-    if lat and lng:
+    if lat and lng and directions_lookup is not None:
         try:
-            directions = get_walking_directions(
-                origin_lat, origin_lng, lat, lng
-            )
+            directions = directions_lookup(origin_lat, origin_lng, lat, lng)
         except Exception:
             directions = None
+    if directions is None and distance_m is not None:
+        minutes = estimated_walk_minutes(distance_m)
+        directions = {
+            "duration_text": f"{minutes} min" if minutes == 1 else f"{minutes} mins",
+            "distance_text": f"{distance_m / 1609.34:.1f} mi",
+            "maps_link": maps_directions_link(lat, lng, origin_lat, origin_lng),
+            "approximate": True,
+        }
 
     return {
         "type": "event",
@@ -62,7 +79,9 @@ def normalize_event(ev: Dict[str, Any], origin_lat: float | None = None, origin_
 
         "walk_time": directions["duration_text"] if directions else None,
         "distance": directions["distance_text"] if directions else None,
+        "distance_m": distance_m,
         "maps_link": directions["maps_link"] if directions else None,
+        "approximate_travel": bool(directions and directions.get("approximate")),
 
         "photo_url": build_photo_url(ev.get("photo_reference")),
         "rating": 0.0,  # events don't have ratings → neutral
@@ -71,12 +90,6 @@ def normalize_event(ev: Dict[str, Any], origin_lat: float | None = None, origin_
 
 def parse_date(value: Optional[str]):
     """
-    Parse ISO date safely. Returns datetime or None.
+    Parse ISO date safely. Returns an aware datetime or None.
     """
-    if not value:
-        return None
-
-    try:
-        return datetime.fromisoformat(value.replace("Z", ""))
-    except Exception:
-        return None
+    return parse_datetime(value)
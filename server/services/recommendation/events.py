@@ -1,26 +1,101 @@
 # server/services/recommendation/events.py
+"""
+Static events from static/events.json.
+
+The parsed, normalized list is kept in memory and only reloaded when the
+file's mtime or size changes, so callers (every chat turn, every free-time
+suggestion) pay a stat() rather than a json.load. An EventIndex over the
+same list is built once per load.
+"""
+import os
 import json
+import logging
+import threading
 from pathlib import Path
-import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.event_index import EventIndex
+from utils.datetime_utils import parse_datetime
+
+logger = logging.getLogger(__name__)
 
 # Get the server root directory (parent of services/recommendation)
 SERVER_ROOT = Path(__file__).parent.parent.parent
 EVENTS_FILE = SERVER_ROOT / "static" / "events.json"
 
-def fetch_all_external_events():
+_lock = threading.Lock()
+_signature: Optional[Tuple[int, int]] = None
+_events: List[Dict[str, Any]] = []
+_index: Optional[EventIndex] = None
+
+
+def _normalize(ev: Dict[str, Any]) -> Dict[str, Any]:
+    """Rewrite start/end as aware ISO strings, like ingested events."""
+    ev = dict(ev)
+    for key in ("start", "end"):
+        parsed = parse_datetime(ev.get(key))
+        if parsed is not None:
+            ev[key] = parsed.isoformat()
+    return ev
+
+
+def _file_signature() -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(EVENTS_FILE)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _load(signature: Optional[Tuple[int, int]]) -> None:
+    global _signature, _events, _index
+
+    events: List[Dict[str, Any]] = []
+    if signature is not None:
+        try:
+            with open(EVENTS_FILE, "r") as f:
+                data = json.load(f)
+            events = [_normalize(ev) for ev in data.get("events", []) if isinstance(ev, dict)]
+        except Exception as ex:
+            # Keep serving what we had; retry once the file changes again
+            logger.error(f"Failed to load {EVENTS_FILE}: {ex}")
+            _signature = signature
+            return
+
+    _events = events
+    _index = None
+    _signature = signature
+    if signature is not None:
+        logger.info(f"Loaded {len(events)} static events from {EVENTS_FILE}")
+
+
+def _refresh() -> None:
+    signature = _file_signature()
+    if signature != _signature:
+        with _lock:
+            if signature != _signature:
+                _load(signature)
+
+
+def fetch_all_external_events() -> List[Dict[str, Any]]:
     """
-    Returns raw JSON list of events from your static file.
-    If the file doesn't exist, returns an empty list (no error).
+    Events from the static file (empty if the file doesn't exist).
+    The list is shared across requests; don't mutate it or its events.
     """
-    if not EVENTS_FILE.exists():
-        # File doesn't exist - this is OK, just return empty list
-        return []
-    
-    try:
-        with open(EVENTS_FILE, "r") as f:
-            data = json.load(f)
-            return data.get("events", [])
-    except Exception as ex:
-        # Log the error but don't crash - return empty list
-        print(f"EVENT LOAD ERROR: {ex}")
-        return []
+    _refresh()
+    return _events
+
+
+def get_external_event_index() -> EventIndex:
+    """Time index over the static events, rebuilt only when the file changes."""
+    global _index
+    _refresh()
+    with _lock:
+        if _index is None:
+            _index = EventIndex(_events)
+        return _index
+
+
+def preload_external_events() -> int:
+    """Load the file at startup so the first request doesn't pay for it."""
+    return len(fetch_all_external_events())
@@ -0,0 +1,209 @@
+# services/recommendation/intent_classifier.py
+"""
+Lightweight local intent classifier.
+
+Character n-grams (plus whole words) are hashed into a fixed-size feature vector and fed to one
+softmax (multinomial logistic) regression per head: "intent_type" and "vibe".
+Prediction is a sparse dot product, well under a millisecond per message.
+
+Train with scripts/train_intent_classifier.py; the model is a single .npz
+file loaded once at startup (see load_intent_classifier). It carries a
+per-head confidence threshold picked on the hold-out set for high precision;
+predictions below it are not returned.
+"""
+
+from __future__ import annotations
+import os
+import logging
+import zlib
+from typing import Dict, List, Tuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SERVER_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_MODEL_PATH = os.path.join(SERVER_ROOT, "data", "intent_classifier.npz")
+MODEL_PATH = os.getenv("INTENT_MODEL_PATH") or DEFAULT_MODEL_PATH
+
+HEADS = ("intent_type", "vibe")
+
+N_FEATURES = 2 ** 14
+NGRAM_RANGE = (2, 4)
+
+# Used for heads the model has no calibrated threshold for (trained without a hold-out set)
+FALLBACK_MIN_CONFIDENCE = 0.9
+
+_classifier: Optional["IntentClassifier"] = None
+_load_attempted = False
+
+
+# -----------------------------------------------------------
+# FEATURES
+# -----------------------------------------------------------
+
+def featurize(text: str, n_features: int = N_FEATURES) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed character n-gram and word counts for a message, as (indices,
+    L2-normalized values). crc32 keeps the hashing stable across processes,
+    unlike hash().
+    """
+    words = (text or "").lower().split()
+    padded = f" {' '.join(words)} "
+    grams = [f"w:{w.strip('?!.,')}" for w in words]
+    lo, hi = NGRAM_RANGE
+    for n in range(lo, hi + 1):
+        grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+    counts: Dict[int, float] = {}
+    for gram in grams:
+        idx = zlib.crc32(gram.encode("utf-8")) % n_features
+        counts[idx] = counts.get(idx, 0.0) + 1.0
+
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+def _feature_matrix(messages: List[str], n_features: int) -> np.ndarray:
+    X = np.zeros((len(messages), n_features), dtype=np.float32)
+    for row, message in enumerate(messages):
+        indices, values = featurize(message, n_features)
+        X[row, indices] = values
+    return X
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+# -----------------------------------------------------------
+# MODEL
+# -----------------------------------------------------------
+
+class IntentClassifier:
+    """One softmax regression head per label set, sharing the same features."""
+
+    def __init__(
+        self,
+        heads: Dict[str, Tuple[List[str], np.ndarray, np.ndarray]],
+        n_features: int = N_FEATURES,
+        thresholds: Optional[Dict[str, float]] = None,
+    ):
+        # head -> (labels, weights [n_features x n_labels], bias [n_labels])
+        self.heads = heads
+        self.n_features = n_features
+        # head -> minimum probability to trust a prediction
+        self.thresholds = thresholds or {}
+
+    @classmethod
+    def train(
+        cls,
+        messages: List[str],
+        labels: Dict[str, List[str]],
+        epochs: int = 600,
+        learning_rate: float = 4.0,
+        l2: float = 1e-4,
+        n_features: int = N_FEATURES,
+    ) -> "IntentClassifier":
+        """Full-batch gradient descent on the cross-entropy loss, per head."""
+        X = _feature_matrix(messages, n_features)
+        heads = {}
+        for head, head_labels in labels.items():
+            classes = sorted(set(head_labels))
+            y = np.array([classes.index(label) for label in head_labels])
+            Y = np.eye(len(classes), dtype=np.float32)[y]
+
+            W = np.zeros((n_features, len(classes)), dtype=np.float32)
+            b = np.zeros(len(classes), dtype=np.float32)
+            for _ in range(epochs):
+                grad = (_softmax(X @ W + b) - Y) / len(messages)
+                W -= learning_rate * (X.T @ grad + l2 * W)
+                b -= learning_rate * grad.sum(axis=0)
+            heads[head] = (classes, W, b)
+        return cls(heads, n_features)
+
+    def predict(self, message: str) -> Dict[str, Tuple[str, float]]:
+        """{"intent_type": (label, probability), "vibe": (label, probability)}"""
+        indices, values = featurize(message, self.n_features)
+        result = {}
+        for head, (classes, W, b) in self.heads.items():
+            probs = _softmax(values @ W[indices] + b)
+            best = int(probs.argmax())
+            result[head] = (classes[best], float(probs[best]))
+        return result
+
+    def save(self, path: str) -> None:
+        arrays = {"n_features": np.array(self.n_features), "heads": np.array(list(self.heads))}
+        for head, (classes, W, b) in self.heads.items():
+            arrays[f"{head}__classes"] = np.array(classes)
+            arrays[f"{head}__W"] = W
+            arrays[f"{head}__b"] = b
+            if head in self.thresholds:
+                arrays[f"{head}__threshold"] = np.array(self.thresholds[head])
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with np.load(path) as data:
+            heads, thresholds = {}, {}
+            for head in data["heads"].tolist():
+                heads[head] = (
+                    data[f"{head}__classes"].tolist(),
+                    data[f"{head}__W"],
+                    data[f"{head}__b"],
+                )
+                if f"{head}__threshold" in data.files:
+                    thresholds[head] = float(data[f"{head}__threshold"])
+            return cls(heads, int(data["n_features"]), thresholds)
+
+
+# -----------------------------------------------------------
+# PROCESS-WIDE INSTANCE
+# -----------------------------------------------------------
+
+def load_intent_classifier(path: str = MODEL_PATH) -> Optional[IntentClassifier]:
+    """Load the serialized model once. Returns None if it isn't there."""
+    global _classifier, _load_attempted
+    _load_attempted = True
+    if not os.path.exists(path):
+        logger.warning(f"Intent classifier model not found at {path}; local classification disabled")
+        _classifier = None
+        return None
+    try:
+        _classifier = IntentClassifier.load(path)
+        logger.info(f"Intent classifier loaded from {path}")
+    except Exception as e:
+        logger.error(f"Failed to load intent classifier from {path}: {e}")
+        _classifier = None
+    return _classifier
+
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    if not _load_attempted:
+        load_intent_classifier()
+    return _classifier
+
+
+def predict_intent(message: str, min_confidence: Optional[float] = None) -> Dict[str, str]:
+    """
+    Labels per head whose probability reaches min_confidence, e.g.
+    {"intent_type": "coffee", "vibe": "study"}. Empty without a model.
+    min_confidence defaults to each head's calibrated threshold.
+    """
+    classifier = get_intent_classifier()
+    if classifier is None or not (message or "").strip():
+        return {}
+    return {
+        head: label
+        for head, (label, prob) in classifier.predict(message).items()
+        if prob >= (min_confidence if min_confidence is not None
+                    else classifier.thresholds.get(head, FALLBACK_MIN_CONFIDENCE))
+    }
@@ -1,30 +1,103 @@
 # services/recommendation/llm_reply.py
 
+import os
+import re
+import json
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import google.generativeai as genai
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from services.recommendation.context import ConversationContext
+from services.recommendation.memory import build_history_prompt
 
 logger = logging.getLogger(__name__)
 
+# Structured replies: Gemini returns JSON with the reply text and the ids of the
+# listed items it mentions, so cards are attached by id instead of parsing
+# names back out of free text. Set STRUCTURED_REPLIES=false to turn off.
+STRUCTURED_REPLIES = os.getenv("STRUCTURED_REPLIES", "true").lower() != "false"
+
+STRUCTURED_OUTPUT_RULES = """
+OUTPUT FORMAT:
+Respond with a single JSON object and nothing else:
+{"reply": "<your reply to the user>", "item_ids": ["<id>", ...]}
+- "item_ids" lists the [id] of every option above that your reply mentions, in the order you mention them
+- Use only ids shown in square brackets above; use [] if you mention none
+- Never put ids or brackets in the reply text itself
+"""
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def item_id(index: int) -> str:
+    """Short id shown to the LLM for the item at this position."""
+    return f"o{index + 1}"
 
-def format_items_for_prompt(items: List[Dict[str, Any]]) -> str:
+
+def format_items_for_prompt(items: List[Dict[str, Any]], with_ids: bool = False, start: int = 0) -> str:
     """
     Convert the card items into readable bullet lines for prompting the LLM.
     Each item is guaranteed to already be selected as an option.
+    With with_ids, each line carries the item's id (numbered from start).
     """
     lines = []
-    for i, item in enumerate(items):
+    for i, item in enumerate(items, start=start):
         name = item.get("name", "Unknown")
         distance = item.get("distance") or "distance unknown"
         walk = item.get("walk_time") or "walk time unknown"
 
-        lines.append(f"{i+1}. {name} — {distance} ({walk})")
+        label = f"[{item_id(i)}] {name}" if with_ids else name
+        lines.append(f"{i+1}. {label} — {distance} ({walk})")
 
     return "\n".join(lines)
 
 
+def parse_structured_reply(
+    text: str,
+    candidates: List[Dict[str, Any]],
+) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Parse {"reply": ..., "item_ids": [...]} into (reply, mentioned items).
+    Unknown ids are ignored. Returns None if the output isn't valid.
+    """
+    try:
+        data = json.loads(_CODE_FENCE.sub("", text.strip()))
+    except (ValueError, TypeError):
+        return None
+
+    if not isinstance(data, dict):
+        return None
+    reply = data.get("reply")
+    item_ids = data.get("item_ids", [])
+    if not isinstance(reply, str) or not reply.strip() or not isinstance(item_ids, list):
+        return None
+
+    by_id = {item_id(i): item for i, item in enumerate(candidates)}
+    mentioned = []
+    for iid in dict.fromkeys(str(x).strip("[] ") for x in item_ids):
+        if iid in by_id:
+            mentioned.append(by_id[iid])
+        else:
+            logger.debug(f"Structured reply referenced unknown item id {iid!r}")
+    return reply.strip(), mentioned
+
+
+def _generation_kwargs(structured: bool) -> Dict[str, Any]:
+    kwargs = {"request_options": {"timeout": 10}}
+    if structured:
+        kwargs["generation_config"] = {"response_mime_type": "application/json"}
+    return kwargs
+
+
+def _read_structured(text: str, candidates: List[Dict[str, Any]]) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+    """(reply, mentioned items), or (raw text, None) when the JSON didn't parse."""
+    parsed = parse_structured_reply(text, candidates)
+    if parsed is None:
+        logger.warning("Structured reply did not parse; falling back to free-text reply")
+        return text, None
+    return parsed
+
+
 @retry(
     stop=stop_after_attempt(2),
     wait=wait_exponential(multiplier=1, min=1, max=3),
@@ -37,14 +110,18 @@ def generate_list_reply(
     user_location: Dict[str, Any] = None,
     user_profile: Dict[str, Any] = None,
     selected_vibe: str = None,
-    commute_preference: str = None
-) -> str:
+    commute_preference: str = None,
+    structured: bool = False
+):
     """
     Use Gemini to generate a friendly reply describing only the provided items.
     This never invents extra places, events, or details.
-    """
 
-    items_text = format_items_for_prompt(items)
+    With structured=True, returns (reply, mentioned items); mentioned is None
+    when the structured output couldn't be used.
+    """
+    structured_mode = structured and STRUCTURED_REPLIES
+    items_text = format_items_for_prompt(items, with_ids=structured_mode)
 
     # Build location context
     location_context = ""
@@ -144,22 +221,28 @@ CRITICAL RULES:
 7. Stay relevant to the app's context - all recommendations are for NYU students in Downtown Brooklyn
 8. If user asks about something outside your scope (like making reservations), politely redirect to what you can help with
 """
+    if structured_mode:
+        prompt += STRUCTURED_OUTPUT_RULES
 
     try:
         model = genai.GenerativeModel("models/gemini-2.5-flash")
-        resp = model.generate_content(prompt, request_options={"timeout": 10})
+        resp = model.generate_content(prompt, **_generation_kwargs(structured_mode))
         text = getattr(resp, "text", None)
         if not text:
             logger.warning("Gemini returned empty response")
-            return format_fallback_reply(items)
-        
+            return _fallback_result(items, structured)
+
+        mentioned = None
+        if structured_mode:
+            text, mentioned = _read_structured(text, items)
+
         # Clean up any unwanted greetings
         cleaned = remove_greetings(text.strip())
-        return cleaned
+        return (cleaned, mentioned) if structured else cleaned
 
     except Exception as e:
         logger.error(f"LLM reply error: {e}", exc_info=True)
-        return format_fallback_reply(items)
+        return _fallback_result(items, structured)
 
 
 def generate_contextual_reply(
@@ -169,27 +252,21 @@ def generate_contextual_reply(
     user_location: Dict[str, Any] = None,
     user_profile: Dict[str, Any] = None,
     selected_vibe: str = None,
-    commute_preference: str = None
-) -> str:
+    commute_preference: str = None,
+    structured: bool = False
+):
     """
     Generate a context-aware reply that considers conversation history.
     Handles follow-up questions intelligently by using previous context.
+
+    With structured=True, returns (reply, mentioned items) where mentioned can
+    include previous recommendations; mentioned is None when the structured
+    output couldn't be used.
     """
+    structured_mode = structured and STRUCTURED_REPLIES
     
-    # Build conversation history context
-    history_context = ""
-    if memory.history:
-        # Include last 3 exchanges for context (6 messages: 3 user + 3 assistant)
-        recent_history = memory.history[-6:]
-        history_lines = []
-        for msg in recent_history:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            if role == "user":
-                history_lines.append(f"User: {content}")
-            else:
-                history_lines.append(f"Assistant: {content}")
-        history_context = "\n".join(history_lines)
+    # Build conversation history context (rolling summary + recent turns, token-budgeted)
+    history_context = build_history_prompt(memory) if (memory.history or memory.summary) else ""
     
     # Build previous recommendations context
     # Only include if this is a follow-up within the same session (not a new session)
@@ -200,9 +277,14 @@ def generate_contextual_reply(
         # Only reference previous recommendations if there's actual conversation history
         # This prevents referencing recommendations from previous app sessions
         prev_names = [p.get("name", "Unknown") for p in memory.last_places[:3]]
+        if structured_mode:
+            # Previous recommendations get ids too, numbered after the current items
+            prev_names = [
+                f"[{item_id(len(items) + i)}] {name}" for i, name in enumerate(prev_names)
+            ]
         previous_recs_context = f"Previously recommended in this conversation: {', '.join(prev_names)}"
     
-    items_text = format_items_for_prompt(items) if items else "No new options found."
+    items_text = format_items_for_prompt(items, with_ids=structured_mode) if items else "No new options found."
     
     # Determine if this is a follow-up question
     is_followup = len(memory.history) > 2  # More than just current exchange
@@ -330,14 +412,23 @@ CRITICAL RULES:
 7. If no new options, suggest alternatives or ask a clarifying question
 8. Remove any greeting patterns from your response - start directly with the answer or recommendation
 """
+    candidates = list(items)
+    if structured_mode:
+        prompt += STRUCTURED_OUTPUT_RULES
+        if previous_recs_context:
+            candidates += memory.last_places[:3]
 
     try:
         model = genai.GenerativeModel("models/gemini-2.5-flash")
-        resp = model.generate_content(prompt, request_options={"timeout": 10})
+        resp = model.generate_content(prompt, **_generation_kwargs(structured_mode))
         text = getattr(resp, "text", None)
         if not text:
             logger.warning("Gemini returned empty response for contextual reply")
-            return format_fallback_reply(items, is_followup)
+            return _fallback_result(items, structured, is_followup)
+
+        mentioned = None
+        if structured_mode:
+            text, mentioned = _read_structured(text, candidates)
         
         # Clean up any unwanted greetings that might slip through
         cleaned = text.strip()
@@ -384,11 +475,12 @@ CRITICAL RULES:
                 if any(g in first_sent for g in ["hey", "hello", "hi"]) and len(first_sent) < 15:
                     cleaned = ". ".join(sentences[1:]).strip()
         
-        return cleaned if cleaned else text.strip()  # Fallback to original if cleaning removed everything
+        reply = cleaned if cleaned else text.strip()  # Fallback to original if cleaning removed everything
+        return (reply, mentioned) if structured else reply
 
     except Exception as e:
         logger.error(f"Contextual LLM reply error: {e}", exc_info=True)
-        return format_fallback_reply(items, is_followup)
+        return _fallback_result(items, structured, is_followup)
 
 
 def remove_greetings(text: str) -> str:
@@ -436,6 +528,12 @@ def remove_greetings(text: str) -> str:
     return cleaned if cleaned else text.strip()
 
 
+def _fallback_result(items: List[Dict[str, Any]], structured: bool, is_followup: bool = False):
+    """Fallback reply; in structured mode its cards are the items it names."""
+    reply = format_fallback_reply(items, is_followup)
+    return (reply, items[:2]) if structured else reply
+
+
 def format_fallback_reply(items: List[Dict[str, Any]], is_followup: bool = False) -> str:
     """
     Generate a simple fallback reply when LLM fails.
@@ -0,0 +1,140 @@
+# services/recommendation/memory.py
+"""
+Token-budgeted conversation memory.
+
+The last few turns are kept verbatim; anything older is folded into a short
+rolling summary. Both the prompt built from memory and the context stored in
+Valkey/Redis therefore stay bounded no matter how long a session runs.
+"""
+
+from __future__ import annotations
+import re
+from typing import List, Dict
+
+# Raw messages kept verbatim (3 user + 3 assistant)
+MAX_RAW_MESSAGES = 6
+
+# Hard budget for everything history-related that goes into a prompt
+HISTORY_TOKEN_BUDGET = 700
+
+# Share of the budget reserved for the rolling summary
+SUMMARY_TOKEN_BUDGET = 200
+
+# Single messages longer than this are clipped in the prompt and in storage
+MAX_MESSAGE_TOKENS = 160
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_BOLD_NAME = re.compile(r"\*\*([^*]{2,60})\*\*")
+
+
+def estimate_tokens(text: str | None) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text).
+    Good enough for budgeting without pulling in a tokenizer.
+    """
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    """Clip text to roughly max_tokens, cutting on a word boundary."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    clipped = text[:max_chars].rsplit(" ", 1)[0]
+    return clipped.rstrip(",;: ") + "…"
+
+
+def _first_sentence(text: str, max_tokens: int = 30) -> str:
+    text = " ".join((text or "").split())
+    if not text:
+        return ""
+    sentence = _SENTENCE_END.split(text, 1)[0]
+    return _clip(sentence, max_tokens)
+
+
+def summarize_turns(messages: List[Dict[str, str]]) -> List[str]:
+    """
+    Extractive summary of older turns, one short line per message.
+    No LLM call: keeps the user's ask and the places the assistant named.
+    """
+    lines = []
+    for msg in messages:
+        content = msg.get("content") or ""
+        if not content.strip():
+            continue
+
+        if msg.get("role") == "user":
+            lines.append(f"User asked: {_first_sentence(content)}")
+            continue
+
+        names = _BOLD_NAME.findall(content)
+        if names:
+            lines.append(f"Violet suggested: {', '.join(dict.fromkeys(names))}")
+        else:
+            lines.append(f"Violet said: {_first_sentence(content)}")
+    return lines
+
+
+def _trim_summary(lines: List[str], max_tokens: int) -> List[str]:
+    """Drop the oldest summary lines until the summary fits its budget."""
+    while lines and sum(estimate_tokens(l) for l in lines) > max_tokens:
+        lines = lines[1:]
+    return lines
+
+
+def _history_tokens(history: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(m.get("content")) for m in history)
+
+
+def compact_history(memory) -> None:
+    """
+    Enforce the memory budget in place.
+
+    Older messages beyond MAX_RAW_MESSAGES (or beyond the token budget left
+    after the summary) are removed from memory.history and folded into
+    memory.summary.
+    """
+    for msg in memory.history:
+        content = msg.get("content") or ""
+        if estimate_tokens(content) > MAX_MESSAGE_TOKENS:
+            msg["content"] = _clip(content, MAX_MESSAGE_TOKENS)
+
+    raw_budget = HISTORY_TOKEN_BUDGET - SUMMARY_TOKEN_BUDGET
+    folded = []
+    while memory.history and (
+        len(memory.history) > MAX_RAW_MESSAGES
+        or (len(memory.history) > 2 and _history_tokens(memory.history) > raw_budget)
+    ):
+        folded.append(memory.history.pop(0))
+
+    if not folded:
+        return
+
+    lines = memory.summary.splitlines() if memory.summary else []
+    lines.extend(summarize_turns(folded))
+    memory.summary = "\n".join(_trim_summary(lines, SUMMARY_TOKEN_BUDGET))
+
+
+def build_history_prompt(memory) -> str:
+    """
+    Render summary + raw turns for a prompt, always within HISTORY_TOKEN_BUDGET.
+    """
+    parts = []
+    if memory.summary:
+        parts.append(f"Earlier in this conversation:\n{memory.summary}")
+
+    history_lines = []
+    for msg in memory.history:
+        speaker = "User" if msg.get("role", "user") == "user" else "Assistant"
+        history_lines.append(f"{speaker}: {msg.get('content', '')}")
+
+    # Oldest raw lines go first if something still overflows
+    budget = HISTORY_TOKEN_BUDGET - estimate_tokens(memory.summary)
+    while history_lines and sum(estimate_tokens(l) for l in history_lines) > budget:
+        history_lines.pop(0)
+
+    if history_lines:
+        parts.append("\n".join(history_lines))
+    return "\n\n".join(parts)
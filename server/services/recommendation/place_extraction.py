@@ -0,0 +1,450 @@
+# services/recommendation/place_extraction.py
+"""
+Find the places an LLM reply talks about.
+
+Known items are matched with an Aho-Corasick automaton built over their names
+(one pass over the reply finds every mention and its position). Unknown names
+are pulled out with precompiled phrase patterns and validated against Google
+Places.
+"""
+
+from __future__ import annotations
+import logging
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
+
+from services.directions_service import get_walking_directions
+from services.location_utils import geo_tile
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Max unknown names we validate per reply (each one costs a Text Search call)
+MAX_LOOKUPS = 5
+
+# Lookups still running after this are dropped; the reply doesn't wait for them
+LOOKUP_DEADLINE_SECONDS = 2.5
+
+# (normalized name, geo tile) -> origin-independent place details, or None
+# when Google didn't find a place. Walk times are computed per request.
+_LOOKUP_CACHE = TTLCache(max_entries=2048, ttl_seconds=6 * 3600)
+_MISSING = object()
+_NON_WORD = re.compile(r"[^a-z0-9\s]")
+
+
+# ---------------------------------------------------------------------
+# PRECOMPILED PATTERNS
+# ---------------------------------------------------------------------
+_NAME = r"([A-Z][a-zA-Z\s&'\-]+?)"
+_THE = r"(?:the\s+)?"
+
+PLACE_INDICATOR_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in [
+        rf"go to\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or|\s+is|\s+was|\s+has)",
+        rf"check out\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or|\s+is|\s+was)",
+        rf"try\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or|\s+is)",
+        rf"visit\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or|\s+is)",
+        rf"head to\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        rf"stop by\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        rf"recommend\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        rf"suggest\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        rf"at\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or|\s+\?|\s+is|\s+was|\s+has)",  # "at Artichoke Basille's Pizza"
+        rf"from\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",
+        rf"grabbing\s+(?:a\s+)?(?:slice|bite|drink|coffee|meal)\s+at\s+{_THE}{_NAME}(?:\.|,|!|\?|$|;|:|\s+and|\s+or)",  # "grabbing a slice at X"
+        rf"how about\s+{_THE}{_NAME}(?:\?|\.|,|!|$|;|:|\s+is|\s+was)",  # "How about X?"
+    ]
+]
+
+# "X is a ..." / "X is definitely ..." have no literal prefix, so a plain finditer
+# retries the lazy name group from every offset. A match can't leave a run of
+# name characters and must end with its tail, so each pattern only runs on runs
+# that contain the tail, cut off after the last one.
+_IS_A_TAIL = r"\s+is\s+(?:a|an|the)\s+"
+_IS_ADVERB_TAIL = r"\s+is\s+(?:definitely|just|really|perfect|great|good|close|near)"
+PLACE_IS_PATTERNS = [
+    (re.compile(rf"{_THE}{_NAME}{tail}", re.IGNORECASE), re.compile(tail, re.IGNORECASE))
+    for tail in [
+        _IS_A_TAIL,  # "The Stonewall Inn is a historic spot"
+        _IS_ADVERB_TAIL,  # "Artichoke Basille's Pizza is definitely a place"
+    ]
+]
+_NAME_CHAR_RUN = re.compile(r"[a-zA-Z\s&'\-]+")
+
+_TRAILING_GENERIC_WORD = re.compile(
+    r"\s+(Pizza|Restaurant|Cafe|Bar|Shop|Store|Place|Inn|Square|Garden|Park)$",
+    re.IGNORECASE,
+)
+
+# Sequences of 2-5 capitalized words, e.g. "The Stonewall Inn", "Artichoke Basille's Pizza"
+_CAPITALIZED_PHRASE = re.compile(
+    r"\b(?:The\s+)?([A-Z][a-zA-Z]+(?:'[a-z]+)?(?:\s+[A-Z][a-zA-Z]+(?:'[a-z]+)?){1,4})\b"
+)
+
+_STOP_NAMES = frozenset(["the", "a", "an", "this", "that", "it", "there", "here"])
+_FILLER_WORDS = frozenset(["the", "and", "for", "from", "with", "that", "this"])
+
+_COMMON_PHRASES = frozenset([
+    "new york", "new jersey", "how about", "what about", "just a", "just the",
+    "for a", "for the", "from here", "from there", "close by",
+    "near by", "right now", "just now", "a place", "the place", "this place",
+    "that place", "some place", "any place", "every place", "no place",
+])
+
+# Words near a capitalized phrase that suggest it names a place (substring match, like before)
+_CONTEXT_INDICATORS = re.compile("|".join(re.escape(w) for w in [
+    "is a", "is an", "is the", "is definitely", "is just", "is really",
+    "is perfect", "is great", "is good", "is close", "is near", "is historic",
+    "is iconic", "was a", "was an", "at", "from", "to", "near", "close to",
+    "walk", "minute", "minutes", "mile", "miles", "distance", "location",
+    "spot", "place", "venue", "restaurant", "cafe", "bar", "shop", "store",
+]))
+_CONTEXT_WINDOW = 30
+
+_PLACE_SUFFIXES = (
+    "inn", "pizza", "cafe", "bar", "restaurant", "square", "garden",
+    "park", "shop", "store", "place", "spot", "location", "venue",
+    "tavern", "grill", "diner", "bistro", "lounge", "club", "hall",
+    "center", "centre", "plaza", "market", "bakery", "deli",
+)
+
+
+# ---------------------------------------------------------------------
+# AHO-CORASICK AUTOMATON
+# ---------------------------------------------------------------------
+class NameAutomaton:
+    """
+    Aho-Corasick automaton over a fixed set of lowercase keywords.
+    `first_positions(text)` scans the text once and returns the first start
+    offset of every keyword that occurs in it (substring semantics).
+    """
+
+    def __init__(self, keywords: Tuple[str, ...]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for kw in keywords:
+            if kw:
+                self._add(kw)
+        self._build_links()
+
+    def _add(self, keyword: str):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        if keyword not in self._out[state]:
+            self._out[state].append(keyword)
+
+    def _build_links(self):
+        # Depth-1 states fail to the root; deeper ones follow their parent's fail chain
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def first_positions(self, text: str) -> Dict[str, int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Dict[str, int] = {}
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for kw in out[state]:
+                if kw not in found:
+                    found[kw] = i - len(kw) + 1
+        return found
+
+
+def _name_keys(name_lower: str) -> Tuple[str, str, List[str]]:
+    """Full name, name without "the ", and significant words used for matching."""
+    without_the = name_lower.replace("the ", "").strip()
+    words = [w for w in name_lower.split() if len(w) > 3 and w != "the"]
+    return name_lower, without_the, words
+
+
+@lru_cache(maxsize=256)
+def _automaton_for(names: Tuple[str, ...]) -> NameAutomaton:
+    keywords = set()
+    for name_lower in names:
+        full, without_the, words = _name_keys(name_lower)
+        keywords.add(full)
+        keywords.add(without_the)
+        keywords.update(words)
+    return NameAutomaton(tuple(sorted(keywords)))
+
+
+def _match_known_items(
+    reply_lower: str,
+    items: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], set, Dict[str, int]]:
+    """
+    Match items whose names (or enough of their significant words) appear in the reply.
+    Returns (matched items, seen lowercase names, keyword -> first position).
+    """
+    matched, seen = [], set()
+    names = tuple(dict.fromkeys((item.get("name") or "").lower() for item in items if item.get("name")))
+    if not names:
+        return matched, seen, {}
+
+    hits = _automaton_for(names).first_positions(reply_lower)
+
+    for item in items:
+        name_lower = (item.get("name") or "").lower()
+        if not name_lower or name_lower in seen:
+            continue
+
+        full, without_the, words = _name_keys(name_lower)
+        if full in hits or (without_the and without_the in hits):
+            matched.append(item)
+            seen.add(name_lower)
+            continue
+
+        if not words:
+            continue
+
+        # 2+ significant words (or the only one) → "go to Bern Dibner" matches "Bern Dibner Library"
+        matched_words = sum(1 for w in words if w in hits)
+        if matched_words >= 2 or (len(words) == 1 and matched_words == 1):
+            matched.append(item)
+            seen.add(name_lower)
+
+    return matched, seen, hits
+
+
+# ---------------------------------------------------------------------
+# CANDIDATE NAMES FOR UNKNOWN PLACES
+# ---------------------------------------------------------------------
+def _candidate_place_names(reply_text: str, reply_lower: str, seen_names: set) -> List[str]:
+    """
+    Pull likely place names that are not in memory out of the reply.
+    Returns deduplicated (case-insensitive) names in discovery order.
+    """
+    candidates = []
+
+    def add_indicated(match):
+        place_name = _TRAILING_GENERIC_WORD.sub("", match.group(1).strip())
+        if len(place_name) > 3 and place_name.lower() not in _STOP_NAMES:
+            candidates.append(place_name)
+
+    for pattern in PLACE_INDICATOR_PATTERNS:
+        for match in pattern.finditer(reply_text):
+            add_indicated(match)
+
+    for pattern, tail in PLACE_IS_PATTERNS:
+        for run in _NAME_CHAR_RUN.finditer(reply_text):
+            last_tail = None
+            for last_tail in tail.finditer(reply_text, run.start(), run.end()):
+                pass
+            if last_tail is not None:
+                for match in pattern.finditer(reply_text, run.start(), last_tail.end()):
+                    add_indicated(match)
+
+    text_len = len(reply_text)
+    for match in _CAPITALIZED_PHRASE.finditer(reply_text):
+        phrase = match.group(1).strip()
+        phrase_lower = phrase.lower()
+
+        if phrase_lower in seen_names or len(phrase) < 5 or phrase_lower in _COMMON_PHRASES:
+            continue
+
+        substantial = [w for w in phrase.split() if len(w) > 3 and w.lower() not in _FILLER_WORDS]
+        if not substantial:
+            continue
+
+        ctx_start = max(0, match.start() - _CONTEXT_WINDOW)
+        ctx_end = min(text_len, match.end() + _CONTEXT_WINDOW)
+        is_likely_place = _CONTEXT_INDICATORS.search(reply_lower, ctx_start, ctx_end) is not None
+
+        if is_likely_place or phrase_lower.endswith(_PLACE_SUFFIXES) or len(substantial) >= 2:
+            candidates.append(phrase)
+
+    unique, seen_candidates = [], set()
+    for name in candidates:
+        key = name.lower().strip()
+        if key not in seen_candidates and key not in seen_names:
+            unique.append(name)
+            seen_candidates.add(key)
+    return unique
+
+
+def _lookup_place(place_name: str, origin_lat: float, origin_lng: float) -> Dict[str, Any] | None:
+    """
+    Validate a name via Google Places (biased toward the origin). Returns the
+    origin-independent details of the place, or None if it isn't one.
+    """
+    from services.places_service import search_place_by_name, build_photo_url
+
+    raw_place = search_place_by_name(place_name, lat=origin_lat, lng=origin_lng)
+    if not raw_place:
+        return None
+
+    geom = raw_place.get("geometry", {}).get("location", {})
+    place_lat = geom.get("lat")
+    place_lng = geom.get("lng")
+    if not place_lat or not place_lng:
+        return None
+
+    photos = raw_place.get("photos", [])
+    photo_ref = photos[0].get("photo_reference") if photos else None
+
+    return {
+        "name": raw_place.get("name"),
+        "address": raw_place.get("formatted_address") or raw_place.get("vicinity"),
+        "location": {"lat": place_lat, "lng": place_lng},
+        "photo_url": build_photo_url(photo_ref),
+        "rating": raw_place.get("rating", 0),
+        "type": "place",
+        "source": "google_places",
+        "place_id": raw_place.get("place_id"),
+    }
+
+
+def _place_card(place: Dict[str, Any], origin_lat: float, origin_lng: float) -> Dict[str, Any]:
+    """A card for cached place details, with the route from this request's origin."""
+    loc = place["location"]
+    directions = get_walking_directions(origin_lat, origin_lng, loc["lat"], loc["lng"])
+    return {
+        "name": place["name"],
+        "address": place["address"],
+        "location": loc,
+        "walk_time": directions["duration_text"] if directions else None,
+        "distance": directions["distance_text"] if directions else None,
+        "maps_link": directions["maps_link"] if directions else None,
+        "photo_url": place["photo_url"],
+        "rating": place["rating"],
+        "type": place["type"],
+        "source": place["source"],
+        "place_id": place["place_id"],
+    }
+
+
+def _normalize_name(name: str) -> str:
+    """Cache key form of a name: "The Artichoke Basille's" -> "artichoke basilles"."""
+    text = _NON_WORD.sub("", name.lower())
+    text = " ".join(text.split())
+    return text[4:] if text.startswith("the ") else text
+
+
+def _cached_lookup(place_name: str, origin_lat: float, origin_lng: float) -> Dict[str, Any] | None:
+    key = (_normalize_name(place_name), geo_tile(origin_lat, origin_lng))
+    place = _LOOKUP_CACHE.get(key, _MISSING)
+    if place is _MISSING:
+        try:
+            place = _lookup_place(place_name, origin_lat, origin_lng)
+        except Exception as e:
+            logger.debug(f"Error searching for place '{place_name}': {e}")
+            return None  # transient failure: don't cache
+        _LOOKUP_CACHE.set(key, place)
+        if place:
+            logger.debug(f"✅ Found and validated place '{place_name}' via Google Places API")
+
+    if place is None:
+        return None
+    # Routes depend on the exact origin, so they are never shared through the cache
+    return _place_card(place, origin_lat, origin_lng)
+
+
+def _lookup_places(
+    place_names: List[str],
+    origin_lat: float,
+    origin_lng: float,
+) -> List[Tuple[str, Dict[str, Any] | None]]:
+    """
+    Validate candidate names concurrently under LOOKUP_DEADLINE_SECONDS.
+    Returns (name, card-or-None) in candidate order; names that missed the
+    deadline are left out (their lookups still finish and warm the cache).
+    """
+    if not place_names:
+        return []
+
+    executor = ThreadPoolExecutor(max_workers=len(place_names))
+    try:
+        futures = [
+            executor.submit(_cached_lookup, name, origin_lat, origin_lng)
+            for name in place_names
+        ]
+        done, not_done = wait(futures, timeout=LOOKUP_DEADLINE_SECONDS)
+        if not_done:
+            logger.debug(f"Dropped {len(not_done)} place lookup(s) that missed the {LOOKUP_DEADLINE_SECONDS}s deadline")
+        return [
+            (name, future.result())
+            for name, future in zip(place_names, futures)
+            if future in done
+        ]
+    finally:
+        executor.shutdown(wait=False)
+
+
+# ---------------------------------------------------------------------
+# MAIN ENTRY
+# ---------------------------------------------------------------------
+def extract_places_from_reply(
+    reply_text: str,
+    items: List[Dict[str, Any]],
+    origin_lat: float | None = None,
+    origin_lng: float | None = None
+) -> List[Dict[str, Any]]:
+    """
+    Extract place names mentioned in the LLM reply text and match them to items.
+    If a place isn't found in items, search for it using Google Places API.
+    Returns a list of matched place items, ordered by how prominently they appear in the reply.
+
+    Args:
+        reply_text: The LLM-generated reply text
+        items: List of items from memory to check first
+        origin_lat: User's latitude for distance calculations and location bias
+        origin_lng: User's longitude for distance calculations and location bias
+    """
+    if not reply_text:
+        return []
+
+    reply_lower = reply_text.lower()
+    matched_places, seen_names, hits = _match_known_items(reply_lower, items or [])
+
+    # Validate unknown names via Google Places (skipped without an origin)
+    if origin_lat is not None and origin_lng is not None:
+        candidates = _candidate_place_names(reply_text, reply_lower, seen_names)[:MAX_LOOKUPS]
+        for place_name, place in _lookup_places(candidates, origin_lat, origin_lng):
+            place_name_lower = place_name.lower().strip()
+            if place and place_name_lower not in seen_names:
+                matched_places.append(place)
+                seen_names.add(place_name_lower)
+
+    # Sort by position in reply (earlier mentions are more relevant)
+    end = len(reply_lower)
+
+    def first_position(item):
+        name = (item.get("name") or "").lower()
+        pos = hits.get(name)
+        if pos is None:
+            pos = reply_lower.find(name) if name else -1
+        if pos >= 0:
+            return pos
+        # If full name not found, use the first significant word that is
+        for word in (w for w in name.split() if len(w) > 3):
+            pos = hits.get(word)
+            if pos is None:
+                pos = reply_lower.find(word)
+            if pos >= 0:
+                return pos
+        return end  # Put unmatched items at the end
+
+    matched_places.sort(key=first_position)
+    return matched_places
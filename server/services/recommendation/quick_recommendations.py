@@ -1,17 +1,19 @@
 # server/services/recommendation/quick_recommendations.py
 
 from __future__ import annotations
-from typing import List, Dict, Any
 from datetime import datetime
+from typing import List, Dict, Any
+from urllib.parse import parse_qs, urlparse
 
-from services.places_service import nearby_places, build_photo_url
-from services.directions_service import get_walking_directions, get_walking_only_directions, walking_minutes
+from services.places_service import build_photo_url
+from services.directions_service import get_walking_only_directions, maps_directions_link, walking_minutes
+from services.location_utils import haversine
+from services.recommendation.candidate_pool import CandidatePool
+from services.recommendation.tile_cache import PartialResult, TileCache, tile_key, tile_origin
 
-# Event scrapers
-from services.scrapers.brooklyn_bridge_park_scraper import fetch_brooklyn_bridge_park_events
-from services.scrapers.downtown_brooklyn_scraper import fetch_downtown_bk_events
-from services.scrapers.nyc_parks_scraper import fetch_nyc_parks_events
-from services.scrapers.engage_events_service import fetch_engage_events
+# Events come from the snapshot published by services/event_ingestion.py
+from services.event_feed import feed_page
+from utils.datetime_utils import parse_datetime, now_local
 
 
 # -----------------------------------------------------------
@@ -41,12 +43,8 @@ CATEGORY_CONFIG = {
     },
 }
 
-# These will be merged with Engage events automatically
-EVENT_SOURCES = [
-    fetch_brooklyn_bridge_park_events,
-    fetch_downtown_bk_events,
-    fetch_nyc_parks_events,
-]
+# Candidate lists per (category, geo tile, 15-minute bucket), shared by all users
+_PLACES_CACHE = TileCache("places")
 
 
 # -----------------------------------------------------------
@@ -66,14 +64,16 @@ def _normalize_rating(r: float | None) -> float:
 
 
 # For events: the sooner the better
-def _normalize_event_time(start_str: str | None) -> float:
+def _normalize_event_time(start_str: str | None, now: datetime | None = None) -> float:
     if not start_str:
         return 0.3
 
+    event_time = parse_datetime(start_str)
+    if event_time is None:
+        return 0.3
+
     try:
-        event_time = datetime.fromisoformat(start_str)
-        now = datetime.now()
-        delta = (event_time - now).total_seconds()
+        delta = (event_time - (now or now_local())).total_seconds()
 
         if delta < 0:
             return 0.2  # already happened
@@ -112,8 +112,8 @@ def _score_explore(place: Dict[str, Any]) -> float:
     return 0.50 * dist + 0.20 * rating + 0.30 * landmark
 
 
-def _score_event(ev: Dict[str, Any]) -> float:
-    time_score = _normalize_event_time(ev.get("start"))
+def _score_event(ev: Dict[str, Any], now: datetime | None = None) -> float:
+    time_score = _normalize_event_time(ev.get("start"), now)
     return time_score
 
 
@@ -121,37 +121,39 @@ def _score_event(ev: Dict[str, Any]) -> float:
 # HELPERS
 # -----------------------------------------------------------
 
-def _search_places_for_category(category: str, origin_lat: float = TANDON_LAT, origin_lng: float = TANDON_LNG) -> List[Dict[str, Any]]:
+def _search_places_for_category(category: str, origin_lat: float = TANDON_LAT, origin_lng: float = TANDON_LNG,
+                                pool: CandidatePool | None = None) -> List[Dict[str, Any]]:
+    """
+    Places for a category with routes from the origin. Place types and
+    routes are looked up in parallel through `pool`, which categories sharing
+    one origin (the dashboard) pass in so overlapping lookups happen once.
+    """
     cfg = CATEGORY_CONFIG.get(category)
     if not cfg:
         return []
+    pool = pool or CandidatePool(origin_lat, origin_lng)
 
     print(f"🔍 _search_places_for_category({category}): Searching near lat={origin_lat}, lng={origin_lng}, radius={cfg['radius']}m")
     raw: List[Dict[str, Any]] = []
 
-    for t in cfg["types"]:
-        try:
-            places = nearby_places(origin_lat, origin_lng, t, cfg["radius"])
-            raw.extend(places)
-            print(f"  Found {len(places)} places for type {t}")
-        except Exception as e:
-            print(f"QuickRecs {category} error:", e)
+    for t, places in zip(cfg["types"], pool.places_many(cfg["types"], radius=cfg["radius"])):
+        raw.extend(places)
+        print(f"  Found {len(places)} places for type {t}")
 
     # Deduplicate by place_id or name
     dedup = {(p.get("place_id") or p.get("name")): p for p in raw}
-    candidates = list(dedup.values())
+    candidates = []
+    for p in dedup.values():
+        geom = p.get("geometry", {}).get("location", {})
+        if geom.get("lat") and geom.get("lng"):
+            candidates.append((p, geom["lat"], geom["lng"]))
+
+    # Use fastest route (walking or transit) for quick recommendations
+    # The maps link will use the same mode that was selected
+    routes = pool.directions_many((lat, lng) for _, lat, lng in candidates)
 
     enriched: List[Dict[str, Any]] = []
-    for p in candidates:
-        geom = p.get("geometry", {}).get("location", {})
-        lat = geom.get("lat")
-        lng = geom.get("lng")
-        if not lat or not lng:
-            continue
-
-        # Use fastest route (walking or transit) for quick recommendations
-        # The maps link will use the same mode that was selected
-        d = get_walking_directions(origin_lat, origin_lng, lat, lng)
+    for (p, lat, lng), d in zip(candidates, routes):
         photos = p.get("photos", [])
         ref = photos[0].get("photo_reference") if photos else None
         photo_url = build_photo_url(ref)
@@ -173,60 +175,89 @@ def _search_places_for_category(category: str, origin_lat: float = TANDON_LAT, o
     return enriched
 
 
-def _load_events() -> List[Dict[str, Any]]:
-    events = []
+def _for_caller(place: Dict[str, Any], user_lat: float, user_lng: float) -> Dict[str, Any]:
+    """
+    A tile-center card as seen from the caller: the directions link starts
+    at their position (same travel mode), distance_m is the straight line
+    from them, and walk_time/distance are flagged as tile-center estimates.
+    """
+    place = dict(place)
+    loc = place.get("location") or {}
+    if loc.get("lat") is None or loc.get("lng") is None:
+        return place
+    if place.get("maps_link"):
+        mode = parse_qs(urlparse(place["maps_link"]).query).get("travelmode", ["walking"])[0]
+        place["maps_link"] = maps_directions_link(loc["lat"], loc["lng"], user_lat, user_lng, mode)
+    place["distance_m"] = round(haversine(user_lat, user_lng, loc["lat"], loc["lng"]))
+    place["approximate_travel"] = True
+    return place
+
+
+def _tile_places_for_category(category: str, user_lat: float, user_lng: float,
+                              pool: CandidatePool | None = None) -> List[Dict[str, Any]]:
+    """
+    _search_places_for_category() from the center of the user's geo tile,
+    through the shared tile cache. Returns copies, safe to score in place,
+    with maps_link and distance_m redone from the user's position (see
+    _for_caller); walk_time/distance stay approximate.
+    `pool` is used only if it is anchored at that tile center (tile_origin()).
+    A list computed while Places or Directions failed is not shared for the
+    bucket (see PartialResult).
+    """
+    origin_lat, origin_lng = tile_origin(user_lat, user_lng)
+    if pool is None or (pool.origin_lat, pool.origin_lng) != (origin_lat, origin_lng):
+        pool = CandidatePool(origin_lat, origin_lng)
 
-    # External scrapers
-    for fn in EVENT_SOURCES:
-        try:
-            events.extend(fn(limit=30))
-        except Exception as e:
-            print("QuickRecs event scraper error:", e)
+    def compute():
+        places = _search_places_for_category(category, origin_lat=origin_lat, origin_lng=origin_lng, pool=pool)
+        cfg = CATEGORY_CONFIG.get(category)
+        if cfg and (pool.places_failed(cfg["types"], radius=cfg["radius"]) or
+                    pool.directions_failed((p["location"]["lat"], p["location"]["lng"]) for p in places)):
+            # An upstream error: serve it, but don't share it for the whole bucket
+            raise PartialResult(places)
+        return places
 
-    # Engage events (only future ones)
-    try:
-        engage = fetch_engage_events(days_ahead=7, limit=50)
-        for e in engage:
-            events.append({
-                "name": e.get("name"),
-                "address": e.get("location"),
-                "location": None,
-                "maps_link": e.get("url"),
-                "photo_url": e.get("image"),
-                "description": e.get("description"),
-                "start": e.get("start"),
-                "end": e.get("end"),
-                "type": "nyu_engage_event",
-                "source": "nyu_engage",
-            })
-    except Exception as e:
-        print("QuickRecs Engage error:", e)
-
-    return events
+    places = _PLACES_CACHE.get((category, tile_key(user_lat, user_lng)), compute)
+    return [_for_caller(p, user_lat, user_lng) for p in places]
 
 
 # -----------------------------------------------------------
 # MAIN API
 # -----------------------------------------------------------
 
-def get_quick_recommendations(category: str, limit: int = 10, vibe: str | None = None, user_lat: float | None = None, user_lng: float | None = None) -> Dict[str, Any]:
+def get_quick_recommendations(category: str, limit: int = 10, vibe: str | None = None, user_lat: float | None = None, user_lng: float | None = None,
+                              cursor: str | None = None, since: str | None = None,
+                              pool: CandidatePool | None = None) -> Dict[str, Any]:
     """
     Returns:
       {
         "category": str,
         "places": [ ... ]  # or events
       }
+    For "events" the list is upcoming events ranked by _score_event, one
+    page at a time: the result also has next_cursor / sync_version / deleted
+    / reset (see services/event_feed.py); `cursor` and `since` come from those.
+    Place categories are shared by everyone in the same geo tile and
+    15-minute bucket (walk times from the tile center); `pool` (a
+    CandidatePool at tile_origin()) shares lookups with other categories of
+    the same request.
     """
 
     category = category.lower()
     
     # Events don't require location (they're scraped, not location-based)
     if category == "events":
-        events = _load_events()
-        for ev in events:
-            ev["score"] = _score_event(ev)
-        events.sort(key=lambda x: x["score"], reverse=True)
-        return {"category": category, "places": events[:limit]}
+        page = feed_page(limit=limit, cursor=cursor, since=since, rank=_score_event)
+        # Copies: "score" is per request
+        events = [{**ev, "score": score} for ev, score in zip(page["events"], page["scores"])]
+        return {
+            "category": category,
+            "places": events,
+            "next_cursor": page["next_cursor"],
+            "sync_version": page["sync_version"],
+            "deleted": page["deleted"],
+            "reset": page["reset"],
+        }
     
     # Location-based categories require user location - don't default to Tandon
     if user_lat is None or user_lng is None:
@@ -237,7 +268,7 @@ def get_quick_recommendations(category: str, limit: int = 10, vibe: str | None =
 
     # ----------- Quick Bites -----------
     if category == "quick_bites":
-        places = _search_places_for_category("quick_bites", origin_lat=origin_lat, origin_lng=origin_lng)
+        places = _tile_places_for_category("quick_bites", origin_lat, origin_lng, pool=pool)
         for p in places:
             p["score"] = _score_quick_bite(p)
         places.sort(key=lambda x: x["score"], reverse=True)
@@ -245,7 +276,7 @@ def get_quick_recommendations(category: str, limit: int = 10, vibe: str | None =
 
     # ----------- Cozy Cafes -----------
     if category == "cozy_cafes":
-        places = _search_places_for_category("cozy_cafes", origin_lat=origin_lat, origin_lng=origin_lng)
+        places = _tile_places_for_category("cozy_cafes", origin_lat, origin_lng, pool=pool)
         for p in places:
             p["score"] = _score_cozy_cafe(p)
         places.sort(key=lambda x: x["score"], reverse=True)
@@ -253,7 +284,7 @@ def get_quick_recommendations(category: str, limit: int = 10, vibe: str | None =
 
     # ----------- Explore -----------
     if category == "explore":
-        places = _search_places_for_category("explore", origin_lat=origin_lat, origin_lng=origin_lng)
+        places = _tile_places_for_category("explore", origin_lat, origin_lng, pool=pool)
         for p in places:
             p["score"] = _score_explore(p)
             # Apply vibe-based scoring if vibe is provided
@@ -523,9 +554,10 @@ def get_top_recommendations_for_user(
     ]
 
     all_candidates: List[Dict[str, Any]] = []
+    pool = CandidatePool(*tile_origin(origin_lat, origin_lng))
 
     for category_key, label in buckets:
-        places = _search_places_for_category(category_key, origin_lat=origin_lat, origin_lng=origin_lng)
+        places = _tile_places_for_category(category_key, origin_lat, origin_lng, pool=pool)
         for p in places:
             # Base category score
             if label == "quick_bite":
@@ -1,19 +1,93 @@
 # server/services/recommendation/semantic_intent.py
 
 from __future__ import annotations
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+import copy
 import json
+import logging
 import re
 
 import google.generativeai as genai
 
+from services.vibes import classify_vibe
+from services.recommendation.intent import is_on_campus_query
+from services.recommendation.intent_classifier import predict_intent
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+INTENT_TYPES = ["study", "coffee", "eat", "nightlife", "events", "outdoors", "date", "other"]
+
+# Local results at or above this confidence skip the Gemini call
+LOCAL_CONFIDENCE_THRESHOLD = 0.6
+
+# Resolved intents by normalized message
+_INTENT_CACHE = TTLCache(max_entries=4096, ttl_seconds=24 * 3600)
+
+_model = None
+
+
+# -----------------------------------------------------------
+# LOCAL (RULES) LAYER
+# -----------------------------------------------------------
+
+_INTENT_KEYWORDS = {
+    "study": ["study", "homework", "assignment", "laptop", "work on", "library", "exam", "focus"],
+    "coffee": ["coffee", "cafe", "café", "latte", "espresso", "matcha", "tea", "boba"],
+    "eat": ["eat", "food", "dinner", "lunch", "breakfast", "brunch", "restaurant", "bite",
+            "hungry", "pizza", "burger", "sushi", "ramen", "tacos", "snack"],
+    "nightlife": ["bar", "drinks", "beer", "cocktail", "wine", "pub", "club", "party", "nightlife"],
+    "events": ["event", "concert", "festival", "happening", "performance", "workshop", "gig", "exhibit"],
+    "outdoors": ["park", "outside", "outdoor", "walk around", "stroll", "waterfront", "picnic", "hike", "explore"],
+    "date": ["date", "romantic", "anniversary", "girlfriend", "boyfriend", "partner"],
+}
+
+_VIBE_TO_INTENT = {
+    "fast_bite": "eat",
+    "food_general": "eat",
+    "chill_drinks": "nightlife",
+    "party": "nightlife",
+    "study": "study",
+    "bookstore": "study",
+    "explore": "outdoors",
+}
+
+# Pairs that naturally co-occur ("quiet cafe to study") and don't cost confidence
+_COMPATIBLE = {
+    frozenset(("study", "coffee")),
+    frozenset(("eat", "coffee")),
+    frozenset(("date", "eat")),
+    frozenset(("date", "nightlife")),
+    frozenset(("date", "outdoors")),
+    frozenset(("events", "nightlife")),
+}
+
+_VIBE_WORDS = ["quiet", "chill", "lively", "cozy", "romantic", "cheap", "casual", "fancy",
+               "loud", "relaxed", "fun", "trendy", "hidden", "spacious", "late night"]
+
+_INDOOR_WORDS = ["indoor", "inside", "indoors"]
+_OUTDOOR_WORDS = ["outdoor", "outside", "outdoors", "rooftop", "patio", "park"]
+
+_KEYWORD_PATTERNS = {
+    intent_type: re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")s?\b")
+    for intent_type, words in _INTENT_KEYWORDS.items()
+}
+_VIBE_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(w) for w in _VIBE_WORDS) + r")\b")
+_INDOOR_PATTERN = re.compile(r"\b(?:" + "|".join(_INDOOR_WORDS) + r")\b")
+_OUTDOOR_PATTERN = re.compile(r"\b(?:" + "|".join(_OUTDOOR_WORDS) + r")\b")
+_NON_WORD = re.compile(r"[^\w\s]")
+
 
 def _extract_group_size_fallback(message: str) -> Optional[int]:
     """
     Simple fallback: extract '4 people', 'group of 3', etc. without LLM.
+    Numbers that are times, distances or prices ('10 min', '7pm') are skipped.
     """
     msg = message.lower()
-    m = re.search(r"\b(\d+)\s*(people|friends|of us|guys|girls)?\b", msg)
+    m = re.search(
+        r"\b(\d+)(?!\s*(?:min|hour|hr|pm|am|mile|mi\b|block|km|dollar|buck|%|:))\s*(people|friends|of us|guys|girls)?\b",
+        msg,
+    )
     if m:
         try:
             return int(m.group(1))
@@ -22,6 +96,71 @@ def _extract_group_size_fallback(message: str) -> Optional[int]:
     return None
 
 
+def _normalize_message(message: str) -> str:
+    """Cache key form: lowercase, no punctuation, single spaces."""
+    return " ".join(_NON_WORD.sub(" ", message.lower()).split())
+
+
+def _score_intent_types(msg: str, vibe: str) -> Dict[str, float]:
+    """Votes per intent type from keyword hits, the vibe classifier and campus rules."""
+    votes: Dict[str, float] = {}
+    for intent_type, pattern in _KEYWORD_PATTERNS.items():
+        hits = len(set(pattern.findall(msg)))
+        if hits:
+            votes[intent_type] = min(0.9, 0.3 + 0.3 * hits)
+
+    vibe_intent = _VIBE_TO_INTENT.get(vibe)
+    if vibe_intent:
+        votes[vibe_intent] = votes.get(vibe_intent, 0.0) + 0.3
+
+    if is_on_campus_query(msg):
+        votes["events"] = votes.get("events", 0.0) + 0.3
+    return votes
+
+
+def _resolve_locally(message: str) -> Tuple[Dict[str, Any], float]:
+    """
+    Rules-only intent: keyword tables, classify_vibe and the campus rules in
+    intent.py. Returns (intent, confidence in [0, 1]).
+    """
+    msg = message.lower()
+    votes = _score_intent_types(msg, classify_vibe(msg))
+
+    ranked = sorted(votes.items(), key=lambda kv: kv[1], reverse=True)
+    if not ranked:
+        intent_type, confidence = "other", 0.0
+    else:
+        intent_type, confidence = ranked[0]
+        for other, score in ranked[1:]:
+            if frozenset((intent_type, other)) not in _COMPATIBLE:
+                confidence -= score
+        confidence = max(0.0, min(1.0, confidence))
+
+    # Long, nuanced requests are where the LLM actually helps
+    if len(msg.split()) > 20:
+        confidence *= 0.8
+
+    indoor = bool(_INDOOR_PATTERN.search(msg))
+    outdoor = bool(_OUTDOOR_PATTERN.search(msg))
+    indoor_outdoor = "indoor" if indoor and not outdoor else "outdoor" if outdoor and not indoor else "either"
+
+    intent = {
+        "intent_type": intent_type,
+        "normalized_query": " ".join(message.split()),
+        "group_size": _extract_group_size_fallback(message),
+        "vibes": list(dict.fromkeys(_VIBE_PATTERN.findall(msg))),
+        "indoor_outdoor": indoor_outdoor,
+    }
+    return intent, round(confidence, 2)
+
+
+def _get_model():
+    global _model
+    if _model is None:
+        _model = genai.GenerativeModel("models/gemini-2.5-flash")
+    return _model
+
+
 def _parse_llm_json(text: str) -> Optional[Dict[str, Any]]:
     """
     Extract a JSON object from LLM text. Handles cases where the model
@@ -43,7 +182,12 @@ def _parse_llm_json(text: str) -> Optional[Dict[str, Any]]:
 
 def extract_semantic_intent(message: str) -> Dict[str, Any]:
     """
-    Use Gemini Flash to extract a structured semantic intent for the user query.
+    Extract a structured semantic intent for the user query.
+
+    Tiered: a local rules layer answers when it is confident enough
+    (LOCAL_CONFIDENCE_THRESHOLD), then the trained intent classifier (at
+    the threshold calibrated with the model); otherwise Gemini Flash is asked.
+    Results are cached by normalized message.
 
     Returns a dict like:
     {
@@ -66,6 +210,32 @@ def extract_semantic_intent(message: str) -> Dict[str, Any]:
             "indoor_outdoor": "either",
         }
 
+    key = _normalize_message(message)
+    cached = _INTENT_CACHE.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    local, confidence = _resolve_locally(message)
+    if confidence >= LOCAL_CONFIDENCE_THRESHOLD:
+        logger.debug(f"SEMANTIC_INTENT: rules ({confidence}) → {local['intent_type']}")
+        result = local
+    else:
+        predicted = predict_intent(message).get("intent_type")
+        if predicted:
+            logger.debug(f"SEMANTIC_INTENT: classifier → {predicted}")
+            result = {**local, "intent_type": predicted}
+        else:
+            result = _extract_with_llm(message)
+        if result is None:
+            # LLM failed: answer with the rules result but don't cache it
+            return local
+
+    _INTENT_CACHE.set(key, result)
+    return copy.deepcopy(result)
+
+
+def _extract_with_llm(message: str) -> Optional[Dict[str, Any]]:
+    """Gemini Flash semantic parse; None if the call or the JSON fails."""
     prompt = f"""
 You are a semantic parser for a student concierge app called VioletVibes.
 
@@ -86,27 +256,17 @@ User request:
 Now respond with ONLY a JSON object and nothing else.
 """
 
-    # Default fallback (used if LLM fails)
-    fallback = {
-        "intent_type": "other",
-        "normalized_query": message,
-        "group_size": _extract_group_size_fallback(message),
-        "vibes": [],
-        "indoor_outdoor": "either",
-    }
-
     try:
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
-        resp = model.generate_content(prompt)
+        resp = _get_model().generate_content(prompt, request_options={"timeout": 10})
         text = getattr(resp, "text", "") or ""
         data = _parse_llm_json(text)
         if not data:
-            print("SEMANTIC_INTENT: JSON parse failed, using fallback")
-            return fallback
+            logger.warning("SEMANTIC_INTENT: JSON parse failed, using rules result")
+            return None
 
         # Normalize fields
         intent_type = (data.get("intent_type") or "other").lower()
-        if intent_type not in ["study", "coffee", "eat", "nightlife", "events", "outdoors", "date", "other"]:
+        if intent_type not in INTENT_TYPES:
             intent_type = "other"
 
         normalized_query = data.get("normalized_query") or message
@@ -133,5 +293,5 @@ Now respond with ONLY a JSON object and nothing else.
         }
 
     except Exception as ex:
-        print("SEMANTIC_INTENT ERROR:", ex)
-        return fallback
+        logger.error(f"SEMANTIC_INTENT ERROR: {ex}")
+        return None
@@ -0,0 +1,228 @@
+# services/recommendation/tile_cache.py
+"""
+Shared cache for non-personal recommendation data, keyed by geo tile and
+time bucket.
+
+"Quick bites near MetroTech at 12:40" is the same list for every student on
+that block in the same quarter hour, so candidate lists are computed once
+per (category, tile, bucket) from the tile's center and shared by every
+worker through Valkey/Redis (process memory without Redis):
+
+    cache = TileCache("places")
+    places = cache.get(("quick_bites", geo_tile(...)), compute)
+
+- fresh: an entry for the current bucket is served as is
+- stale-while-revalidate: when the bucket rolls over, the previous
+  bucket's entry is served while one background refresh fills the new one
+- miss: one caller computes (single-flight within the process, a short
+  Redis lock across workers); the others wait for its result, so a burst
+  of requests from one tile hits Google once
+- partial: a compute that hit an upstream error raises PartialResult; its
+  value is served but only kept for PARTIAL_TTL_SECONDS (and never
+  replaces a stale entry), so one Google hiccup doesn't blank a tile
+"""
+
+from __future__ import annotations
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services.location_utils import geo_tile, tile_center
+from utils.cache import TTLCache
+from utils.context_manager import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "reco:tile:"
+BUCKET_SECONDS = 15 * 60
+# ~550 m x 420 m around NYU; walk times are measured from the tile center
+TILE_DEG = 0.005
+# How long a request waits for another worker's computation before doing it itself
+FILL_WAIT_SECONDS = 10
+FILL_LOCK_SECONDS = 30
+# How long a result computed during an upstream error is reused
+PARTIAL_TTL_SECONDS = 30
+
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tile-cache-refresh")
+
+
+def tile_key(lat: float, lng: float) -> str:
+    return geo_tile(lat, lng, size_deg=TILE_DEG)
+
+
+def tile_origin(lat: float, lng: float) -> Tuple[float, float]:
+    """The point a tile's shared results are computed from."""
+    return tile_center(lat, lng, size_deg=TILE_DEG)
+
+
+def time_bucket(now: Optional[float] = None) -> int:
+    return int((now or time.time()) // BUCKET_SECONDS)
+
+
+class PartialResult(Exception):
+    """Raised by a compute whose value is incomplete (an upstream lookup failed)."""
+
+    def __init__(self, value: Any):
+        super().__init__("partial result")
+        self.value = value
+
+
+def content_etag(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class TileCache:
+    def __init__(self, namespace: str, max_local_entries: int = 2048):
+        self.namespace = namespace
+        # Entries outlive their bucket by one more, so they can be served stale
+        self._local = TTLCache(max_entries=max_local_entries, ttl_seconds=2 * BUCKET_SECONDS)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"fresh": 0, "stale": 0, "computed": 0, "partial": 0, "waited": 0}
+
+    def _key(self, parts: Tuple[str, ...], bucket: int) -> str:
+        return f"{KEY_PREFIX}{self.namespace}:{':'.join(str(p) for p in parts)}:{bucket}"
+
+    # -----------------------------------------------------------
+    # STORAGE
+    # -----------------------------------------------------------
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        redis_client = get_redis_client()
+        if redis_client:
+            try:
+                raw = redis_client.get(key)
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                logger.warning(f"Tile cache read failed ({e}); using process memory")
+        return self._local.get(key)
+
+    def _write(self, key: str, entry: Dict[str, Any], ttl_seconds: int = 2 * BUCKET_SECONDS) -> None:
+        redis_client = get_redis_client()
+        if redis_client:
+            try:
+                redis_client.set(key, json.dumps(entry, default=str), ex=ttl_seconds)
+                return
+            except Exception as e:
+                logger.warning(f"Tile cache write failed ({e}); using process memory")
+        self._local.set(key, entry, ttl_seconds=ttl_seconds)
+
+    def _try_lock(self, key: str) -> Optional[bool]:
+        """True: this caller holds the fill lock. False: another worker does. None: no lock available."""
+        redis_client = get_redis_client()
+        if not redis_client:
+            return None
+        try:
+            return bool(redis_client.set(key + ":lock", "1", nx=True, ex=FILL_LOCK_SECONDS))
+        except Exception:
+            return None
+
+    def _unlock(self, key: str) -> None:
+        redis_client = get_redis_client()
+        if redis_client:
+            try:
+                redis_client.delete(key + ":lock")
+            except Exception:
+                pass
+
+    # -----------------------------------------------------------
+    # FILL
+    # -----------------------------------------------------------
+
+    def _fill(self, key: str, compute: Callable[[], Any], keep_partial: bool = True) -> Dict[str, Any]:
+        """
+        Compute and store `key` once; concurrent callers in this process share
+        the result. A partial result is stored briefly if `keep_partial`,
+        otherwise not at all.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            self.stats["waited"] += 1
+            return future.result()
+
+        try:
+            entry = None
+            locked = self._try_lock(key)
+            if locked is False:
+                # Another worker is computing it: wait for its entry
+                deadline = time.monotonic() + FILL_WAIT_SECONDS
+                while entry is None and time.monotonic() < deadline:
+                    time.sleep(0.1)
+                    entry = self._read(key)
+                if entry is not None:
+                    self.stats["waited"] += 1
+            if entry is None:
+                try:
+                    entry = self._compute(key, compute, keep_partial)
+                finally:
+                    if locked:
+                        self._unlock(key)
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _compute(self, key: str, compute: Callable[[], Any], keep_partial: bool) -> Dict[str, Any]:
+        try:
+            value = compute()
+        except PartialResult as partial:
+            self.stats["partial"] += 1
+            entry = {"value": partial.value, "etag": content_etag(partial.value), "computed_at": time.time(),
+                     "partial": True}
+            if keep_partial:
+                self._write(key, entry, ttl_seconds=PARTIAL_TTL_SECONDS)
+            return entry
+        entry = {"value": value, "etag": content_etag(value), "computed_at": time.time()}
+        self._write(key, entry)
+        self.stats["computed"] += 1
+        return entry
+
+    def _refresh(self, key: str, compute: Callable[[], Any]) -> None:
+        def run():
+            try:
+                # A partial refresh isn't stored: the stale entry keeps serving
+                self._fill(key, compute, keep_partial=False)
+            except Exception as e:
+                logger.warning(f"Tile cache refresh of {key} failed: {e}")
+
+        with self._lock:
+            if key in self._inflight:
+                return
+        _refresh_executor.submit(run)
+
+    # -----------------------------------------------------------
+    # API
+    # -----------------------------------------------------------
+
+    def get_entry(self, parts: Tuple[str, ...], compute: Callable[[], Any]) -> Dict[str, Any]:
+        """{"value", "etag", "computed_at"} for parts in the current time bucket."""
+        bucket = time_bucket()
+        key = self._key(parts, bucket)
+
+        entry = self._read(key)
+        if entry is not None:
+            self.stats["fresh"] += 1
+            return entry
+
+        previous = self._read(self._key(parts, bucket - 1))
+        if previous is not None:
+            self.stats["stale"] += 1
+            self._refresh(key, compute)
+            return previous
+
+        return self._fill(key, compute)
+
+    def get(self, parts: Tuple[str, ...], compute: Callable[[], Any]) -> Any:
+        return self.get_entry(parts, compute)["value"]
@@ -0,0 +1,249 @@
+# services/scrapers/bpl_worker.py
+"""
+Brooklyn Public Library events via a long-lived headless browser.
+
+The library site only renders in a browser, so scrape_bpl.js runs as a
+worker process (`node scrape_bpl.js --worker`) that keeps one Chromium warm
+and takes JSON-lines jobs on stdin. This module owns that process: it
+starts it on first use, gives every job a deadline, and kills and
+restarts the worker if it doesn't answer in time, so a hung page can't
+hang ingestion and later passes skip the browser cold start.
+"""
+
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import queue
+import atexit
+import shutil
+import logging
+import itertools
+import threading
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from utils.datetime_utils import LOCAL_TZ, now_local
+
+logger = logging.getLogger(__name__)
+
+SERVER_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+WORKER_SCRIPT = os.path.join(SERVER_ROOT, "scrape_bpl.js")
+
+STARTUP_TIMEOUT_SECONDS = 30
+# Python-side grace on top of the job deadline the worker enforces itself
+KILL_GRACE_SECONDS = 5
+
+
+class BplWorkerError(RuntimeError):
+    pass
+
+
+def node_available() -> bool:
+    return shutil.which("node") is not None and os.path.exists(WORKER_SCRIPT)
+
+
+class BplWorker:
+    """One `node scrape_bpl.js --worker` process; jobs are serialized."""
+
+    def __init__(self, script: str = WORKER_SCRIPT, node: str = "node"):
+        self.script = script
+        self.node = node
+        self._proc: Optional[subprocess.Popen] = None
+        self._responses: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # -----------------------------------------------------------
+    # PROCESS
+    # -----------------------------------------------------------
+
+    def _start(self) -> None:
+        logger.info("Starting BPL browser worker")
+        self._responses = queue.Queue()
+        self._proc = subprocess.Popen(
+            [self.node, self.script, "--worker"],
+            cwd=os.path.dirname(self.script),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None,  # worker logs straight to ours
+            text=True,
+            bufsize=1,
+        )
+        threading.Thread(
+            target=self._read_stdout, args=(self._proc, self._responses),
+            name="bpl-worker-reader", daemon=True,
+        ).start()
+        try:
+            ready = self._wait_for(None, STARTUP_TIMEOUT_SECONDS)
+            if not ready.get("ready"):
+                raise BplWorkerError(ready.get("error") or "worker did not start")
+        except Exception:
+            # Don't leave a half-started browser behind
+            self._proc.kill()
+            self._proc = None
+            raise
+
+    @staticmethod
+    def _read_stdout(proc: subprocess.Popen, responses: "queue.Queue[Dict[str, Any]]") -> None:
+        for line in proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                responses.put(json.loads(line))
+            except ValueError:
+                logger.debug(f"BPL worker: ignoring non-JSON output {line[:200]!r}")
+        responses.put({"id": None, "ok": False, "error": "worker exited", "exited": True})
+
+    def _alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def stop(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            proc.stdin.close()  # worker closes the browser on EOF
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+
+    def _wait_for(self, job_id: Optional[int], timeout: float) -> Dict[str, Any]:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"BPL worker gave no answer within {timeout:.0f}s")
+            try:
+                message = self._responses.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if message.get("exited"):
+                raise BplWorkerError("worker exited")
+            if message.get("id") == job_id:
+                return message
+
+    # -----------------------------------------------------------
+    # JOBS
+    # -----------------------------------------------------------
+
+    def request(self, cmd: str, timeout: float, **params) -> Dict[str, Any]:
+        with self._lock:
+            if not self._alive():
+                self._start()
+            job_id = next(self._ids)
+            job = {"id": job_id, "cmd": cmd, "timeout_ms": int(timeout * 1000), **params}
+            try:
+                self._proc.stdin.write(json.dumps(job) + "\n")
+                self._proc.stdin.flush()
+                response = self._wait_for(job_id, timeout + KILL_GRACE_SECONDS)
+            except (TimeoutError, BplWorkerError, OSError):
+                # Hung or dead: start clean next time
+                logger.warning("BPL worker unresponsive; restarting it on the next job")
+                if self._proc is not None:
+                    self._proc.kill()
+                self._proc = None
+                raise
+
+        if not response.get("ok"):
+            raise BplWorkerError(response.get("error") or "scrape failed")
+        return response
+
+    def scrape(self, limit: int = 20, timeout: float = 25) -> List[Dict[str, Any]]:
+        return self.request("scrape", timeout, limit=limit).get("events") or []
+
+
+# -----------------------------------------------------------
+# NORMALIZATION
+# -----------------------------------------------------------
+
+_DATE_FORMATS = ("%A, %B %d, %Y", "%a, %b %d, %Y", "%B %d, %Y", "%b %d, %Y", "%A, %B %d", "%a, %b %d", "%B %d", "%b %d")
+_TIME_RE = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*([ap])\.?m", re.IGNORECASE)
+
+
+def _parse_date(text: Optional[str]):
+    if not text:
+        return None
+    text = " ".join(text.replace("\n", " ").split())
+    today = now_local().date()
+    for fmt in _DATE_FORMATS:
+        if "%Y" in fmt:
+            try:
+                return datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+        # No year on the card: the next occurrence of that date. The year is
+        # parsed with it, since strptime's default (1900) has no Feb 29
+        candidates = []
+        for year in (today.year, today.year + 1):
+            try:
+                candidates.append(datetime.strptime(f"{text} {year}", f"{fmt} %Y").date())
+            except ValueError:
+                continue
+        if candidates:
+            return next((day for day in candidates if day >= today), candidates[0])
+    return None
+
+
+def _parse_times(text: Optional[str]):
+    """'2:00 pm - 3:30 pm' -> [(14, 0), (15, 30)]"""
+    times = []
+    for hour, minute, meridiem in _TIME_RE.findall(text or ""):
+        h = int(hour) % 12 + (12 if meridiem.lower() == "p" else 0)
+        times.append((h, int(minute or 0)))
+    return times
+
+
+def normalize_bpl_event(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Card fields from the worker -> the event shape the other scrapers use."""
+    day = _parse_date(raw.get("date"))
+    times = _parse_times(raw.get("time"))
+
+    start = end = None
+    if day is not None:
+        h, m = times[0] if times else (0, 0)
+        start = LOCAL_TZ.localize(datetime(day.year, day.month, day.day, h, m)).isoformat()
+        if len(times) > 1:
+            h, m = times[1]
+            end = LOCAL_TZ.localize(datetime(day.year, day.month, day.day, h, m)).isoformat()
+
+    location = raw.get("location")
+    return {
+        "name": raw.get("title"),
+        "description": None,
+        "start": start,
+        "end": end,
+        "url": raw.get("url"),
+        "image": None,
+        "location": location,
+        "address": f"{location}, Brooklyn Public Library, Brooklyn, NY" if location else None,
+    }
+
+
+# -----------------------------------------------------------
+# PUBLIC
+# -----------------------------------------------------------
+
+_worker: Optional[BplWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_bpl_worker() -> BplWorker:
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = BplWorker()
+            atexit.register(_worker.stop)
+        return _worker
+
+
+def fetch_bpl_events(limit: int = 20, timeout: float = 25) -> List[Dict[str, Any]]:
+    """
+    Upcoming Brooklyn Public Library events (normalized), scraped by the warm
+    browser worker. Raises on worker errors and on deadline overruns.
+    """
+    events = [normalize_bpl_event(e) for e in get_bpl_worker().scrape(limit=limit, timeout=timeout)]
+    return [e for e in events if e["name"]]
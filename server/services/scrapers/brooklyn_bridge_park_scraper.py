@@ -1,7 +1,9 @@
 # services/scrapers/brooklyn_bridge_park_scraper.py
 
 import requests
-from bs4 import BeautifulSoup
+
+from services.scrapers.conditional import Fetched, conditional_get, validators
+from services.scrapers.parsing import html_to_text
 
 API_URL = "https://www.brooklynbridgepark.org/wp-json/wp/v2/tribe_events"
 
@@ -14,50 +16,51 @@ HEADERS = {
 }
 
 
-def fetch_brooklyn_bridge_park_events(limit=20):
+def fetch_brooklyn_bridge_park_events(limit=20, conditional=False):
     """
     Scrapes upcoming events from Brooklyn Bridge Park’s Tribe Events API.
     Works around their bot protection by using a real browser User-Agent.
+    Errors propagate to the caller (the scraper runner counts them).
+    With conditional=True, raises NotModified when the feed hasn't changed;
+    the events carry the feed's validators, to remember() once stored.
     """
+    get = conditional_get if conditional else requests.get
+    r = get(API_URL, params={"per_page": limit}, headers=HEADERS, timeout=10)
+    r.raise_for_status()
+    return Fetched(parse_brooklyn_bridge_park_events(r.json()), validators(r))
+
+
+def parse_brooklyn_bridge_park_events(data):
+    """Event dicts from a tribe_events API response (list of posts)."""
+    events = []
+
+    for ev in data:
+        title = ev.get("title", {}).get("rendered")
+        url = ev.get("link")
+        desc_html = ev.get("content", {}).get("rendered", "")
+        desc = html_to_text(desc_html).strip()
+        meta = ev.get("meta", {})
+
+        start = meta.get("_EventStartDate")
+        end = meta.get("_EventEndDate")
+
+        # featured image (Yoast)
+        image = None
+        yoast = ev.get("yoast_head_json", {})
+        if yoast:
+            imgs = yoast.get("og_image", [])
+            if imgs:
+                image = imgs[0].get("url")
+
+        events.append({
+            "name": title,
+            "description": desc[:300] + "..." if len(desc) > 300 else desc,
+            "start": start,
+            "end": end,
+            "url": url,
+            "image": image,
+            "address": "Brooklyn Bridge Park, Brooklyn, NY",
+            "location": "Brooklyn Bridge Park",
+        })
 
-    try:
-        r = requests.get(API_URL, params={"per_page": limit}, headers=HEADERS, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-
-        events = []
-
-        for ev in data:
-            title = ev.get("title", {}).get("rendered")
-            url = ev.get("link")
-            desc_html = ev.get("content", {}).get("rendered", "")
-            desc = BeautifulSoup(desc_html, "html.parser").get_text().strip()
-            meta = ev.get("meta", {})
-
-            start = meta.get("_EventStartDate")
-            end = meta.get("_EventEndDate")
-
-            # featured image (Yoast)
-            image = None
-            yoast = ev.get("yoast_head_json", {})
-            if yoast:
-                imgs = yoast.get("og_image", [])
-                if imgs:
-                    image = imgs[0].get("url")
-
-            events.append({
-                "name": title,
-                "description": desc[:300] + "..." if len(desc) > 300 else desc,
-                "start": start,
-                "end": end,
-                "url": url,
-                "image": image,
-                "address": "Brooklyn Bridge Park, Brooklyn, NY",
-                "location": "Brooklyn Bridge Park",
-            })
-
-        return events
-
-    except Exception as e:
-        print("Brooklyn Bridge Park scraper error:", e)
-        return []
+    return events
@@ -0,0 +1,150 @@
+# services/scrapers/conditional.py
+"""
+Conditional fetches for scrapers.
+
+Each URL's ETag, Last-Modified and body hash are remembered after a
+successful parse. The next fetch sends If-None-Match / If-Modified-Since;
+a 304, or a 200 whose body hashes the same as last time, raises
+NotModified so the scraper skips parsing entirely. The scraper runner
+treats that as a success and the source keeps its events in the store.
+
+Validators are only worth storing once the events parsed from that
+response are in the store: a scraper returns them with its events
+(Fetched), and the ingester calls remember() after the upsert. A source
+that timed out, or a pass that failed to publish, leaves the old
+validators in place, so the next fetch parses the page again.
+
+Validators live in Valkey/Redis when available (shared by every ingester)
+and in process memory otherwise.
+"""
+
+from __future__ import annotations
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+
+from utils.context_manager import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+VALIDATORS_KEY = "scrape:validators"
+
+_local: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+class NotModified(Exception):
+    """The resource is unchanged since the last successful scrape."""
+
+
+class Fetched(list):
+    """Parsed items plus the validators of the response they came from (None if unconditional)."""
+
+    def __init__(self, items, validators: Optional[Dict[str, Any]] = None):
+        super().__init__(items)
+        self.validators = validators
+
+
+def _cache_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+    if not params:
+        return url
+    return f"{url}?{json.dumps(params, sort_keys=True, default=str)}"
+
+
+def _body_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _load(key: str) -> Optional[Dict[str, Any]]:
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            raw = redis_client.hget(VALIDATORS_KEY, key)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"Failed to read scrape validators: {e}")
+    with _lock:
+        return _local.get(key)
+
+
+def _store(key: str, validators: Dict[str, Any]) -> None:
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            redis_client.hset(VALIDATORS_KEY, key, json.dumps(validators))
+            return
+        except Exception as e:
+            logger.warning(f"Failed to write scrape validators: {e}")
+    with _lock:
+        _local[key] = validators
+
+
+def conditional_get(url: str, params: Optional[Dict[str, Any]] = None,
+                    headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+    """
+    requests.get with validators from the last successful scrape.
+    Raises NotModified on 304 or an identical body; other errors are left to
+    raise_for_status() as usual. Pass validators(response) on with the
+    parsed items and remember() them once those are stored.
+    """
+    key = _cache_key(url, params)
+    previous = _load(key) or {}
+
+    request_headers = dict(headers or {})
+    if previous.get("etag"):
+        request_headers["If-None-Match"] = previous["etag"]
+    if previous.get("last_modified"):
+        request_headers["If-Modified-Since"] = previous["last_modified"]
+
+    r = requests.get(url, params=params, headers=request_headers, **kwargs)
+    if r.status_code == 304:
+        raise NotModified(url)
+
+    r.raise_for_status()
+    digest = _body_hash(r.content)
+    if previous.get("hash") == digest:
+        # Server ignores validators, but nothing changed: skip the parse
+        # (refresh the stored ETag in case it rotates on identical content)
+        if r.headers.get("ETag") != previous.get("etag"):
+            _store(key, {**previous, "etag": r.headers.get("ETag")})
+        raise NotModified(url)
+
+    r.cache_key = key
+    r.body_hash = digest
+    return r
+
+
+def validators(response: requests.Response) -> Optional[Dict[str, Any]]:
+    """Validators of a conditional_get() response, for remember(); None for other responses."""
+    key = getattr(response, "cache_key", None)
+    if key is None:
+        return None
+    return {
+        "key": key,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "hash": response.body_hash,
+    }
+
+
+def remember(fetched: Optional[Dict[str, Any]]) -> None:
+    """Record validators(response) once the items parsed from it are stored."""
+    if not fetched:
+        return
+    _store(fetched["key"], {k: fetched[k] for k in ("etag", "last_modified", "hash")})
+
+
+def clear_validators() -> None:
+    """Forget every validator, forcing the next scrape to re-parse."""
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            redis_client.delete(VALIDATORS_KEY)
+        except Exception as e:
+            logger.warning(f"Failed to clear scrape validators: {e}")
+    with _lock:
+        _local.clear()
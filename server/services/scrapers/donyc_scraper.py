@@ -1,7 +1,8 @@
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
+from services.scrapers.parsing import make_soup
+
 BASE_URL = "https://donyc.com"
 POPUPS_URL = "https://donyc.com/pop-ups-nyc"
 
@@ -30,7 +31,12 @@ def fetch_donyc_popups(limit=40, debug=False):
             print("DoNYC error:", e)
         return []
 
-    soup = BeautifulSoup(r.text, "lxml")
+    return parse_donyc_popups(r.text, limit)
+
+
+def parse_donyc_popups(html, limit=40):
+    """Event dicts from the DoNYC pop-ups page HTML."""
+    soup = make_soup(html)
 
     # DoNYC uses multiple card formats
     cards = (
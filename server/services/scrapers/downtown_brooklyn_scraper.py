@@ -1,43 +1,46 @@
 import requests
-from bs4 import BeautifulSoup
+
+from services.scrapers.conditional import Fetched, conditional_get, validators
+from services.scrapers.parsing import html_to_text
 
 API_URL = "https://www.downtownbrooklyn.com/wp-json/tribe/events/v1/events"
 
-def fetch_downtown_bk_events(limit: int = 20):
-    """Fetch events from Downtown Brooklyn JSON API."""
-    try:
-        resp = requests.get(API_URL, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-
-        events = data.get("events", [])
-        results = []
-
-        for e in events[:limit]:
-            title = e.get("title")
-            url = e.get("url")
-            image = (e.get("image") or {}).get("url")
-            description_html = e.get("description") or ""
-
-            # Clean description
-            description = (
-                BeautifulSoup(description_html, "html.parser")
-                .get_text(separator=" ", strip=True)
-            )
-
-            results.append({
-                "name": title,
-                "url": url,
-                "image": image,
-                "description": description,
-                "start": e.get("start_date"),
-                "end": e.get("end_date"),
-                "location": "Downtown Brooklyn",
-                "address": None,
-            })
-
-        return results
-
-    except Exception as err:
-        print("Downtown Brooklyn scraper error:", err)
-        return []
+def fetch_downtown_bk_events(limit: int = 20, conditional: bool = False):
+    """
+    Fetch events from Downtown Brooklyn JSON API.
+    Errors propagate to the caller (the scraper runner counts them).
+    With conditional=True, raises NotModified when the feed hasn't changed;
+    the events carry the feed's validators, to remember() once stored.
+    """
+    get = conditional_get if conditional else requests.get
+    resp = get(API_URL, timeout=10)
+    resp.raise_for_status()
+    return Fetched(parse_downtown_bk_events(resp.json(), limit), validators(resp))
+
+
+def parse_downtown_bk_events(data, limit: int = 20):
+    """Event dicts from a tribe/events/v1 API response."""
+    events = data.get("events", [])
+    results = []
+
+    for e in events[:limit]:
+        title = e.get("title")
+        url = e.get("url")
+        image = (e.get("image") or {}).get("url")
+        description_html = e.get("description") or ""
+
+        # Clean description
+        description = html_to_text(description_html, separator=" ", strip=True)
+
+        results.append({
+            "name": title,
+            "url": url,
+            "image": image,
+            "description": description,
+            "start": e.get("start_date"),
+            "end": e.get("end_date"),
+            "location": "Downtown Brooklyn",
+            "address": None,
+        })
+
+    return results
@@ -1,79 +1,156 @@
+# services/scrapers/engage_events_service.py
+"""
+NYU Engage events.
+
+EngageClient keeps one requests.Session (cookies included) and the XSRF token
+pulled from the events page. The page is only re-downloaded when the API
+rejects the token (401/403/419), and results are paged through the API's
+page/perPage parameters, so more than one page of events can be ingested.
+"""
 import re
+import logging
+import threading
 import requests
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
 
 BASE_PAGE = "https://engage.nyu.edu/events"
 BASE_API = "https://engage.nyu.edu/api/discovery/event/search"
 
+# Most the API returns per page
+MAX_PAGE_SIZE = 50
+
+# Responses that mean "token/cookie expired, fetch a new one"
+TOKEN_REJECTED_STATUSES = {401, 403, 419}
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "application/json",
+}
+
+
+class EngageTokenError(RuntimeError):
+    """The events page didn't contain an XSRF token."""
+
+
 def _extract_xsrf(html: str) -> str | None:
     """Pull the XSRF token out of window.initialAppState."""
     m = re.search(r'"xsrfToken":"([^"]+)"', html)
     return m.group(1) if m else None
 
 
-def fetch_engage_events(days_ahead: int = 7, limit: int = 50):
-    """
-    FULLY WORKING Engage scraper.
-    Loads XSRF token from HTML, then hits the event API correctly.
-    """
-    # Step 1 — load HTML to grab a fresh token
-    page = requests.get(BASE_PAGE, timeout=10)
-    xsrf = _extract_xsrf(page.text)
+def _format_event(e: dict) -> dict:
+    return {
+        "name": e.get("name"),
+        "start": e.get("startDate"),
+        "end": e.get("endDate"),
+        "description": e.get("description"),
+        "location": e.get("location"),
+        "organization": e.get("organizationName"),
+        "image": e.get("imageUrl"),
+        "url": f"https://engage.nyu.edu/event/{e.get('id')}",
+    }
 
-    if not xsrf:
-        print("[Engage] Could not extract XSRF token")
-        return []
 
-    cookies = {
-        "XSRF-TOKEN": xsrf
-    }
+def parse_engage_search(data: dict) -> list:
+    """Formatted events from one search API response page."""
+    events = data.get("data") or data.get("value") or []
+    return [_format_event(e) for e in events]
 
-    headers = {
-        "X-XSRF-TOKEN": xsrf,
-        "Referer": BASE_PAGE,
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
 
-    # Step 2 — construct the query params
-    now = datetime.utcnow()
-    future = now + timedelta(days=days_ahead)
-
-    params = {
-        "orderBy": "startDate",
-        "status": "approved",
-        "query": "",
-        "endsAfter": now.replace(microsecond=0).isoformat() + "Z",
-        "startsBefore": future.replace(microsecond=0).isoformat() + "Z",
-        "page": 1,
-        "perPage": limit,
-    }
+class EngageClient:
+    """Session-backed Engage API client with a cached XSRF token."""
 
-    # Step 3 — call the actual API
-    r = requests.get(
-        BASE_API,
-        params=params,
-        headers=headers,
-        cookies=cookies,
-        timeout=10
-    )
-
-    r.raise_for_status()
-    data = r.json()
-    events = data.get("data") or data.get("value") or []
+    def __init__(self, session: requests.Session | None = None):
+        self.session = session or requests.Session()
+        self.session.headers.update(HEADERS)
+        self._xsrf: str | None = None
+        self._lock = threading.Lock()
+        self.token_refreshes = 0
 
-    formatted = []
-    for e in events:
-        formatted.append({
-            "name": e.get("name"),
-            "start": e.get("startDate"),
-            "end": e.get("endDate"),
-            "description": e.get("description"),
-            "location": e.get("location"),
-            "organization": e.get("organizationName"),
-            "image": e.get("imageUrl"),
-            "url": f"https://engage.nyu.edu/event/{e.get('id')}",
-        })
-
-    return formatted
+    def _refresh_token(self) -> str:
+        page = self.session.get(BASE_PAGE, timeout=10)
+        page.raise_for_status()
+        xsrf = _extract_xsrf(page.text)
+        if not xsrf:
+            raise EngageTokenError("Could not extract Engage XSRF token")
+
+        # The page response sets the session cookies; the token cookie is
+        # what the API checks against the X-XSRF-TOKEN header
+        self.session.cookies.set("XSRF-TOKEN", xsrf)
+        self._xsrf = xsrf
+        self.token_refreshes += 1
+        return xsrf
+
+    def _token(self, stale: str | None = None) -> str:
+        with self._lock:
+            # Another thread may already have replaced the stale token
+            if self._xsrf is None or self._xsrf == stale:
+                return self._refresh_token()
+            return self._xsrf
+
+    def _search(self, params: dict) -> dict:
+        xsrf = self._token()
+        for attempt in range(2):
+            r = self.session.get(
+                BASE_API,
+                params=params,
+                headers={"X-XSRF-TOKEN": xsrf, "Referer": BASE_PAGE},
+                timeout=10,
+            )
+            if r.status_code in TOKEN_REJECTED_STATUSES and attempt == 0:
+                logger.info(f"Engage API returned {r.status_code}; refreshing XSRF token")
+                xsrf = self._token(stale=xsrf)
+                continue
+            r.raise_for_status()
+            return r.json()
+
+    def fetch_events(self, days_ahead: int = 7, limit: int = 50, page_size: int = MAX_PAGE_SIZE) -> list:
+        """Upcoming approved events, ordered by start, paging until `limit`."""
+        now = datetime.utcnow()
+        future = now + timedelta(days=days_ahead)
+        per_page = max(1, min(page_size, limit, MAX_PAGE_SIZE))
+
+        formatted = []
+        page = 1
+        while len(formatted) < limit:
+            data = self._search({
+                "orderBy": "startDate",
+                "status": "approved",
+                "query": "",
+                "endsAfter": now.replace(microsecond=0).isoformat() + "Z",
+                "startsBefore": future.replace(microsecond=0).isoformat() + "Z",
+                "page": page,
+                "perPage": per_page,
+            })
+            events = parse_engage_search(data)
+            formatted.extend(events)
+
+            total = data.get("@odata.count") or data.get("total")
+            if len(events) < per_page or (total is not None and page * per_page >= total):
+                break
+            page += 1
+
+        return formatted[:limit]
+
+
+_client: EngageClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_engage_client() -> EngageClient:
+    """Process-wide client, so the session and token are reused across calls."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = EngageClient()
+        return _client
+
+
+def fetch_engage_events(days_ahead: int = 7, limit: int = 50):
+    """
+    Upcoming NYU Engage events (up to `limit`, across as many API pages as
+    needed). Raises on network/API errors.
+    """
+    return get_engage_client().fetch_events(days_ahead=days_ahead, limit=limit)
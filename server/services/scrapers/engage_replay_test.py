@@ -0,0 +1,135 @@
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+sys.path.insert(0, ROOT)
+
+# engage_replay_test.py
+#
+# Replays the Engage client against the checked-in engage_raw.html and a
+# fake search API, without touching the network:
+#   - the events page is fetched once and its token reused across calls
+#   - a 419 from the API refreshes the token and retries
+#   - results are paged through page/perPage until the limit
+#
+#   python services/scrapers/engage_replay_test.py
+
+import json
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from requests.adapters import BaseAdapter
+
+from services.scrapers.engage_events_service import (
+    BASE_PAGE,
+    BASE_API,
+    EngageClient,
+    _extract_xsrf,
+)
+
+RAW_HTML_PATH = os.path.join(ROOT, "engage_raw.html")
+TOTAL_EVENTS = 120
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serves engage_raw.html for the events page and fake search pages."""
+
+    def __init__(self, html: str, total: int = TOTAL_EVENTS):
+        super().__init__()
+        self.html = html
+        self.total = total
+        self.valid_token = _extract_xsrf(html)
+        self.page_loads = 0
+        self.api_calls = 0
+        self.expire_next = False
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        if request.url.split("?")[0] == BASE_PAGE:
+            self.page_loads += 1
+            return self._response(request, 200, self.html.encode(), "text/html")
+
+        if f"{url.scheme}://{url.netloc}{url.path}" == BASE_API:
+            self.api_calls += 1
+            if self.expire_next or request.headers.get("X-XSRF-TOKEN") != self.valid_token:
+                self.expire_next = False
+                return self._response(request, 419, b"{}", "application/json")
+
+            qs = parse_qs(url.query)
+            page = int(qs["page"][0])
+            per_page = int(qs["perPage"][0])
+            first = (page - 1) * per_page
+            ids = range(first, min(first + per_page, self.total))
+            body = {
+                "@odata.count": self.total,
+                "value": [
+                    {"id": i, "name": f"Event {i}", "startDate": "2025-12-06T18:00:00Z"}
+                    for i in ids
+                ],
+            }
+            return self._response(request, 200, json.dumps(body).encode(), "application/json")
+
+        return self._response(request, 404, b"", "text/plain")
+
+    @staticmethod
+    def _response(request, status, body, content_type):
+        r = requests.Response()
+        r.status_code = status
+        r._content = body
+        r.headers["Content-Type"] = content_type
+        r.url = request.url
+        r.request = request
+        return r
+
+    def close(self):
+        pass
+
+
+def make_client():
+    with open(RAW_HTML_PATH, encoding="utf-8") as f:
+        html = f.read()
+    adapter = ReplayAdapter(html)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return EngageClient(session=session), adapter
+
+
+def test_token_extracted_from_raw_html():
+    client, adapter = make_client()
+    assert adapter.valid_token, "engage_raw.html has no xsrfToken"
+    client.fetch_events(limit=10)
+    assert client.session.cookies.get("XSRF-TOKEN") == adapter.valid_token
+
+
+def test_token_reused_across_calls():
+    client, adapter = make_client()
+    client.fetch_events(limit=10)
+    client.fetch_events(limit=10)
+    assert adapter.page_loads == 1, adapter.page_loads
+    assert adapter.api_calls == 2, adapter.api_calls
+
+
+def test_refresh_on_419():
+    client, adapter = make_client()
+    client.fetch_events(limit=10)
+    adapter.expire_next = True
+    events = client.fetch_events(limit=10)
+    assert len(events) == 10
+    assert adapter.page_loads == 2, adapter.page_loads
+    assert client.token_refreshes == 2
+
+
+def test_pagination_past_50():
+    client, adapter = make_client()
+    events = client.fetch_events(limit=TOTAL_EVENTS + 50)
+    assert len(events) == TOTAL_EVENTS, len(events)
+    assert adapter.api_calls == 3, adapter.api_calls
+    assert len({e["url"] for e in events}) == TOTAL_EVENTS
+
+    client2, _ = make_client()
+    assert len(client2.fetch_events(limit=75)) == 75
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"ok  {name}")
@@ -1,9 +1,10 @@
 # services/scrapers/nyc_parks_scraper.py
 import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
 import logging
 
+from services.scrapers.conditional import Fetched, conditional_get, validators
+from services.scrapers.parsing import make_soup
+
 logger = logging.getLogger(__name__)
 
 HEADERS = {
@@ -25,62 +26,55 @@ HEADERS = {
 
 URL = "https://www.nycgovparks.org/events"
 
-def fetch_nyc_parks_events(limit=20):
-    try:
-        r = requests.get(URL, headers=HEADERS, timeout=10, allow_redirects=True)
-        
-        # Handle 403 Forbidden errors gracefully
-        if r.status_code == 403:
-            logger.warning(f"NYC Parks scraper: 403 Forbidden - website may be blocking automated requests")
-            return []
-        
-        r.raise_for_status()
-
-        soup = BeautifulSoup(r.text, "html.parser")
-        events = []
+def fetch_nyc_parks_events(limit=20, conditional=False):
+    """
+    Scrape upcoming events from the NYC Parks events page.
+    Errors (including the 403 the site sends to automated clients) propagate
+    to the caller, so the scraper runner can back off.
+    With conditional=True, raises NotModified when the page hasn't changed;
+    the events carry the page's validators, to remember() once stored.
+    """
+    get = conditional_get if conditional else requests.get
+    r = get(URL, headers=HEADERS, timeout=10, allow_redirects=True)
+    if r.status_code == 403:
+        logger.warning("NYC Parks scraper: 403 Forbidden - website may be blocking automated requests")
+    r.raise_for_status()
+    return Fetched(parse_nyc_parks_events(r.text, limit), validators(r))
 
-        # Events are now in <article class="event"> blocks
-        blocks = soup.select("article.event") or soup.select("div.event")
 
-        for ev in blocks[:limit]:
-            title = ev.select_one(".event-title, h2, h3")
-            name = title.get_text(strip=True) if title else None
+def parse_nyc_parks_events(html, limit=20):
+    """Event dicts from the NYC Parks events page HTML."""
+    soup = make_soup(html)
+    events = []
 
-            desc = ev.select_one(".event-description, p")
-            description = desc.get_text(" ", strip=True) if desc else None
+    # Events are now in <article class="event"> blocks
+    blocks = soup.select("article.event") or soup.select("div.event")
 
-            date_el = ev.select_one(".event-date, time")
-            start = date_el.get_text(strip=True) if date_el else None
+    for ev in blocks[:limit]:
+        title = ev.select_one(".event-title, h2, h3")
+        name = title.get_text(strip=True) if title else None
 
-            url_el = ev.select_one("a")
-            url = "https://www.nycgovparks.org" + url_el["href"] if url_el and url_el.get("href") else None
+        desc = ev.select_one(".event-description, p")
+        description = desc.get_text(" ", strip=True) if desc else None
 
-            img = ev.select_one("img")
-            image = img["src"] if img and img.get("src") else None
+        date_el = ev.select_one(".event-date, time")
+        start = date_el.get_text(strip=True) if date_el else None
 
-            events.append({
-                "name": name,
-                "description": description,
-                "start": start,
-                "end": None,
-                "location": "NYC Park Event",
-                "address": None,
-                "url": url,
-                "image": image
-            })
+        url_el = ev.select_one("a")
+        url = "https://www.nycgovparks.org" + url_el["href"] if url_el and url_el.get("href") else None
 
-        return events
+        img = ev.select_one("img")
+        image = img["src"] if img and img.get("src") else None
 
-    except requests.exceptions.HTTPError as e:
-        if e.response and e.response.status_code == 403:
-            logger.warning(f"NYC Parks scraper: 403 Forbidden - website may be blocking automated requests")
-        else:
-            logger.warning(f"NYC Parks scraper HTTP error: {e}")
-        return []
-    except requests.exceptions.RequestException as e:
-        logger.warning(f"NYC Parks scraper request error: {e}")
-        return []
-    except Exception as e:
-        logger.warning(f"NYC Parks scraper error: {e}")
-        return []
+        events.append({
+            "name": name,
+            "description": description,
+            "start": start,
+            "end": None,
+            "location": "NYC Park Event",
+            "address": None,
+            "url": url,
+            "image": image
+        })
 
+    return events
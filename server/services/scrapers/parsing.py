@@ -0,0 +1,30 @@
+# services/scrapers/parsing.py
+"""
+BeautifulSoup construction for scrapers.
+
+lxml is several times faster than the pure-Python html.parser and copes with
+the markup our sources publish; html.parser is only used when lxml isn't
+installed. SCRAPER_HTML_PARSER overrides the choice.
+"""
+
+import os
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    _DEFAULT_PARSER = "lxml"
+except ImportError:
+    _DEFAULT_PARSER = "html.parser"
+
+HTML_PARSER = os.getenv("SCRAPER_HTML_PARSER", _DEFAULT_PARSER)
+
+
+def make_soup(markup, parser: str | None = None) -> BeautifulSoup:
+    return BeautifulSoup(markup, parser or HTML_PARSER)
+
+
+def html_to_text(markup: str, separator: str = "", strip: bool = False) -> str:
+    """Plain text of an HTML fragment (event descriptions from JSON feeds)."""
+    if not markup:
+        return ""
+    return make_soup(markup).get_text(separator=separator, strip=strip)
@@ -0,0 +1,203 @@
+# services/scrapers/runner.py
+"""
+Concurrent scraper fan-out.
+
+Every source runs in its own thread with its own timeout, so one slow site
+(NYC Parks answering 403 after a long delay) no longer holds up the rest.
+Each source also has a circuit breaker: after FAILURE_THRESHOLD failures in a
+row it is skipped for COOLDOWN_SECONDS, then tried once more (half-open).
+
+Per-source health (state, latency, item count, last error) comes back from
+every run; the ingestion worker publishes it with the event snapshot.
+
+A source that raises NotModified (conditional fetch, nothing changed) counts
+as a success but has no entry in the results; its health is marked
+"unchanged" and the caller keeps the events it already has. Items of a
+conditional fetch come back as the source's Fetched list, validators
+attached; storing those is up to the caller (after it keeps the items).
+A timed-out source's late result is dropped with its validators.
+"""
+
+from __future__ import annotations
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.scrapers.conditional import Fetched, NotModified
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT_SECONDS = 12.0
+FAILURE_THRESHOLD = 3
+COOLDOWN_SECONDS = 600
+
+
+class ScraperSource:
+    """A named fetch function plus the kwargs and timeout to call it with."""
+
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[..., List[Dict[str, Any]]],
+        kwargs: Optional[Dict[str, Any]] = None,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ):
+        self.name = name
+        self.fetch = fetch
+        self.kwargs = kwargs or {}
+        self.timeout = timeout
+
+
+class CircuitBreaker:
+    """
+    closed → open after `failure_threshold` consecutive failures;
+    open → half-open once `cooldown_seconds` have passed (one trial call);
+    half-open → closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, cooldown_seconds: float = COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+                # Trip, or re-trip after a failed half-open trial
+                self.opened_at = time.monotonic()
+
+    def retry_in(self) -> Optional[float]:
+        if self.opened_at is None:
+            return None
+        return max(0.0, self.cooldown_seconds - (time.monotonic() - self.opened_at))
+
+
+class ScraperRunner:
+    """Runs sources concurrently and keeps a breaker + health record per source."""
+
+    def __init__(self, sources: List[ScraperSource], failure_threshold: int = FAILURE_THRESHOLD,
+                 cooldown_seconds: float = COOLDOWN_SECONDS):
+        self.sources = sources
+        self._breakers = {
+            s.name: CircuitBreaker(failure_threshold, cooldown_seconds) for s in sources
+        }
+        self._health: Dict[str, Dict[str, Any]] = {s.name: {"state": "closed"} for s in sources}
+        self._lock = threading.Lock()
+
+    def run(self) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
+        """
+        Fetch every source whose breaker allows it.
+        Returns ({source: items}, {source: health}); failed, timed-out,
+        skipped and unchanged sources have no items.
+        """
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        runnable = []
+        for source in self.sources:
+            if self._breakers[source.name].allow():
+                runnable.append(source)
+            else:
+                self._update(source.name, skipped=True)
+
+        if not runnable:
+            return results, self.health()
+
+        executor = ThreadPoolExecutor(max_workers=len(runnable), thread_name_prefix="scraper")
+        try:
+            started = time.monotonic()
+            futures = {
+                source.name: executor.submit(self._timed_fetch, source) for source in runnable
+            }
+            # All sources start together, so waiting in deadline order gives
+            # each one exactly its own timeout
+            for source in sorted(runnable, key=lambda s: s.timeout):
+                remaining = source.timeout - (time.monotonic() - started)
+                try:
+                    items, seconds = futures[source.name].result(timeout=max(0.0, remaining))
+                except FutureTimeout:
+                    self._fail(source, f"timed out after {source.timeout:.0f}s", source.timeout)
+                    continue
+                except NotModified:
+                    self._breakers[source.name].record_success()
+                    self._update(source.name, ok=True, seconds=time.monotonic() - started, unchanged=True)
+                    continue
+                except Exception as e:
+                    self._fail(source, str(e) or type(e).__name__, time.monotonic() - started)
+                    continue
+
+                results[source.name] = items
+                self._breakers[source.name].record_success()
+                self._update(source.name, ok=True, seconds=seconds, count=len(items))
+        finally:
+            # Overrunning threads finish in the background; nobody waits for them
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results, self.health()
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            snapshot = {}
+            for name, record in self._health.items():
+                breaker = self._breakers[name]
+                retry_in = breaker.retry_in()
+                snapshot[name] = {
+                    **record,
+                    "state": breaker.state,
+                    "consecutive_failures": breaker.consecutive_failures,
+                    "retry_in_seconds": round(retry_in) if retry_in is not None else None,
+                }
+            return snapshot
+
+    @staticmethod
+    def _timed_fetch(source: ScraperSource) -> Tuple[List[Dict[str, Any]], float]:
+        t0 = time.monotonic()
+        items = source.fetch(**source.kwargs) or []
+        return (items if isinstance(items, Fetched) else list(items)), time.monotonic() - t0
+
+    def _fail(self, source: ScraperSource, error: str, seconds: float) -> None:
+        self._breakers[source.name].record_failure()
+        logger.warning(f"Scraper {source.name} failed: {error}")
+        self._update(source.name, ok=False, seconds=seconds, error=error)
+
+    def _update(self, name: str, ok: Optional[bool] = None, seconds: Optional[float] = None,
+                count: Optional[int] = None, error: Optional[str] = None, skipped: bool = False,
+                unchanged: bool = False) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            record = self._health[name]
+            record["last_run"] = now
+            record["skipped"] = skipped
+            if skipped:
+                return
+            record["ok"] = ok
+            record["unchanged"] = unchanged
+            record["latency_seconds"] = round(seconds, 2) if seconds is not None else None
+            if ok:
+                if not unchanged:
+                    record["count"] = count
+                record["last_success"] = now
+                record["last_error"] = None
+            else:
+                record["count"] = 0
+                record["last_error"] = error
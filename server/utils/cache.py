@@ -4,7 +4,10 @@ Falls back to memory cache if Valkey/Redis is unavailable.
 Works with both Valkey (DigitalOcean) and Redis.
 """
 import os
+import time
 import logging
+import threading
+from collections import OrderedDict
 import requests_cache
 from datetime import timedelta
 import redis
@@ -45,4 +48,46 @@ def init_requests_cache():
         expire_after=timedelta(minutes=5),
         allowable_methods=("GET",),
     )
-    logger.info("Requests cache initialized with memory backend")
\ No newline at end of file
+    logger.info("Requests cache initialized with memory backend")
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with per-entry expiry and LRU eviction.
+    Stores None values too, so negative results can be cached.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, self._MISSING) is not self._MISSING
+
+    def set(self, key, value, ttl_seconds: float | None = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -82,6 +82,7 @@ class ConversationContextManager:
                     context_data = json.loads(data)
                     context = ConversationContext()
                     context.history = context_data.get("history", [])
+                    context.summary = context_data.get("summary", "")
                     context.last_places = context_data.get("last_places", [])
                     context.all_results = context_data.get("all_results", [])
                     context.result_index = context_data.get("result_index", 0)
@@ -105,6 +106,7 @@ class ConversationContextManager:
             try:
                 context_data = {
                     "history": context.history,
+                    "summary": context.summary,
                     "last_places": context.last_places,
                     "all_results": context.all_results,
                     "result_index": context.result_index,
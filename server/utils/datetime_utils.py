@@ -0,0 +1,53 @@
+# server/utils/datetime_utils.py
+"""
+One datetime parser for event feeds.
+
+Scrapers and clients send ISO strings with "Z", with offsets, without any
+zone ("2025-12-06 18:00:00" from WordPress feeds) or date-only values.
+Everything is turned into an aware datetime here; values without a zone are
+taken as New York local time, which is what all of our sources publish.
+"""
+
+from __future__ import annotations
+from datetime import datetime, date, time as dtime
+from typing import Any, Optional
+
+import pytz
+
+LOCAL_TZ = pytz.timezone("America/New_York")
+
+
+def now_local() -> datetime:
+    return datetime.now(LOCAL_TZ)
+
+
+def ensure_aware(dt: datetime) -> datetime:
+    """Attach New York time to naive datetimes; leave aware ones alone."""
+    if dt.tzinfo is None or dt.tzinfo.utcoffset(dt) is None:
+        return LOCAL_TZ.localize(dt)
+    return dt
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """
+    Parse an event timestamp into an aware datetime, or None.
+    Accepts datetime/date objects and ISO-like strings (with "Z", an
+    offset, a space instead of "T", or just a date).
+    """
+    if value is None or value == "":
+        return None
+
+    if isinstance(value, datetime):
+        return ensure_aware(value)
+    if isinstance(value, date):
+        return LOCAL_TZ.localize(datetime.combine(value, dtime.min))
+    if not isinstance(value, str):
+        return None
+
+    text = value.strip()
+    if text.endswith("Z") or text.endswith("z"):
+        text = text[:-1] + "+00:00"
+    try:
+        return ensure_aware(datetime.fromisoformat(text))
+    except ValueError:
+        return None